@@ -1,10 +1,40 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from .models import Movie, Genre, Director, Review, Comment, Reaction
-from django.utils.html import format_html
+from .moderation import approve_reviews, reject_reviews
+from .pagination import EstimatedCountPaginator
+from .templatetags.posters import poster
+
+
+class EstimatedCountChangeList(ChangeList):
+    """
+    ChangeList įrašų skaičių nuskaito prieš puslapį, todėl po puslapio perimamas EstimatedCountPaginator
+    patikslintas skaičius.
+    """
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.result_count = self.paginator.count
+        self.multi_page = self.result_count > self.list_per_page
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Bazinė administravimo klasė lentelėms, kurios gali turėti šimtus tūkstančių įrašų.
+
+    Atributai:
+    - paginator: EstimatedCountPaginator – nefiltruotas sąrašas neskaičiuoja visos lentelės COUNT(*).
+    - show_full_result_count: Išjungta, kad filtruotas sąrašas nevykdytų antro COUNT(*) visai lentelei.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return EstimatedCountChangeList
 
 
 @admin.register(Movie)
-class MovieAdmin(admin.ModelAdmin):
+class MovieAdmin(LargeTableAdmin):
     """
     Filmo administravimo klasė.
 
@@ -15,18 +45,23 @@ class MovieAdmin(admin.ModelAdmin):
     - list_display: Apibrėžia stulpelius, kurie bus rodomi filmo sąraše (pavadinimas, metai, režisierius ir nuotraukos peržiūra).
     - search_fields: Apibrėžia laukus, pagal kuriuos bus galima ieškoti (pavadinimas ir režisierius).
     - list_filter: Leidžia filtruoti sąrašą pagal metus ir žanrus.
+    - list_select_related: Režisierius prijungiamas tame pačiame SELECT, o ne užklausiamas kiekvienai eilutei.
+    - autocomplete_fields: Režisierius ir žanrai parenkami paieška, o ne visų įrašų išskleidžiamu sąrašu.
 
     Metodai:
-    - image_preview: Atsakingas už filmo nuotraukos atvaizdavimą administravimo sąsajoje. Jei nuotrauka yra, ji bus rodoma,
+    - image_preview: Atsakingas už filmo nuotraukos atvaizdavimą administravimo sąsajoje. Jei nuotrauka yra, rodoma
+      'admin' dydžio miniatiūra (pilno dydžio plakatas nesiunčiamas net tada, kai miniatiūros dar nesukurtos),
       jei ne – bus parodyta žinutė "Nėra nuotraukos".
     """
     list_display = ('title', 'year', 'director', 'image_preview')
     search_fields = ('title', 'director__name')
     list_filter = ('year', 'genres')
+    list_select_related = ('director',)
+    autocomplete_fields = ('director', 'genres')
 
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="50" style="border-radius: 5px;" />', obj.image.url)
+            return poster(obj, 'admin', style='border-radius: 5px; height: auto;', fallback_original=False)
         return "Nėra nuotraukos"
 
     image_preview.short_description = 'Nuotrauka'
@@ -42,12 +77,14 @@ class GenreAdmin(admin.ModelAdmin):
 
     Atributai:
     - list_display: Apibrėžia stulpelius, kurie bus rodomi žanro sąraše (tik žanro pavadinimas).
+    - search_fields: Paieška pagal pavadinimą (reikalinga filmo žanrų automatiniam užbaigimui).
     """
     list_display = ('name',)
+    search_fields = ('name',)
 
 
 @admin.register(Director)
-class DirectorAdmin(admin.ModelAdmin):
+class DirectorAdmin(LargeTableAdmin):
     """
     Režisieriaus administravimo klasė.
 
@@ -63,7 +100,7 @@ class DirectorAdmin(admin.ModelAdmin):
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(LargeTableAdmin):
     """
     Apžvalgos administravimo klasė.
 
@@ -71,17 +108,47 @@ class ReviewAdmin(admin.ModelAdmin):
     Ji nustato, kokie duomenys bus rodomi apžvalgos sąraše, pagal kokius laukus bus galima filtruoti ir ieškoti.
 
     Atributai:
-    - list_display: Apibrėžia stulpelius, kurie bus rodomi apžvalgos sąraše (pavadinimas, filmas, įvertinimas).
-    - list_filter: Leidžia filtruoti apžvalgas pagal įvertinimą.
+    - list_display: Apibrėžia stulpelius, kurie bus rodomi apžvalgos sąraše (pavadinimas, filmas, įvertinimas,
+      patvirtinimas).
+    - list_filter: Leidžia filtruoti apžvalgas pagal patvirtinimą ir įvertinimą.
     - search_fields: Apibrėžia laukus, pagal kuriuos bus galima ieškoti (apžvalgos pavadinimas ir filmo pavadinimas).
+    - readonly_fields: Reakcijų skaitikliai, kuriuos palaiko Reaction signalai, todėl jų redaguoti negalima.
+    - list_select_related: Filmas ir autorius prijungiami tame pačiame SELECT.
+    - autocomplete_fields: Filmas ir autorius parenkami paieška.
+    - ordering: Naujausios pirmos (pagal pirminį raktą), kad ir automatinio užbaigimo puslapiai būtų pastovūs.
+    - actions: Pažymėtų apžvalgų patvirtinimas ir atmetimas.
+
+    Metodai:
+    - get_queryset: Prijungia list_select_related ryšius ir už sąrašo ribų, nes autorių naudoja apžvalgos
+      pavadinimas (__str__), pvz. komentarų ir reakcijų formų automatinio užbaigimo rezultatuose.
+    - approve_selected, reject_selected: Moderuoja visas pažymėtas apžvalgas vienu UPDATE, o suvestines ir
+      talpyklas atnaujina vieną kartą visam paketui (žr. moderation.moderate_reviews).
     """
-    list_display = ('title', 'movie', 'rating')
-    list_filter = ('rating',)
+    list_display = ('title', 'movie', 'rating', 'approved', 'likes_count', 'dislikes_count')
+    list_filter = ('approved', 'rating')
     search_fields = ('title', 'movie__title')
+    readonly_fields = ('likes_count', 'dislikes_count', 'moderated_at')
+    list_select_related = ('movie', 'user')
+    autocomplete_fields = ('movie', 'user')
+    ordering = ('-id',)
+    actions = ('approve_selected', 'reject_selected')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(*self.list_select_related)
+
+    @admin.action(description='Patvirtinti pažymėtas apžvalgas', permissions=('change',))
+    def approve_selected(self, request, queryset):
+        count = approve_reviews(queryset)
+        self.message_user(request, f'Patvirtinta apžvalgų: {count}.')
+
+    @admin.action(description='Atmesti pažymėtas apžvalgas', permissions=('change',))
+    def reject_selected(self, request, queryset):
+        count = reject_reviews(queryset)
+        self.message_user(request, f'Atmesta apžvalgų: {count}.')
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     """
     Komentaro administravimo klasė.
 
@@ -90,12 +157,16 @@ class CommentAdmin(admin.ModelAdmin):
 
     Atributai:
     - list_display: Apibrėžia stulpelius, kurie bus rodomi komentaro sąraše (komentaro turinys ir su juo susijusi apžvalga).
+    - list_select_related: Apžvalga ir jos autorius (naudojamas apžvalgos pavadinime) prijungiami tame pačiame SELECT.
+    - autocomplete_fields: Apžvalga ir vartotojas parenkami paieška.
     """
     list_display = ('content', 'review')
+    list_select_related = ('review__user',)
+    autocomplete_fields = ('review', 'user')
 
 
 @admin.register(Reaction)
-class ReactionAdmin(admin.ModelAdmin):
+class ReactionAdmin(LargeTableAdmin):
     """
     Reakcijos administravimo klasė.
 
@@ -104,8 +175,12 @@ class ReactionAdmin(admin.ModelAdmin):
 
     Atributai:
     - list_display: Apibrėžia stulpelius, kurie bus rodomi reakcijos sąraše (reakcijos tipas ir susijusi apžvalga).
+    - list_select_related: Apžvalga ir jos autorius (naudojamas apžvalgos pavadinime) prijungiami tame pačiame SELECT.
+    - autocomplete_fields: Apžvalga ir vartotojas parenkami paieška.
     """
     list_display = ('reaction_type', 'review')
+    list_select_related = ('review__user',)
+    autocomplete_fields = ('review', 'user')
 
 
 
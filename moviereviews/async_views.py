@@ -0,0 +1,94 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+
+from . import caching, freshness
+from .facets import get_facets
+from .pagination import CountedPaginator
+from .queries import movie_detail_queryset, movie_reviews_queryset
+from .ratings import aget_rating
+from .search import search_movies
+from .views import (MOVIES_PER_PAGE, SearchResultsView, movie_detail_context, movie_list_context,
+                    movie_list_options, movie_list_queryset)
+
+# Asinchroniniai filmų sąrašo, filmo ir paieškos rodiniai ASGI serveriui (įjungiami ASYNC_VIEWS nustatymu).
+# DB užklausos vykdomos per Django async ORM (ji naudoja vieną užklausos giją), o šablonas, kurio
+# fragmentai ir tingūs objektai dar gali kreiptis į DB, atvaizduojamas taip pat gijoje.
+# Šie perėjimai į giją kainuoja CPU, todėl greitai atsakant IMDb pralaidumas ne didesnis nei per WSGI;
+# rodinių nauda ta, kad lėtas IMDb vėlina filmo puslapį ne daugiau nei IMDB_RATING_TIMEOUT
+# (žr. benchmark_concurrency).
+
+
+async def render_async(request, template_name, context_func):
+    """
+    Atvaizduoja šabloną gijoje; kontekstas kuriamas ten pat, nes jis skaito request.user ir fragmentų versijas.
+
+    :param context_func: funkcija be argumentų, grąžinanti šablono kontekstą
+    """
+    return await sync_to_async(lambda: render(request, template_name, context_func()))()
+
+
+async def movie_imdb_rating(movie):
+    """
+    Išsaugotas filmo IMDb reitingas arba, jei jo nėra, reitingas iš tiekėjo (ribojamas IMDB_RATING_TIMEOUT).
+    """
+    if movie.imdb_rating is not None or not movie.imdb_id:
+        return movie.imdb_rating
+    return await aget_rating(movie.imdb_id)
+
+
+@freshness.acondition(etag_func=freshness.movie_list_etag, last_modified_func=freshness.movie_list_last_modified)
+@caching.cache_anonymous_page(lambda request: [caching.CATALOG, caching.RATINGS])
+async def movie_list(request):
+    """
+    Asinchroninis `views.movie_list`: tie patys filtrai, rikiavimas, talpyklos ir sąlyginės užklausos.
+    Puslapio filmai užklausiami per async ORM.
+    """
+    genre_id, year, sort = movie_list_options(request)
+    facets = await sync_to_async(get_facets)(genre_id, year)
+    page = CountedPaginator(movie_list_queryset(genre_id, year, sort), MOVIES_PER_PAGE,
+                            facets['total']).get_page(request.GET.get('page'))
+    page.object_list = [movie async for movie in page.object_list]
+    return await render_async(request, 'movie_list.html', lambda: movie_list_context(request, page, facets, sort))
+
+
+@freshness.acondition(etag_func=freshness.movie_detail_etag,
+                      last_modified_func=freshness.movie_detail_last_modified)
+@caching.cache_anonymous_page(lambda request, movie_id: [caching.CATALOG, caching.movie_scope(movie_id)])
+async def movie_detail(request, movie_id):
+    """
+    Asinchroninis `views.MovieDetailView`: IMDb reitingas parsiunčiamas kartu su apžvalgų užklausomis,
+    todėl lėtas IMDb neprailgina puslapio daugiau nei iki IMDB_RATING_TIMEOUT, o viršijus laiką
+    puslapis rodomas be reitingo.
+
+    :param movie_id: filmo ID
+    :return: HTML puslapis su filmo informacija, atsiliepimais ir IMDb įvertinimu
+    """
+    movie = await movie_detail_queryset().filter(id=movie_id).afirst()
+    if movie is None:
+        raise Http404('Filmas nerastas.')
+
+    reviews, imdb_rating = await asyncio.gather(
+        _fetch_all(movie_reviews_queryset(movie)),
+        movie_imdb_rating(movie),
+    )
+    return await render_async(request, 'movie_detail.html',
+                              lambda: movie_detail_context(request, movie, reviews, imdb_rating))
+
+
+async def search(request):
+    """
+    Asinchroninis `views.SearchResultsView`. FTS5 paieška vykdoma SQL užklausa, kuriai async ORM
+    atitikmens neturi, todėl ji kviečiama per sync_to_async.
+    """
+    query = request.GET.get('search_text', '').strip()
+    page = await sync_to_async(search_movies)(query, request.GET.get('page'), SearchResultsView.paginate_by)
+    return await render_async(request, 'search_results.html',
+                              lambda: {'results': page.object_list, 'page': page, 'query': query})
+
+
+async def _fetch_all(queryset):
+    # Async iteracija įvykdo ir prefetch_related užklausas.
+    return [obj async for obj in queryset]
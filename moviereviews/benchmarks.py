@@ -0,0 +1,351 @@
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import threading
+import time
+from contextlib import ExitStack, nullcontext
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import OperationalError, connections, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import caching
+from .database import PRIMARY, replica_aliases
+from .models import Movie, Review
+
+
+@dataclass
+class Route:
+    """
+    Vieno matuojamo maršruto aprašas.
+
+    Atributai:
+    - name: URL pavadinimas iš moviereviews/urls.py.
+    - method: 'get' arba 'post'.
+    - login: 'anonymous', 'user' arba 'staff'.
+    - args: Funkcija, grąžinanti reverse() argumentus pagal pavyzdinius duomenis.
+    - query: GET parametrai.
+    """
+    name: str
+    method: str = 'get'
+    login: str = 'anonymous'
+    args: object = None
+    query: dict = None
+
+
+ROUTES = [
+    Route('movie_list'),
+    Route('movie_list', query={'genre': '1', 'page': '2'}),
+    Route('movie_list', query={'sort': 'rating'}),
+    Route('top_rated'),
+    Route('trending'),
+    Route('movie_detail', args=lambda sample: [sample['movie']]),
+    Route('reviews'),
+    Route('my_reviews', login='user'),
+    Route('search', query={'search_text': 'ka'}),
+    Route('register'),
+    Route('login'),
+    Route('logout', method='post', login='user'),
+    Route('add_review', login='user', args=lambda sample: [sample['movie']]),
+    Route('add_comment', login='user', args=lambda sample: [sample['review']]),
+    Route('review_comments', args=lambda sample: [sample['review']]),
+    Route('add_reaction', method='post', login='user', args=lambda sample: [sample['review'], 'like']),
+    Route('user-profile', login='user'),
+    Route('performance_stats', login='staff'),
+    Route('review_export', login='staff'),
+    Route('moderation_queue', login='staff'),
+]
+
+
+# GET maršrutai matuojami dviem režimais: 'cold' – prieš kiekvieną užklausą pakeičiamos talpyklos versijos,
+# todėl puslapis ir jo fragmentai sugeneruojami iš naujo; 'warm' – įprastas darbas su užpildyta talpykla.
+CACHE_MODES = ('cold', 'warm')
+
+
+def route_label(route, cache=None):
+    label = route.name
+    if route.query:
+        label += '?' + '&'.join(f'{key}={value}' for key, value in sorted(route.query.items()))
+    label = f'{route.method.upper()} {label}'
+    return f'{label} [{cache}]' if cache else label
+
+
+def route_cache_modes(route):
+    # POST užklausos talpyklos neskaito (o jų pakeitimai atšaukiami), todėl matuojamos vieną kartą.
+    return CACHE_MODES if route.method == 'get' else (None,)
+
+
+def expire_caches(sample):
+    """
+    Pasendina visas talpyklos sritis, nuo kurių priklauso matuojami puslapiai ir fragmentai.
+    """
+    caching.bump(caching.CATALOG, caching.RATINGS, caching.REVIEWS, caching.movie_scope(sample['movie']))
+
+
+def sample_objects():
+    """
+    Parenka pavyzdinius duomenis: populiariausią filmą, jo apžvalgą ir ją parašiusį vartotoją.
+    """
+    popular = Movie.objects.annotate(review_count=Count('review')).order_by('-review_count').values('id')[:1]
+    review = Review.public.filter(movie__in=popular).order_by('id').first()
+    if review is None:
+        raise ValueError('Duomenų bazėje nėra apžvalgų – pirmiausia paleiskite `seed_data`.')
+    return {'movie': review.movie_id, 'review': review.id, 'user': review.user_id}
+
+
+def uncovered_routes():
+    """
+    moviereviews maršrutai, kuriems ROUTES neturi aprašo (naujas maršrutas turi būti įtrauktas į matavimus).
+    """
+    from . import urls
+    covered = {route.name for route in ROUTES}
+    return sorted(pattern.name for pattern in urls.urlpatterns if pattern.name and pattern.name not in covered)
+
+
+def benchmark_host():
+    """
+    Host antraštė, kurią leidžia ALLOWED_HOSTS (su DEBUG=True tuščias sąrašas leidžia 'localhost').
+    """
+    hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+    return hosts[0] if hosts else 'localhost'
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def measure_route(route, sample, iterations, warmup, cache=None):
+    """
+    Išmatuoja vieną maršrutą. POST užklausos vykdomos transakcijoje, kuri atšaukiama, todėl duomenys nekinta.
+    Su `cache='cold'` prieš kiekvieną užklausą (už matuojamo intervalo ribų) talpyklos versijos pakeičiamos.
+
+    :return: žodynas su vėlinimo procentiliais (ms), užklausų skaičiumi ir HTTP būsena
+    """
+    client = Client(SERVER_NAME=benchmark_host())
+    if route.login == 'user':
+        client.force_login(User.objects.get(id=sample['user']))
+    elif route.login == 'staff':
+        staff, _ = User.objects.get_or_create(username='benchmark-staff', defaults={'is_staff': True})
+        client.force_login(staff)
+
+    url = reverse(route.name, args=route.args(sample) if route.args else None)
+    request = getattr(client, route.method)
+
+    timings = []
+    queries = []
+    status = None
+    for i in range(warmup + iterations):
+        if cache == 'cold':
+            expire_caches(sample)
+        with transaction.atomic() if route.method != 'get' else nullcontext():
+            # Skaitymai gali eiti į replikas, todėl užklausos skaičiuojamos ir jų ryšiuose.
+            with ExitStack() as stack:
+                captured = [stack.enter_context(CaptureQueriesContext(connections[alias]))
+                            for alias in (PRIMARY, *replica_aliases())]
+                started = time.perf_counter()
+                response = request(url, route.query or {})
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - started) * 1000
+            if route.method != 'get':
+                transaction.set_rollback(True)
+        if route.name == 'logout':
+            client.force_login(User.objects.get(id=sample['user']))
+        if i >= warmup:
+            timings.append(elapsed)
+            queries.append(sum(len(context) for context in captured))
+            status = response.status_code
+
+    return {
+        'status': status,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': max(queries),
+    }
+
+
+def run_benchmarks(iterations=50, warmup=5, only=None):
+    sample = sample_objects()
+    results = {}
+    for route in ROUTES:
+        if only and route.name not in only:
+            continue
+        for cache in route_cache_modes(route):
+            results[route_label(route, cache)] = measure_route(route, sample, iterations, warmup, cache)
+    return {
+        'meta': {
+            'iterations': iterations,
+            'warmup': warmup,
+            'movies': Movie.objects.count(),
+            'reviews': Review.objects.count(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'routes': results,
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Palygina rezultatus su bazine linija.
+
+    Regresija – kai p95 vėlinimas viršija bazinį daugiau nei `tolerance` dalimi
+    arba kai padidėja SQL užklausų skaičius.
+
+    :return: regresijų aprašymų sąrašas
+    """
+    regressions = []
+    for label, current in results['routes'].items():
+        previous = baseline.get('routes', {}).get(label)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f'{label}: SQL užklausų {previous["queries"]} -> {current["queries"]}')
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f'{label}: p95 {previous["p95_ms"]} ms -> {current["p95_ms"]} ms')
+    return regressions
+
+
+def load_test_paths(limit=10):
+    """
+    Apkrovos testo URL: filmų be išsaugoto IMDb reitingo puslapiai (jiems reitingas parsiunčiamas užklausos metu),
+    o jei tokių nėra – populiariausių filmų puslapiai.
+    """
+    movie_ids = list(Movie.objects.filter(imdb_rating__isnull=True, imdb_id__gt='')
+                     .order_by('id').values_list('id', flat=True)[:limit])
+    if not movie_ids:
+        movie_ids = list(Movie.objects.annotate(review_count=Count('review'))
+                         .order_by('-review_count', 'id').values_list('id', flat=True)[:limit])
+    if not movie_ids:
+        raise ValueError('Duomenų bazėje nėra filmų – pirmiausia paleiskite `seed_data`.')
+    return [reverse('movie_detail', args=[movie_id]) for movie_id in movie_ids]
+
+
+async def _http_get(host, port, path, timeout):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+def run_load(host, port, paths, concurrency=20, total=200, timeout=30):
+    """
+    Apkrovos testas: `concurrency` klientų kartu siunčia iš viso `total` GET užklausų į paleistą serverį
+    (po vieną ryšį užklausai), paeiliui imdami kelius iš `paths`.
+
+    :return: žodynas su pralaidumu (užklausos/s), vėlinimo procentiliais (ms) ir klaidų skaičiumi
+    """
+
+    async def main():
+        counter = itertools.count()
+        timings = []
+        errors = 0
+
+        async def client():
+            nonlocal errors
+            while (index := next(counter)) < total:
+                started = time.perf_counter()
+                try:
+                    status = await _http_get(host, port, paths[index % len(paths)], timeout)
+                except (OSError, IndexError, ValueError, asyncio.TimeoutError):
+                    status = None
+                timings.append((time.perf_counter() - started) * 1000)
+                if status != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return time.perf_counter() - started, timings, errors
+
+    elapsed, timings, errors = asyncio.run(main())
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rps': round(total / elapsed, 2),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+    }
+
+
+def run_read_write(movie_ids, user_ids, readers=4, writers=2, seconds=10):
+    """
+    Lygiagretus skaitymas ir rašymas per visą užklausos ciklą: `readers` gijų atidarinėja atsitiktinių
+    filmų puslapius, `writers` gijų (po vieną vartotoją) rašo jiems apžvalgas. Užblokuotos DB klaidos
+    („database is locked“) skaičiuojamos, o ne nutraukia matavimą.
+
+    :return: žodynas su skaitymų ir rašymų skaičiumi per sekundę, p95 vėlinimu (ms) ir klaidomis
+    """
+    deadline = time.perf_counter() + seconds
+    results = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+
+    def worker(kind, user_id):
+        client = Client(SERVER_NAME=benchmark_host())
+        if user_id is not None:
+            client.force_login(User.objects.get(id=user_id))
+        timings = []
+        failed = 0
+        try:
+            while time.perf_counter() < deadline:
+                movie_id = random.choice(movie_ids)
+                started = time.perf_counter()
+                try:
+                    if kind == 'read':
+                        ok = client.get(reverse('movie_detail', args=[movie_id])).status_code == 200
+                    else:
+                        ok = client.post(reverse('add_review', args=[movie_id]),
+                                         {'title': 'Benchmark', 'content': '...', 'rating': 4}).status_code == 302
+                except OperationalError:
+                    ok = False
+                if ok:
+                    timings.append((time.perf_counter() - started) * 1000)
+                else:
+                    failed += 1
+        finally:
+            connections.close_all()
+        with lock:
+            results[kind].extend(timings)
+            errors[kind] += failed
+
+    threads = [threading.Thread(target=worker, args=('read', None)) for _ in range(readers)]
+    threads += [threading.Thread(target=worker, args=('write', user_ids[index % len(user_ids)]))
+                for index in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    row = {}
+    for kind in ('read', 'write'):
+        timings = results[kind]
+        row[f'{kind}s_per_second'] = round(len(timings) / seconds, 2)
+        row[f'{kind}_p95_ms'] = round(percentile(timings, 0.95), 3) if timings else None
+        row[f'{kind}_errors'] = errors[kind]
+    return row
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def dump(data, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+        file.write('\n')
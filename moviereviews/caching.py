@@ -0,0 +1,186 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .database import STICKY_COOKIE
+
+# Versijų sritys: kiekvienas talpyklos raktas apima visų sričių, nuo kurių priklauso jo turinys, versijas.
+CATALOG = 'catalog'  # filmai, žanrai, režisieriai ir iš anksto apskaičiuoti panašūs filmai
+RATINGS = 'ratings'  # filmų suvestinės (vidurkiai ir rikiavimas filmų sąraše)
+REVIEWS = 'reviews'  # naujausių apžvalgų sąrašas
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'PAGE_TIMEOUT': 300,
+    'FRAGMENT_TIMEOUT': 600,
+}
+
+
+def movie_scope(movie_id):
+    """
+    Vieno filmo puslapio sritis: filmas, jo apžvalgos, komentarai ir reakcijos.
+    """
+    return f'movie:{movie_id}'
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'PAGE_CACHE', {})}
+
+
+def get_cache():
+    return caches[config()['ALIAS']]
+
+
+def _version_key(scope):
+    return f'moviereviews:version:{scope}'
+
+
+def _new_version():
+    # Laiko žyma, o ne skaitiklis: jei versijos raktas išstumiamas, nauja reikšmė nesutaps
+    # su jokia ankstesne, todėl seni įrašai nebus grąžinti.
+    return time.time_ns()
+
+
+def get_versions(*scopes):
+    """
+    Grąžina sričių versijas (vienu get_many); trūkstamas sukuria.
+    """
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """
+    Pasendina visus su sritimis susijusius puslapius ir fragmentus.
+
+    Transakcijos viduje versija keičiama iškart ir dar kartą po commit, kad lygiagreti užklausa,
+    perskaičiusi naują versiją dar prieš commit, neišsaugotų senų duomenų po ja. Valdymo komandų pakeitimai
+    pasiekia serverį tik tada, kai talpykla bendra procesams (žr. CACHES).
+    """
+    if not scopes:
+        return
+
+    def set_versions():
+        version = _new_version()
+        get_cache().set_many({_version_key(scope): version for scope in scopes}, None)
+
+    set_versions()
+    if connection.in_atomic_block:
+        transaction.on_commit(set_versions)
+
+
+def bump_movies(movie_ids):
+    bump(*(movie_scope(movie_id) for movie_id in movie_ids))
+
+
+def fragment_context(request, **scopes):
+    """
+    Kontekstas šablonų `{% cache %}` fragmentams: sričių versijos pagal vardus, laikas ir `viewer`.
+
+    `viewer` tuščias anonimams, o prisijungusiems – ID ir CSRF slapukas, nes fragmentuose su formomis
+    yra vartotojui skirtas CSRF raktas.
+    """
+    context = dict(zip(scopes, get_versions(*scopes.values())))
+    context['timeout'] = config()['FRAGMENT_TIMEOUT']
+    user = getattr(request, 'user', None)
+    if user and user.is_authenticated:
+        get_token(request)
+        context['viewer'] = f'{user.pk}:{request.META["CSRF_COOKIE"]}'
+    else:
+        context['viewer'] = ''
+    return context
+
+
+def _page_key(request, versions):
+    raw = f'{request.method}:{request.get_full_path()}:{":".join(map(str, versions))}'
+    return 'moviereviews:page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _is_cacheable_request(request):
+    # Ką tik rašęs klientas (STICKY_COOKIE) turi matyti pagrindinės DB, o ne talpyklos duomenis.
+    return (request.method in ('GET', 'HEAD')
+            and not request.user.is_authenticated
+            and 'messages' not in request.COOKIES
+            and STICKY_COOKIE not in request.COOKIES)
+
+
+def _is_cacheable_response(request, response):
+    return (response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE'))
+
+
+def _cached_response(request, scopes, args, kwargs):
+    """
+    :return: (puslapio raktas, atsakymas iš talpyklos arba None); raktas None, jei užklausa netinka talpyklai
+    """
+    if not _is_cacheable_request(request):
+        return None, None
+    key = _page_key(request, get_versions(*scopes(request, *args, **kwargs)))
+    cached = get_cache().get(key)
+    if cached is None:
+        return key, None
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = 'hit'
+    return key, response
+
+
+def _store_response(request, response, key):
+    if _is_cacheable_response(request, response):
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        get_cache().set(key, (response.content, response['Content-Type']), config()['PAGE_TIMEOUT'])
+        response['X-Page-Cache'] = 'miss'
+    return response
+
+
+def cache_anonymous_page(scopes):
+    """
+    Dekoratorius, saugantis visą anonimo matomą puslapį talpykloje po raktu su sričių versijomis.
+
+    Puslapiai su slapukais, CSRF raktu ar pranešimais neišsaugomi. Atsakyme pridedama `X-Page-Cache`
+    antraštė (hit/miss). Tinka ir asinchroniniams rodiniams: tada talpykla ir request.user tikrinami gijoje.
+
+    :param scopes: funkcija (request, *args, **kwargs) -> sričių sąrašas
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                key, cached = await sync_to_async(_cached_response)(request, scopes, args, kwargs)
+                if cached is not None:
+                    return cached
+                response = await view(request, *args, **kwargs)
+                if key is None:
+                    return response
+                return await sync_to_async(_store_response)(request, response, key)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key, cached = _cached_response(request, scopes, args, kwargs)
+            if cached is not None:
+                return cached
+            response = view(request, *args, **kwargs)
+            return response if key is None else _store_response(request, response, key)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,135 @@
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+# Po rašymo klientas dar STICKY_SECONDS skaito iš pagrindinės DB, kad replikos vėlavimas
+# nepaslėptų ką tik įrašytos apžvalgos (read-your-writes).
+STICKY_COOKIE = 'moviereviews_primary'
+STICKY_SECONDS = 10
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    """
+    Vienos užklausos DB pasirinkimas.
+
+    Atributai:
+    - read_alias: DB, iš kurios skaitoma (replika arba pagrindinė).
+    - wrote: Ar užklausa jau rašė į pagrindinę DB.
+    """
+
+    def __init__(self, read_alias):
+        self.read_alias = read_alias
+        self.wrote = False
+
+
+_state = ContextVar('moviereviews_db_routing', default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+class PrimaryReplicaRouter:
+    """
+    Rašymas – į pagrindinę DB, skaitymas – iš užklausai parinktos replikos.
+
+    Replika parenkama ReplicaRoutingMiddleware kiekvienai GET/HEAD užklausai be STICKY_COOKIE slapuko.
+    Užklausai parašius į DB, jos tolesni skaitymai taip pat eina į pagrindinę DB. Už užklausų ribų
+    (valdymo komandos, foninės užduotys) visada naudojama pagrindinė DB.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        return state.read_alias if state is not None else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.read_alias = PRIMARY
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replikos – tos pačios DB kopijos, jų schema atnaujinama kartu su pagrindine.
+        return False if db in replica_aliases() else None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Parenka užklausos skaitymo DB: saugioms užklausoms – atsitiktinę repliką (viena užklausa skaito iš
+    vienos), kitoms ir klientams, neseniai rašiusiems, – pagrindinę. Po rašymo atsakyme nustatomas
+    STICKY_COOKIE slapukas.
+
+    Veikia ir sinchroniškai, ir asinchroniškai. Asinchroniniu atveju būsena nustatoma korutinoje, o
+    sync_to_async gijos (ORM užklausos) gauna jos konteksto kopiją su tuo pačiu RoutingState objektu.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.routing_state(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        state = self.routing_state(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(response, state)
+
+    def routing_state(self, request):
+        if request.method in SAFE_METHODS and replica_aliases() and STICKY_COOKIE not in request.COOKIES:
+            return RoutingState(random.choice(replica_aliases()))
+        return RoutingState(PRIMARY)
+
+    def finish(self, response, state):
+        if state.wrote and replica_aliases():
+            response.set_cookie(STICKY_COOKIE, '1', max_age=STICKY_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Naujo SQLite ryšio nustatymai (SQLITE_PRAGMAS): WAL režimu skaitytojai neblokuoja rašančiojo ir atvirkščiai,
+    synchronous=NORMAL su WAL išlieka patikimas, o mmap ir didesnis puslapių podėlis sumažina skaitymų kainą.
+    Su ilgalaikiais ryšiais (CONN_MAX_AGE) tai atliekama kartą ryšiui, o ne kiekvienai užklausai.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    # Per DB-API ryšį, kad nustatymai nepatektų į užklausų skaitiklius. journal_mode – failo savybė, todėl
+    # nustatoma tik pagrindinei DB; replikos ryšiai atidaromi tik skaitymui.
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        if name == 'journal_mode' and connection.alias != PRIMARY:
+            continue
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,122 @@
+import csv
+import json
+import zlib
+
+from django.db.models import Prefetch
+
+from .models import Comment, Review
+
+FORMATS = ('jsonl', 'csv')
+CSV_COLUMNS = ['id', 'movie_id', 'movie_title', 'imdb_id', 'user_id', 'username', 'title', 'content', 'rating',
+               'approved', 'created_at', 'likes', 'dislikes', 'comment_count', 'comments']
+CONTENT_TYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Eilutės kaupiamos į maždaug tokio dydžio gabalus, kad atsakymas nebūtų siunčiamas po vieną eilutę.
+CHUNK_BYTES = 64 * 1024
+
+
+def review_records(chunk_size=2000):
+    """
+    Apžvalgos su filmu, vartotoju, komentarais ir reakcijų skaičiais, skaitomos serverio pusės iteracija.
+
+    `.iterator(chunk_size)` su prefetch_related komentarus užkrauna kiekvienam paketui atskirai, todėl
+    atmintyje vienu metu būna tik vienas paketas apžvalgų ir jų komentarų.
+    """
+    comments = Comment.objects.select_related('user').order_by('created_at', 'id')
+    reviews = (Review.objects
+               .select_related('movie', 'user')
+               .prefetch_related(Prefetch('comments', queryset=comments))
+               .order_by('id'))
+    for review in reviews.iterator(chunk_size=chunk_size):
+        yield {
+            'id': review.id,
+            'movie_id': review.movie_id,
+            'movie_title': review.movie.title,
+            'imdb_id': review.movie.imdb_id,
+            'user_id': review.user_id,
+            'username': review.user.username,
+            'title': review.title,
+            'content': review.content,
+            'rating': review.rating,
+            'approved': review.approved,
+            'created_at': review.created_at.isoformat(),
+            'likes': review.likes_count,
+            'dislikes': review.dislikes_count,
+            'comments': [{
+                'id': comment.id,
+                'user_id': comment.user_id,
+                'username': comment.user.username,
+                'content': comment.content,
+                'created_at': comment.created_at.isoformat(),
+            } for comment in review.comments.all()],
+        }
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """
+    Failo pakaitalas csv.writer: write() grąžina eilutę, užuot ją kaupęs.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for record in records:
+        comments = record['comments']
+        yield writer.writerow([record[column] for column in CSV_COLUMNS[:-2]] +
+                              [len(comments), json.dumps(comments, ensure_ascii=False)])
+
+
+def encode_chunks(lines, chunk_bytes=CHUNK_BYTES):
+    """
+    Sujungia tekstines eilutes į UTF-8 gabalus po maždaug `chunk_bytes` baitų.
+    """
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_bytes:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_chunks(chunks, level=6):
+    """
+    Srautiškai suspaudžia gabalus gzip formatu (wbits=31 – gzip antraštė ir kontrolinė suma).
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_reviews(format='jsonl', compress=False, chunk_size=2000):
+    """
+    Apžvalgų eksporto generatorių grandinė: DB iteratorius -> eilutės -> baitų gabalai -> (gzip).
+
+    :param format: 'jsonl' arba 'csv'
+    :param compress: ar suspausti gzip
+    :return: baitų gabalų generatorius
+    """
+    if format not in FORMATS:
+        raise ValueError(f'Nežinomas formatas: {format}')
+    lines = (jsonl_lines if format == 'jsonl' else csv_lines)(review_records(chunk_size))
+    chunks = encode_chunks(lines)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(format, compress):
+    return f'reviews.{format}' + ('.gz' if compress else '')
@@ -0,0 +1,75 @@
+from operator import itemgetter
+
+from django.db.models import Count, Q
+
+from . import caching
+from .models import Genre, Movie
+
+
+def invalidate():
+    """
+    Pasendina visas facetų lenteles visuose procesuose. Filmų ir žanrų signalai tai daro patys (keičia
+    CATALOG versiją), todėl tiesiogiai kviesti reikia tik apėjus signalus.
+    """
+    caching.bump(caching.CATALOG)
+
+
+def _cache_key(version, genre_id, year):
+    return f'moviereviews:facets:{version}:{genre_id}:{year}'
+
+
+def filter_movies(genre_id=None, year=None):
+    """
+    Filmai pagal žanro ir metų filtrus.
+
+    Žanras tikrinamas per `id__in` paužklausą, todėl M2M sujungimas niekada nedubliuoja filmų eilučių.
+    """
+    movies = Movie.objects.all()
+    if genre_id is not None:
+        movies = movies.filter(id__in=Movie.genres.through.objects.filter(genre_id=genre_id).values('movie_id'))
+    if year is not None:
+        movies = movies.filter(year=year)
+    return movies
+
+
+def _compute(genre_id, year):
+    genre_filter = Q(movie__year=year) if year is not None else Q()
+    # Žanrų – keliasdešimt, todėl jie rikiuojami Python'e, o ne laikiname SQLite B-medyje.
+    genres = sorted(Genre.objects
+                    .annotate(movie_count=Count('movie', filter=genre_filter))
+                    .order_by()
+                    .values('id', 'name', 'movie_count'),
+                    key=itemgetter('name'))
+
+    years = list(filter_movies(genre_id=genre_id)
+                 .order_by()
+                 .values('year')
+                 .annotate(movie_count=Count('id'))
+                 .order_by('-year'))
+
+    if year is not None:
+        total = next((row['movie_count'] for row in years if row['year'] == year), 0)
+    else:
+        total = sum(row['movie_count'] for row in years)
+    return {'genres': genres, 'years': years, 'total': total}
+
+
+def get_facets(genre_id=None, year=None):
+    """
+    Grąžina facetų lenteles dabartinei filtrų būsenai.
+
+    Žanrų skaičiai skaičiuojami su metų filtru, metų skaičiai – su žanro filtru (kiekvienas facetas
+    neriboja pats savęs). Viskas gaunama dviem agreguotais užklausimais ir laikoma bendroje Django
+    talpykloje po raktu su CATALOG versija, todėl bet kuriame procese pakeitus filmus ar žanrus visi
+    procesai iškart skaičiuoja naujas lenteles (ir naują 'total' puslapiavimui).
+
+    :return: žodynas su raktais 'genres' (id, name, movie_count), 'years' (year, movie_count) ir 'total'
+    """
+    cache = caching.get_cache()
+    version, = caching.get_versions(caching.CATALOG)
+    key = _cache_key(version, genre_id, year)
+    facets = cache.get(key)
+    if facets is None:
+        facets = _compute(genre_id, year)
+        cache.set(key, facets, caching.config()['FRAGMENT_TIMEOUT'])
+    return facets
@@ -0,0 +1,166 @@
+import hashlib
+import os
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import similarity
+from .models import Movie, Review
+
+# Didelius ID sąrašus liečiame dalimis, kad neviršytume SQLite parametrų ribos.
+TOUCH_BATCH = 900
+
+
+def touch_movies(movie_ids, at=None):
+    """
+    Pažymi filmų puslapius pasikeitusiais (updated_at = dabar), kai keičiasi juose rodomi susiję duomenys.
+
+    :param at: žymos laikas vietoje dabarties; vėlesnė filmo updated_at reikšmė tada nemažinama
+    """
+    movie_ids = list(movie_ids)
+    updated_at = timezone.now() if at is None else Greatest('updated_at', Value(at))
+    for start in range(0, len(movie_ids), TOUCH_BATCH):
+        Movie.objects.filter(pk__in=movie_ids[start:start + TOUCH_BATCH]).update(updated_at=updated_at)
+
+
+def touch_review(review_id, **changes):
+    """
+    Pažymi apžvalgą pasikeitusia; `changes` (pvz. skaitiklių F() išraiškos) įrašomi tame pačiame UPDATE.
+    """
+    Review.objects.filter(pk=review_id).update(updated_at=timezone.now(), **changes)
+
+
+def _etag(request, *parts):
+    """
+    Silpnas ETag iš šviežumo reikšmių. Prisijungusiems į jį įtraukiamas vartotojas ir CSRF slapukas,
+    nes jų puslapyje yra navigacija ir formos su asmeniniu CSRF raktu.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        parts += (user.pk, request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _conditional_allowed(request):
+    # Neparodyti pranešimai keičia puslapį, nors duomenys nepasikeitė.
+    return 'messages' not in request.COOKIES
+
+
+def movie_detail_state(request, movie_id):
+    """
+    Filmo puslapio šviežumas vienu užklausimu: filmo ir naujausios patvirtintos apžvalgos updated_at bei
+    patvirtintų apžvalgų skaičius (moderavimo laukiančios puslapyje nerodomos). Komentarai ir reakcijos
+    atnaujina savo apžvalgos, o ištrintos apžvalgos ir perskaičiuoti kaimynai (refresh_neighbors) – filmo
+    updated_at. Panašių filmų blokas gali būti imamas iš turinio indekso, todėl įtraukiama ir jo versija.
+
+    :return: (ETag, Last-Modified) arba (None, None), jei filmo nėra
+    """
+    cached = getattr(request, '_movie_detail_state', None)
+    if cached is not None:
+        return cached
+    approved = Q(review__approved=True)
+    row = Movie.objects.filter(pk=movie_id).aggregate(updated_at=Max('updated_at'),
+                                                      review_changed=Max('review__updated_at', filter=approved),
+                                                      review_total=Count('review', filter=approved))
+    if row['updated_at'] is None or not _conditional_allowed(request):
+        state = (None, None)
+    else:
+        updated_at, review_changed, review_total = row['updated_at'], row['review_changed'], row['review_total']
+        index_version, index_built = similarity_state()
+        last_modified = max(filter(None, (updated_at, review_changed, index_built)))
+        state = (_etag(request, 'movie', movie_id, updated_at.timestamp(),
+                       review_changed.timestamp() if review_changed else '', review_total, index_version or ''),
+                 last_modified)
+    request._movie_detail_state = state
+    return state
+
+
+def similarity_state():
+    """
+    Turinio panašumo indekso versija ir jos įrašymo laikas (CURRENT žymės mtime) arba (None, None).
+    """
+    path = os.path.join(settings.SIMILARITY_INDEX_DIR, similarity.CURRENT_FILE)
+    version = similarity.current_version()
+    try:
+        built = datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc)
+    except FileNotFoundError:
+        return None, None
+    return version, built
+
+
+def movie_list_state(request):
+    """
+    Filmų sąrašo šviežumas: naujausi filmų ir apžvalgų pakeitimai (per updated_at indeksus) ir filmų skaičius,
+    nes sąraše rodomi filmai, jų žanrai ir įvertinimų vidurkiai. Ištrintos apžvalgos atnaujina filmo updated_at.
+
+    :return: (ETag, Last-Modified)
+    """
+    cached = getattr(request, '_movie_list_state', None)
+    if cached is not None:
+        return cached
+    if not _conditional_allowed(request):
+        state = (None, None)
+    else:
+        movies = Movie.objects.aggregate(changed=Max('updated_at'), total=Count('id'))
+        review_changed = Review.objects.aggregate(changed=Max('updated_at'))['changed']
+        changes = [value for value in (movies['changed'], review_changed) if value]
+        state = (_etag(request, 'movies', movies['total'], *(value.timestamp() for value in changes)),
+                 max(changes) if changes else None)
+    request._movie_list_state = state
+    return state
+
+
+def movie_detail_etag(request, movie_id):
+    return movie_detail_state(request, movie_id)[0]
+
+
+def movie_detail_last_modified(request, movie_id):
+    # Last-Modified neatskiria vartotojų, todėl siunčiamas tik anonimams.
+    return None if request.user.is_authenticated else movie_detail_state(request, movie_id)[1]
+
+
+def movie_list_etag(request):
+    return movie_list_state(request)[0]
+
+
+def movie_list_last_modified(request):
+    return None if request.user.is_authenticated else movie_list_state(request)[1]
+
+
+def acondition(etag_func=None, last_modified_func=None):
+    """
+    `django.views.decorators.http.condition` asinchroniniams rodiniams (Django 4.2 jo nepalaiko).
+    ETag ir Last-Modified apskaičiuojami gijoje, nes jie skaito DB ir request.user.
+    """
+
+    def check(request, args, kwargs):
+        last_modified = last_modified_func(request, *args, **kwargs) if last_modified_func else None
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        etag = etag_func(request, *args, **kwargs) if etag_func else None
+        etag = quote_etag(etag) if etag is not None else None
+        return etag, last_modified, get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            etag, last_modified, response = await sync_to_async(check)(request, args, kwargs)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+
+        return inner
+
+    return decorator
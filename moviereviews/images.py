@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import ExifTags, Image, ImageOps
+
+from . import caching
+from .models import Movie
+
+logger = logging.getLogger(__name__)
+
+# Numatytieji plakatų dydžiai (plotis, aukštis) pikseliais; kiekvienas generuojamas 1x ir 2x tankiu.
+DEFAULT_POSTER_SIZES = {
+    'admin': (50, 75),
+    'list': (170, 250),
+    'detail': (300, 450),
+}
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+DENSITIES = (1, 2)
+
+DERIVATIVES_DIR = 'derivatives'
+
+# Plakato turinio santraukos ilgis (šešioliktainiais simboliais) išvestinių failų pavadinimuose.
+DIGEST_LENGTH = 12
+
+
+def poster_sizes():
+    return getattr(settings, 'POSTER_SIZES', DEFAULT_POSTER_SIZES)
+
+
+def fit_size(width, height, box):
+    """
+    Plakato versijos dydis: originalo proporcijos, telpa į `box` (plotis, aukštis) ir niekada nedidinama.
+    Pagal jį kuriami failai ir šablonų width/height atributai, todėl jie sutampa.
+    """
+    scale = min(box[0] / width, box[1] / height, 1)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def poster_dimensions(movie, size):
+    """
+    Filmo plakato `size` versijos (1x) plotis ir aukštis arba None, jei originalo matmenys nežinomi.
+    """
+    if not movie.poster_width or not movie.poster_height:
+        return None
+    return fit_size(movie.poster_width, movie.poster_height, poster_sizes()[size])
+
+
+def _oriented_size(image):
+    # EXIF orientacijos 5–8 pasuka paveikslėlį 90°, todėl plotis ir aukštis sukeičiami (be viso failo dekodavimo).
+    width, height = image.size
+    if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+        return height, width
+    return width, height
+
+
+def poster_digest(data):
+    """
+    Plakato turinio santrauka: skirtingi paveikslėliai su tuo pačiu failo vardu (pvz. 'poster.jpg' ir
+    'poster.png') gauna skirtingus išvestinių failų pavadinimus, o pakeistas turinys – naujus URL.
+    """
+    return hashlib.sha256(data).hexdigest()[:DIGEST_LENGTH]
+
+
+def derivative_name(image_name, digest, size, density, extension):
+    """
+    Išvestinio failo pavadinimas, pvz. 'movie_images/derivatives/poster-3f2a9c0b1d4e-list@2x.webp'.
+    """
+    directory, filename = posixpath.split(image_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, DERIVATIVES_DIR, f'{stem}-{digest}-{size}@{density}x.{extension}')
+
+
+def derivative_names(image_name, digest):
+    return [derivative_name(image_name, digest, size, density, extension)
+            for size in poster_sizes() for density in DENSITIES for extension in FORMATS]
+
+
+def generate_derivatives(image_name, force=False, storage=default_storage):
+    """
+    Sukuria visų dydžių WebP ir JPEG plakato versijas.
+
+    Jau egzistuojantys failai neperrašomi, nebent nurodytas `force`.
+    Paveikslėlis niekada nedidinamas – mažas originalas tiesiog perkoduojamas.
+
+    :return: (originalo turinio santrauka, originalo (plotis, aukštis), sukurtų failų skaičius)
+    """
+    with storage.open(image_name, 'rb') as source:
+        data = source.read()
+    digest = poster_digest(data)
+    image = Image.open(BytesIO(data))
+    dimensions = _oriented_size(image)
+    targets = [
+        (size, density, extension)
+        for size in poster_sizes() for density in DENSITIES for extension in FORMATS
+        if force or not storage.exists(derivative_name(image_name, digest, size, density, extension))
+    ]
+    if not targets:
+        return digest, dimensions, 0
+
+    original = ImageOps.exif_transpose(image).convert('RGB')
+
+    sizes = poster_sizes()
+    for size, density, extension in targets:
+        width, height = sizes[size]
+        resized = original.resize(fit_size(*dimensions, (width * density, height * density)), Image.LANCZOS)
+        buffer = BytesIO()
+        resized.save(buffer, **FORMATS[extension])
+        name = derivative_name(image_name, digest, size, density, extension)
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(buffer.getvalue()))
+    return digest, dimensions, len(targets)
+
+
+def record_derivatives(image_name, digest, dimensions):
+    """
+    Įrašo santrauką ir originalo matmenis visiems filmams su šiuo plakatu ir pasendina jų puslapius, kad
+    šablonai imtų naudoti sumažintas versijas. UPDATE apeina Movie signalus (jie vėl generuotų versijas).
+    """
+    width, height = dimensions
+    movies = Movie.objects.filter(image=image_name).exclude(poster_hash=digest, poster_width=width,
+                                                            poster_height=height)
+    movie_ids = list(movies.values_list('id', flat=True))
+    if movie_ids:
+        Movie.objects.filter(pk__in=movie_ids).update(poster_hash=digest, poster_width=width, poster_height=height,
+                                                      updated_at=timezone.now())
+        caching.bump(caching.CATALOG, *(caching.movie_scope(movie_id) for movie_id in movie_ids))
+
+
+def delete_derivatives(image_name, digest, storage=default_storage):
+    for name in derivative_names(image_name, digest):
+        if storage.exists(name):
+            storage.delete(name)
+
+
+def safe_generate_derivatives(image_name, force=False):
+    """
+    Tas pats kaip `generate_derivatives` kartu su `record_derivatives`, tik klaidos užregistruojamos,
+    o ne išmetamos (naudojama signaluose ir procesų telkinyje).
+
+    :return: sukurtų failų skaičius
+    """
+    try:
+        digest, dimensions, count = generate_derivatives(image_name, force=force)
+        record_derivatives(image_name, digest, dimensions)
+        return count
+    except Exception:
+        logger.warning('Nepavyko sukurti plakato versijų %s', image_name, exc_info=True)
+        return 0
+
+
+def poster_sources(image_name, digest, size, storage=default_storage):
+    """
+    Grąžina žodyną su `srcset` reikšmėmis kiekvienam formatui arba None, jei versijos dar nesukurtos
+    (tuščia `digest`). Failų saugykla netikrinama – apie sukurtas versijas žino Movie.poster_hash.
+    """
+    if not digest:
+        return None
+    return {
+        extension: ', '.join(
+            f'{storage.url(derivative_name(image_name, digest, size, density, extension))} {density}x'
+            for density in DENSITIES
+        )
+        for extension in FORMATS
+    }
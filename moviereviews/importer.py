@@ -0,0 +1,220 @@
+import csv
+import gzip
+import json
+import time
+from itertools import islice
+
+from django.db import transaction
+
+from . import caching, facets, search
+from .models import Director, Genre, Movie
+from .stats import create_empty_stats
+
+UPDATE_FIELDS = ['title', 'year', 'description', 'director', 'updated_at']
+
+
+class CatalogRowError(ValueError):
+    """
+    Netinkama katalogo eilutė; pranešime nurodomas eilutės numeris.
+    """
+
+
+def open_catalog(path, format=None):
+    """
+    Atidaro katalogo failą srautiniam skaitymui. `.gz` failai išskleidžiami skaitant.
+
+    :param format: 'csv' arba 'jsonl'; jei nenurodytas – nustatomas pagal failo plėtinį
+    :return: (tekstinis failo objektas, formatas)
+    """
+    name = path[:-3] if path.endswith('.gz') else path
+    format = format or ('jsonl' if name.endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+    opener = gzip.open if path.endswith('.gz') else open
+    return opener(path, 'rt', encoding='utf-8', newline=''), format
+
+
+def read_rows(file, format):
+    """
+    Srautiškai skaito katalogo eilutes, po vieną. Grąžina (eilutės numeris, žodynas) poras.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for line_number, line in enumerate(file, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as error:
+                    yield line_number, CatalogRowError(f'{line_number} eilutė: netinkamas JSON ({error.msg}).')
+    else:
+        raise ValueError(f'Nežinomas formatas: {format}')
+
+
+def clean_row(line_number, row):
+    """
+    Patikrina ir sutvarko vieną eilutę.
+
+    :return: žodynas su laukais title, year, description, genres (sąrašas), director, imdb_id, poster
+    :raises CatalogRowError: jei trūksta pavadinimo arba metai netinkami
+    """
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, dict):
+        raise CatalogRowError(f'{line_number} eilutė: tikėtasi objekto.')
+    title = str(row.get('title') or '').strip()
+    if not title:
+        raise CatalogRowError(f'{line_number} eilutė: nenurodytas pavadinimas.')
+    try:
+        year = int(row.get('year'))
+    except (TypeError, ValueError):
+        raise CatalogRowError(f'{line_number} eilutė: netinkami metai "{row.get("year")}".') from None
+
+    genres = row.get('genres') or []
+    if isinstance(genres, str):
+        genres = genres.replace('|', ',').split(',')
+    genres = [name.strip()[:100] for name in genres if name and name.strip()]
+    return {
+        'title': title[:255],
+        'year': year,
+        'description': str(row.get('description') or '').strip(),
+        'genres': list(dict.fromkeys(genres)),
+        'director': str(row.get('director') or '').strip()[:255],
+        'imdb_id': str(row.get('imdb_id') or '').strip()[:20] or None,
+        'poster': str(row.get('poster') or '').strip(),
+    }
+
+
+class CatalogImporter:
+    """
+    Srautinis filmų katalogo importas.
+
+    Eilutės skaitomos po vieną ir rašomos paketais: vienas paketas – viena transakcija su keliais
+    `bulk_create` (nauji režisieriai, filmai su upsert pagal `imdb_id`, žanrų ryšiai). Žanrai ir režisieriai
+    randami atminties žodynuose, todėl kiekvienai eilutei atskiri SELECT nevykdomi. Atmintis ribojama paketo
+    dydžiu ir skirtingų režisierių skaičiumi.
+
+    bulk_create nevykdo signalų, todėl kiekvieno paketo filmai iš jau nuskaitytų duomenų įrašomi į paieškos indeksą
+    ir gauna tuščias suvestines (MovieStats), o facetų talpykla ir puslapių talpyklos katalogo versija atnaujinamos
+    pabaigoje. Plakatų versijas ir panašumo indeksą reikia atnaujinti atskiromis komandomis (`generate_posters`,
+    `build_similarity_index`).
+
+    Atributai:
+    - batch_size: Eilučių skaičius viename pakete.
+    - log: Funkcija progreso pranešimams (pvz. self.stdout.write).
+    - max_errors: Kiek netinkamų eilučių leidžiama praleisti, kol importas nutraukiamas (None – neribotai).
+    """
+
+    def __init__(self, batch_size=1000, log=None, max_errors=None):
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.max_errors = max_errors
+        self.genres = {name.lower(): genre_id for genre_id, name in Genre.objects.values_list('id', 'name')}
+        self.directors = {}
+        for director_id, name in Director.objects.order_by('-id').values_list('id', 'name').iterator(chunk_size=10_000):
+            self.directors[name] = director_id
+        self.stats = {'rows': 0, 'created': 0, 'updated': 0, 'skipped': 0}
+        self.errors = []
+
+    def run(self, rows):
+        """
+        Importuoja (eilutės numeris, žodynas) porų srautą.
+
+        :return: statistikos žodynas: rows, created, updated, skipped
+        """
+        started = time.monotonic()
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            cleaned = []
+            for line_number, row in batch:
+                try:
+                    cleaned.append(clean_row(line_number, row))
+                except CatalogRowError as error:
+                    self.skip(str(error))
+            self.stats['rows'] += len(batch)
+            if cleaned:
+                self.import_batch(cleaned)
+            elapsed = time.monotonic() - started
+            self.log(f'{self.stats["rows"]} eilučių ({self.stats["rows"] / max(elapsed, 1e-9):.0f} eil./s)')
+        facets.invalidate()
+        caching.bump(caching.CATALOG)
+        self.stats['seconds'] = round(time.monotonic() - started, 2)
+        return self.stats
+
+    def skip(self, message):
+        self.stats['skipped'] += 1
+        if len(self.errors) < 20:
+            self.errors.append(message)
+        if self.max_errors is not None and self.stats['skipped'] > self.max_errors:
+            raise CatalogRowError(f'Per daug klaidų ({self.stats["skipped"]}). Paskutinė: {message}')
+
+    @transaction.atomic
+    def import_batch(self, rows):
+        self.resolve_lookups(rows)
+        # Pasikartojantis imdb_id tame pačiame pakete – galioja paskutinė eilutė.
+        keyed = {row['imdb_id']: row for row in rows if row['imdb_id']}
+        plain = [row for row in rows if not row['imdb_id']]
+
+        existing = set(Movie.objects.filter(imdb_id__in=keyed).values_list('imdb_id', flat=True))
+        # Plakatas perrašomas tik tada, kai eilutėje jis nurodytas – kitaip išliktų per administravimą įkeltas.
+        for with_poster in (True, False):
+            Movie.objects.bulk_create(
+                [self.build_movie(row) for row in keyed.values() if bool(row['poster']) == with_poster],
+                update_conflicts=True, unique_fields=['imdb_id'],
+                update_fields=UPDATE_FIELDS + ['image'] if with_poster else UPDATE_FIELDS,
+            )
+        created = Movie.objects.bulk_create([self.build_movie(row) for row in plain])
+
+        movie_ids = dict(Movie.objects.filter(imdb_id__in=keyed).values_list('imdb_id', 'id'))
+        pairs = [(movie_ids[imdb_id], row) for imdb_id, row in keyed.items()]
+        pairs += [(movie.id, row) for movie, row in zip(created, plain)]
+        self.replace_genres(pairs, updated_ids=[movie_ids[imdb_id] for imdb_id in existing])
+        create_empty_stats([movie_id for movie_id, _ in pairs])
+
+        search.index_documents(
+            (movie_id, row['title'], row['description'], row['director'], ' '.join(row['genres']))
+            for movie_id, row in pairs
+        )
+        self.stats['updated'] += len(existing)
+        self.stats['created'] += len(pairs) - len(existing)
+
+    def resolve_lookups(self, rows):
+        """
+        Sukuria paketo žanrus ir režisierius, kurių dar nėra atminties žodynuose.
+        """
+        new_genres = {name.lower(): name for row in rows for name in row['genres'] if name.lower() not in self.genres}
+        if new_genres:
+            Genre.objects.bulk_create([Genre(name=name) for name in new_genres.values()], ignore_conflicts=True)
+            self.genres.update((name.lower(), genre_id) for genre_id, name in
+                               Genre.objects.filter(name__in=new_genres.values()).values_list('id', 'name'))
+
+        new_directors = list(dict.fromkeys(row['director'] for row in rows
+                                           if row['director'] and row['director'] not in self.directors))
+        for director in Director.objects.bulk_create([Director(name=name) for name in new_directors]):
+            self.directors[director.name] = director.id
+
+    def build_movie(self, row):
+        return Movie(title=row['title'], year=row['year'], description=row['description'],
+                     director_id=self.directors.get(row['director']), imdb_id=row['imdb_id'],
+                     image=row['poster'] or None)
+
+    def replace_genres(self, pairs, updated_ids):
+        through = Movie.genres.through
+        if updated_ids:
+            through.objects.filter(movie_id__in=updated_ids).delete()
+        through.objects.bulk_create([
+            through(movie_id=movie_id, genre_id=self.genres[name.lower()])
+            for movie_id, row in pairs for name in row['genres']
+        ], ignore_conflicts=True)
+
+
+def import_catalog(path, format=None, **kwargs):
+    """
+    Importuoja katalogo failą (CSV arba JSONL, galima .gz).
+
+    :return: (statistika, pirmųjų klaidų sąrašas)
+    """
+    file, format = open_catalog(path, format)
+    with file:
+        importer = CatalogImporter(**kwargs)
+        return importer.run(read_rows(file, format)), importer.errors
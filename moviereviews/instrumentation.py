@@ -0,0 +1,221 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Histogramos intervalų viršutinės ribos milisekundėmis; paskutinis intervalas – viskas, kas lėčiau.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = ContextVar('moviereviews_request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Vienos užklausos matavimai: DB užklausų skaičius ir trukmė bei pavadintų sričių (šablonai, IMDb) trukmės.
+    """
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.spans = {}
+
+    def add(self, name, elapsed_ms):
+        self.spans[name] = self.spans.get(name, 0.0) + elapsed_ms
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_ms += (time.perf_counter() - started) * 1000
+
+
+def current_timings():
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Nuolatinis ryšio execute_wrapper: užklausą priskiria dabartinės užklausos matavimams, jei tokių yra.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.record_query(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Įdiegia record_query kiekvienam naujam DB ryšiui. Ryšiai priklauso gijai, kurioje vykdomas ORM (su ASGI –
+    sync_to_async gijai, o ne korutinai), todėl matavimai pasiekiami per ContextVar, kurį ta gija paveldi
+    iš užklausos konteksto, o ne įdiegiant wrapper tarpinėje programinėje įrangoje.
+    """
+    if record_query not in connection.execute_wrappers:
+        # Pirmoje vietoje, kad laikini `connection.execute_wrapper()` (pop iš galo) jo nenuimtų.
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def timed(name):
+    """
+    Prideda bloko vykdymo trukmę prie dabartinės užklausos srities `name`. Be aktyvios užklausos nieko nedaro.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - started) * 1000)
+
+
+class LatencyHistogram:
+    """
+    Slankioji vieno maršruto statistika: užklausų skaičius, trukmių histograma ir sumos.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.spans = {}
+
+    def observe(self, total_ms, timings):
+        self.count += 1
+        self.buckets[bisect.bisect_left(BUCKETS_MS, total_ms)] += 1
+        self.total_ms += total_ms
+        self.max_ms = max(self.max_ms, total_ms)
+        self.db_queries += timings.db_queries
+        self.db_ms += timings.db_ms
+        for name, elapsed in timings.spans.items():
+            self.spans[name] = self.spans.get(name, 0.0) + elapsed
+
+    def percentile(self, fraction):
+        """
+        Apytikslis procentilis – viršutinė histogramos intervalo, į kurį jis patenka, riba.
+        """
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def as_dict(self):
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / count, 2),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 2),
+            'mean_db_queries': round(self.db_queries / count, 2),
+            'mean_db_ms': round(self.db_ms / count, 2),
+            'mean_ms_by_span': {name: round(value / count, 2) for name, value in self.spans.items()},
+            'buckets': dict(zip([f'<={bound}' for bound in BUCKETS_MS] + ['>' + str(BUCKETS_MS[-1])],
+                                self.buckets)),
+        }
+
+
+class StatsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, total_ms, timings):
+        with self._lock:
+            histogram = self._routes.get(route)
+            if histogram is None:
+                histogram = self._routes[route] = LatencyHistogram()
+            histogram.observe(total_ms, timings)
+
+    def snapshot(self):
+        with self._lock:
+            return {route: histogram.as_dict() for route, histogram in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = StatsRegistry()
+
+
+class PerformanceMiddleware:
+    """
+    Matuoja kiekvienos užklausos trukmę, DB užklausų skaičių ir laiką, šablonų atvaizdavimo
+    bei IMDb kliento laiką.
+
+    Rezultatai grąžinami `Server-Timing` antraštėje ir kaupiami atminties histogramose pagal
+    maršruto pavadinimą (`movie_detail`, `movie_list`, ...). Papildomos sąnaudos – keli
+    `perf_counter` iškvietimai ir vienas užraktas užklausai, todėl tarpinė programinė įranga
+    gali likti įjungta ir gamyboje.
+
+    Veikia ir sinchroniškai, ir asinchroniškai (kaip MiddlewareMixin): po ASGI asinchroniniai rodiniai
+    kviečiami be perėjimo į giją ir atgal.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        started = time.perf_counter()
+        with self.recording(timings):
+            response = self.get_response(request)
+        return self.finish(request, response, started, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        started = time.perf_counter()
+        with self.recording(timings):
+            response = await self.get_response(request)
+        return self.finish(request, response, started, timings)
+
+    @contextmanager
+    def recording(self, timings):
+        # DB užklausas skaičiuoja record_query; su ASGI jos vykdomos sync_to_async gijose, kurios gauna
+        # šio konteksto kopiją, todėl mato tą patį RequestTimings objektą.
+        token = _current.set(timings)
+        try:
+            yield
+        finally:
+            _current.reset(token)
+
+    def finish(self, request, response, started, timings):
+        total_ms = (time.perf_counter() - started) * 1000
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else 'unresolved'
+        registry.observe(route, total_ms, timings)
+        response['Server-Timing'] = server_timing_header(total_ms, timings)
+        return response
+
+
+def server_timing_header(total_ms, timings):
+    parts = [f'total;dur={total_ms:.1f}',
+             f'db;dur={timings.db_ms:.1f};desc="{timings.db_queries} queries"']
+    parts.extend(f'{name};dur={elapsed:.1f}' for name, elapsed in timings.spans.items())
+    return ', '.join(parts)
@@ -0,0 +1,155 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Sum
+from django.utils import timezone
+
+from .models import Comment, JobState, LeaderboardEntry, MovieStats, Reaction, Review, TrendingScore
+
+JOB_NAME = 'leaderboards'
+LEADERBOARD_SIZE = 100
+
+# Bayeso vidurkis: kiekvienas filmas „gauna“ PRIOR_WEIGHT apžvalgų su bendru visų filmų vidurkiu,
+# todėl vienas 5 balų įvertinimas nenustumia filmų su šimtais gerų įvertinimų.
+PRIOR_WEIGHT = 10
+
+# Populiarumas: kiekvienas įvykis sveria EVENT_WEIGHTS ir per HALF_LIFE netenka pusės svorio.
+HALF_LIFE = timedelta(days=2)
+EVENT_WEIGHTS = {'review': 3.0, 'comment': 1.0, 'like': 0.5}
+FIRST_RUN_WINDOW = timedelta(days=7)
+MIN_SCORE = 0.01
+
+# Įvykio laikas nustatomas prieš commit, todėl ilgesnė transakcija gali tapti matoma jau pasibaigus jos
+# laiko langui. Kiekvienas vykdymas perskaito ir EVENT_GRACE iki `since`, o jau įskaityti įvykiai
+# atmetami pagal jų raktus, išsaugotus JobState.recent_events.
+EVENT_GRACE = timedelta(minutes=5)
+
+
+def decay(age):
+    """
+    Kokia įvykio svorio dalis lieka po `age` (timedelta).
+    """
+    return 0.5 ** (max(age, timedelta(0)) / HALF_LIFE)
+
+
+def event_key(kind, pk):
+    """
+    Įvykio raktas dublikatams atmesti: kiekviena apžvalga, komentaras ir reakcija yra vienas įvykis.
+    """
+    return f'{kind}:{pk}'
+
+
+def new_events(since, until):
+    """
+    Patvirtintos apžvalgos, jų komentarai ir teigiamos reakcijos intervale [since, until).
+
+    Apžvalgos įvykio laikas – patvirtinimo momentas (moderated_at), todėl moderatoriaus patvirtinta sena
+    apžvalga patenka į populiarumą tada, kai tampa matoma. Be moderavimo patvirtintoms apžvalgoms
+    (pvz. sukurtoms administravimo sąsajoje) imamas sukūrimo laikas. Nepatvirtintų apžvalgų komentarai
+    ir reakcijos neskaičiuojami. Reakcija įskaitoma vieną kartą, kai pirmą kartą tampa „patinka“ (liked_at):
+    „nepatinka“ pakeitimas į „patinka“ įskaitomas, bet pakartotinis perjungimas populiarumo nebedidina.
+
+    :return: (įvykio raktas, movie_id, įvykio laikas, svoris) ketvertų generatorius
+    """
+    window = {'created_at__gte': since, 'created_at__lt': until}
+    reviews = [Review.public.filter(moderated_at__gte=since, moderated_at__lt=until)
+               .values_list('id', 'movie_id', 'moderated_at'),
+               Review.public.filter(moderated_at__isnull=True, **window).values_list('id', 'movie_id', 'created_at')]
+    for queryset in reviews:
+        for pk, movie_id, approved_at in queryset.iterator():
+            yield event_key('review', pk), movie_id, approved_at, EVENT_WEIGHTS['review']
+    for pk, movie_id, created_at in (Comment.objects.filter(review__approved=True, **window)
+                                     .values_list('id', 'review__movie_id', 'created_at').iterator()):
+        yield event_key('comment', pk), movie_id, created_at, EVENT_WEIGHTS['comment']
+    likes = Reaction.objects.filter(review__approved=True, liked_at__gte=since, liked_at__lt=until)
+    for pk, movie_id, liked_at in likes.values_list('id', 'review__movie_id', 'liked_at').iterator():
+        yield event_key('like', pk), movie_id, liked_at, EVENT_WEIGHTS['like']
+
+
+def refresh_trending(since, now, seen=()):
+    """
+    Atnaujina populiarumo įverčius: esami įverčiai sumažinami vienu UPDATE (visi jie apskaičiuoti `since`
+    momentu), pridedami tik nauji įvykiai, o beveik išblėsę įrašai ištrinami.
+
+    Įvykiai skaitomi nuo `since - EVENT_GRACE`; `seen` – ankstesnio vykdymo jau įskaitytų įvykių raktai.
+
+    :return: (filmų, gavusių naujų įvykių, skaičius, įskaitytų įvykių nuo `now - EVENT_GRACE` raktai)
+    """
+    seen = set(seen)
+    gains = defaultdict(float)
+    recent = []
+    for key, movie_id, at, weight in new_events(since - EVENT_GRACE, now):
+        # Kito vykdymo persidengimo lange įsimenami visi įskaityti įvykiai, ir anksčiau įskaityti.
+        if at >= now - EVENT_GRACE:
+            recent.append(key)
+        if key not in seen:
+            gains[movie_id] += weight * decay(now - at)
+
+    factor = decay(now - since)
+    # Lentelėje lieka tik neseniai aktyvūs filmai, todėl ji nuskaitoma visa (be ilgo IN sąrašo).
+    current = dict(TrendingScore.objects.values_list('movie_id', 'score'))
+    TrendingScore.objects.update(score=F('score') * factor)
+    TrendingScore.objects.bulk_create(
+        [TrendingScore(movie_id=movie_id, score=current.get(movie_id, 0) * factor + gain)
+         for movie_id, gain in gains.items()],
+        update_conflicts=True, unique_fields=['movie'], update_fields=['score'], batch_size=1000,
+    )
+    TrendingScore.objects.filter(score__lt=MIN_SCORE).delete()
+    return len(gains), recent
+
+
+def top_rated_rows(size=LEADERBOARD_SIZE):
+    """
+    Geriausiai įvertinti filmai pagal Bayeso vidurkį, apskaičiuotą iš filmų suvestinių (ne iš apžvalgų).
+
+    :return: (movie_id, įvertis) porų sąrašas
+    """
+    totals = MovieStats.objects.aggregate(reviews=Sum('review_count'), ratings=Sum('rating_sum'))
+    if not totals['reviews']:
+        return []
+    prior = PRIOR_WEIGHT * totals['ratings'] / totals['reviews']
+    score = ExpressionWrapper((F('rating_sum') + prior) / (F('review_count') + PRIOR_WEIGHT),
+                              output_field=FloatField())
+    return list(MovieStats.objects.filter(review_count__gt=0).annotate(score=score)
+                .order_by('-score', 'movie_id').values_list('movie_id', 'score')[:size])
+
+
+def write_leaderboard(kind, rows):
+    LeaderboardEntry.objects.filter(kind=kind).delete()
+    LeaderboardEntry.objects.bulk_create(
+        LeaderboardEntry(kind=kind, rank=rank, movie_id=movie_id, score=score)
+        for rank, (movie_id, score) in enumerate(rows)
+    )
+
+
+def refresh_leaderboards(now=None, size=LEADERBOARD_SIZE):
+    """
+    Periodinė užduotis: atnaujina populiarumo įverčius pagal įvykius nuo paskutinio vykdymo ir
+    perrašo abu surikiuotus sąrašus. Pirmą kartą imami tik FIRST_RUN_WINDOW įvykiai – senesnių svoris
+    jau beveik išblėsęs.
+
+    :return: žodynas {sąrašo tipas: įrašų skaičius} ir 'active' – filmų su naujais įvykiais skaičius
+    """
+    now = now or timezone.now()
+    state, _ = JobState.objects.get_or_create(name=JOB_NAME)
+    since = state.last_run_at or now - FIRST_RUN_WINDOW
+    with transaction.atomic():
+        active, recent = refresh_trending(since, now, state.recent_events)
+        trending = list(TrendingScore.objects.order_by('-score', 'movie_id').values_list('movie_id', 'score')[:size])
+        top_rated = top_rated_rows(size)
+        write_leaderboard(LeaderboardEntry.TRENDING, trending)
+        write_leaderboard(LeaderboardEntry.TOP_RATED, top_rated)
+        state.last_run_at = now
+        state.recent_events = recent
+        state.save(update_fields=['last_run_at', 'recent_events'])
+    return {LeaderboardEntry.TRENDING: len(trending), LeaderboardEntry.TOP_RATED: len(top_rated), 'active': active}
+
+
+def leaderboard_entries(kind):
+    """
+    Surikiuoto sąrašo įrašai su filmu, režisieriumi ir suvestine – vienas SELECT per (kind, rank) indeksą.
+    """
+    return (LeaderboardEntry.objects.filter(kind=kind)
+            .select_related('movie__director', 'movie__stats')
+            .order_by('rank'))
@@ -0,0 +1,162 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.test.utils import override_settings
+
+from moviereviews import benchmarks
+
+SERVERS = ('wsgi', 'asgi')
+# Santykinis pralaidumo skirtumas, iki kurio serveriai laikomi lygiaverčiais.
+PARITY_TOLERANCE = 0.1
+
+
+class PooledWSGIServer(ThreadedWSGIServer):
+    """
+    WSGI serveris su fiksuotu darbo gijų skaičiumi (kaip `gunicorn --threads N`), o ne gija kiekvienai užklausai.
+    """
+
+    def __init__(self, *args, threads=4, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    """
+    Palygina filmo puslapio pralaidumą ir vėlinimą per WSGI (sinchroniniai rodiniai, tiek gijų, kiek klientų)
+    ir per uvicorn (ASGI, asinchroniniai rodiniai) esant daug lygiagrečių klientų.
+
+    Abu serveriai paleidžiami atskiruose procesuose su ta pačia DB. IMDb imituojamas FakeRatingProvider
+    su `--imdb-delay` vėlinimu, o puslapių ir reitingų talpyklos išjungiamos, kad kiekviena užklausa
+    atliktų visą darbą. Duomenis iš anksto sugeneruokite su `seed_data`.
+
+    Kai IMDb atsako greičiau nei IMDB_RATING_TIMEOUT, ASGI pralaidumo nepadidina: Django 4.2 async ORM,
+    šablonai ir įtaisytieji MiddlewareMixin tarpiniai sluoksniai kiekvienoje užklausoje ~20 kartų pereina
+    į sync_to_async giją, todėl užklausos CPU darbas didesnis nei per WSGI (vienas CPU: ~13 ms prieš ~9 ms).
+    ASGI laimi, kai IMDb lėtesnis už `--imdb-timeout`: puslapis grąžinamas be reitingo, o sinchroninis
+    rodinys laukia viso `--imdb-delay` (pvz. `--imdb-delay 1 --imdb-timeout 0.25`: ~2,7 karto didesnis
+    pralaidumas ir ~2 kartus mažesnis p95).
+    """
+    help = 'Apkrovos testas: WSGI ir ASGI (uvicorn) pralaidumas ir vėlinimas filmo puslapiams.'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=20, help='Lygiagrečių klientų skaičius.')
+        parser.add_argument('--requests', type=int, default=200, help='Užklausų skaičius kiekvienam serveriui.')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--imdb-delay', type=float, default=0.1, help='IMDb atsakymo vėlinimas sekundėmis.')
+        parser.add_argument('--imdb-timeout', type=float,
+                            help='Kiek sekundžių ASGI rodinys laukia IMDb (numatytasis – IMDB_RATING_TIMEOUT).')
+        parser.add_argument('--wsgi-threads', type=int,
+                            help='WSGI serverio darbo gijų skaičius (numatytasis – lygus --concurrency).')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--output', help='JSON failas rezultatams.')
+        parser.add_argument('--serve', choices=SERVERS, help='(vidinis) Paleisti vieną serverį šiame procese.')
+
+    def handle(self, *args, **options):
+        # Abu serveriai lyginami esant tam pačiam lygiagretumui: WSGI gijų tiek pat, kiek klientų.
+        if options['wsgi_threads'] is None:
+            options['wsgi_threads'] = options['concurrency']
+        if options['imdb_timeout'] is None:
+            options['imdb_timeout'] = settings.IMDB_RATING_TIMEOUT
+        if options['serve']:
+            return self.serve(options)
+
+        try:
+            paths = benchmarks.load_test_paths()
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        results = {}
+        for server in SERVERS:
+            process = self.start_server(server, options)
+            try:
+                self.wait_for_port(options['port'], process)
+                benchmarks.run_load('127.0.0.1', options['port'], paths, options['concurrency'], options['warmup'])
+                results[server] = benchmarks.run_load('127.0.0.1', options['port'], paths,
+                                                      options['concurrency'], options['requests'])
+            finally:
+                process.terminate()
+                process.wait()
+            row = results[server]
+            self.stdout.write(f'{server.upper():<5} {row["rps"]:>8.2f} užkl./s  p50 {row["p50_ms"]:>8.2f} ms  '
+                              f'p95 {row["p95_ms"]:>8.2f} ms  klaidų {row["errors"]}')
+
+        throughput_ratio = results['asgi']['rps'] / results['wsgi']['rps']
+        p95_ratio = results['asgi']['p95_ms'] / results['wsgi']['p95_ms']
+        self.stdout.write(f'ASGI/WSGI santykis: pralaidumo {throughput_ratio:.2f}, p95 vėlinimo {p95_ratio:.2f} '
+                          f'({options["concurrency"]} klientų, {options["wsgi_threads"]} WSGI gijų, '
+                          f'IMDb {options["imdb_delay"]} s, ASGI laukia iki {options["imdb_timeout"]} s)')
+        if abs(throughput_ratio - 1) < PARITY_TOLERANCE:
+            self.stdout.write('Pralaidumas lygiavertis: skirtumas neviršija matavimo triukšmo.')
+        elif throughput_ratio < 1:
+            self.stdout.write('ASGI pralaidumas mažesnis: užklausos CPU darbas vyksta per sync_to_async gijas.')
+        if options['output']:
+            output = Path(options['output'])
+            output.parent.mkdir(parents=True, exist_ok=True)
+            benchmarks.dump({'options': {name: options[name] for name in
+                                         ('concurrency', 'requests', 'imdb_delay', 'imdb_timeout', 'wsgi_threads')},
+                             'paths': paths, 'servers': results, 'throughput_ratio': round(throughput_ratio, 2),
+                             'p95_ratio': round(p95_ratio, 2)}, output)
+            self.stdout.write(f'Rezultatai įrašyti į {output}')
+
+    def start_server(self, server, options):
+        env = {**os.environ, 'MOVIEREVIEWS_ASYNC_VIEWS': '1' if server == 'asgi' else '0'}
+        command = [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'benchmark_concurrency',
+                   '--serve', server, '--port', str(options['port']),
+                   '--imdb-delay', str(options['imdb_delay']), '--imdb-timeout', str(options['imdb_timeout']),
+                   '--wsgi-threads', str(options['wsgi_threads'])]
+        return subprocess.Popen(command, env=env)
+
+    def wait_for_port(self, port, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'Serveris baigė darbą su kodu {process.returncode}.')
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError(f'Serveris per {timeout} s neatsidarė {port} prievado.')
+
+    def serve(self, options):
+        override_settings(
+            DEBUG=False,
+            ALLOWED_HOSTS=['127.0.0.1', 'localhost'],
+            IMDB_RATING_PROVIDER={'BACKEND': 'moviereviews.ratings.FakeRatingProvider',
+                                  'OPTIONS': {'delay': options['imdb_delay']}},
+            IMDB_RATING_CACHE=None,
+            IMDB_RATING_TIMEOUT=options['imdb_timeout'],
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        ).enable()
+
+        if options['serve'] == 'asgi':
+            try:
+                import uvicorn
+            except ImportError:
+                raise CommandError('ASGI matavimui reikia uvicorn (pip install uvicorn).')
+            from django.core.asgi import get_asgi_application
+            uvicorn.run(get_asgi_application(), host='127.0.0.1', port=options['port'],
+                        log_level='warning', access_log=False)
+        else:
+            from django.core.wsgi import get_wsgi_application
+            server = PooledWSGIServer(('127.0.0.1', options['port']), QuietWSGIRequestHandler,
+                                      threads=options['wsgi_threads'])
+            server.set_app(get_wsgi_application())
+            server.serve_forever()
@@ -0,0 +1,111 @@
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test.utils import override_settings
+
+from moviereviews import benchmarks
+from moviereviews.database import PRIMARY, replica_aliases
+from moviereviews.models import Movie, Review
+
+CONFIGURATIONS = ('before', 'after')
+
+
+class Command(BaseCommand):
+    """
+    Lygiagretaus skaitymo ir rašymo pralaidumas dviem DB konfigūracijoms, abiem su DB kopija
+    (tikroji DB nekeičiama):
+
+    - before: rollback žurnalas (journal_mode=DELETE), be PRAGMA nustatymų, naujas ryšys kiekvienai
+      užklausai ir skaitymas iš pagrindinės DB;
+    - after: projekto nustatymai – WAL ir SQLITE_PRAGMAS, ilgalaikiai ryšiai (CONN_MAX_AGE) ir
+      skaitymas iš replikų (DATABASE_REPLICAS).
+
+    Puslapių talpykla išjungiama, kad kiekvienas skaitymas eitų į DB. Duomenis iš anksto sugeneruokite
+    su `seed_data`.
+    """
+    help = 'Palygina lygiagretaus skaitymo ir rašymo pralaidumą prieš ir po WAL, PRAGMA ir replikų.'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Skaitančių gijų skaičius.')
+        parser.add_argument('--writers', type=int, default=2, help='Rašančių gijų skaičius.')
+        parser.add_argument('--seconds', type=float, default=10, help='Vienos konfigūracijos matavimo trukmė.')
+        parser.add_argument('--output', help='JSON failas rezultatams.')
+
+    def handle(self, *args, **options):
+        source = connections[PRIMARY].settings_dict
+        if source['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Matavimas skirtas SQLite duomenų bazei.')
+        movie_ids = list(Movie.objects.annotate(review_count=Count('review'))
+                         .order_by('-review_count', 'id').values_list('id', flat=True)[:200])
+        user_ids = list(Review.objects.order_by('user_id').values_list('user_id', flat=True).distinct()[:20])
+        if not movie_ids or not user_ids:
+            raise CommandError('Duomenų bazėje nėra apžvalgų – pirmiausia paleiskite `seed_data`.')
+
+        results = {}
+        directory = Path(tempfile.mkdtemp())
+        try:
+            for name in CONFIGURATIONS:
+                copy = directory / f'{name}.sqlite3'
+                self.copy_database(str(source['NAME']), copy, journal_mode='DELETE' if name == 'before' else 'WAL')
+                with self.database(copy, persistent=name == 'after'), override_settings(
+                    SQLITE_PRAGMAS={} if name == 'before' else getattr(settings, 'SQLITE_PRAGMAS', {}),
+                    DATABASE_REPLICAS=[] if name == 'before' else replica_aliases(),
+                    CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+                ):
+                    results[name] = benchmarks.run_read_write(movie_ids, user_ids, options['readers'],
+                                                              options['writers'], options['seconds'])
+                row = results[name]
+                self.stdout.write(f'{name:<7} skaitymai {row["reads_per_second"]:>8.2f}/s '
+                                  f'(p95 {row["read_p95_ms"]} ms, klaidų {row["read_errors"]})  '
+                                  f'rašymai {row["writes_per_second"]:>7.2f}/s '
+                                  f'(p95 {row["write_p95_ms"]} ms, klaidų {row["write_errors"]})')
+        finally:
+            connections.close_all()
+            shutil.rmtree(directory, ignore_errors=True)
+
+        if options['output']:
+            benchmarks.dump({'options': {name: options[name] for name in ('readers', 'writers', 'seconds')},
+                             'configurations': results}, options['output'])
+            self.stdout.write(f'Rezultatai įrašyti į {options["output"]}')
+
+    def copy_database(self, source, target, journal_mode):
+        # Backup API perkelia ir dar neperkeltus WAL puslapius.
+        origin, copy = sqlite3.connect(source), sqlite3.connect(target)
+        try:
+            origin.backup(copy)
+            copy.execute(f'PRAGMA journal_mode = {journal_mode}')
+        finally:
+            origin.close()
+            copy.close()
+
+    @contextmanager
+    def database(self, path, persistent):
+        """
+        Laikinai nukreipia pagrindinę DB ir jos replikas į kopiją `path`. Ryšių nustatymai keičiami
+        vietoje, nes kiekviena gija savo ryšį kuria iš jų.
+        """
+        connections.close_all()
+        saved = {alias: dict(connections.settings[alias]) for alias in self.aliases()}
+        for alias, original in saved.items():
+            connections.settings[alias].update(
+                NAME=str(path) if alias == PRIMARY else path.as_uri() + '?mode=ro',
+                CONN_MAX_AGE=original['CONN_MAX_AGE'] if persistent else 0,
+            )
+        try:
+            yield
+        finally:
+            connections.close_all()
+            for alias, original in saved.items():
+                connections.settings[alias].clear()
+                connections.settings[alias].update(original)
+
+    def aliases(self):
+        return [PRIMARY] + [alias for alias in replica_aliases() if alias in connections.settings]
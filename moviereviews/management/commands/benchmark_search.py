@@ -0,0 +1,54 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from moviereviews.models import Movie
+from moviereviews.search import rebuild_index, search_movies
+from moviereviews.synthetic import SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    """
+    Palygina FTS5 paieškos ir senosios `title__icontains` paieškos greitį sintetiniame kataloge.
+
+    Katalogas sukuriamas transakcijoje, kuri pabaigoje atšaukiama, todėl duomenų bazė lieka nepakitusi.
+    """
+    help = 'Matuoja paieškos vėlinimą (FTS5 prieš icontains) sintetiniame kataloge.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Benchmark skirtas SQLite FTS5 indeksui.')
+        generator = SyntheticDataGenerator(seed=options['seed'])
+        queries = generator.rng.choices(generator.words[10:2000], k=options['queries'])
+
+        with transaction.atomic():
+            generator.create_movies(options['movies'], generator.create_genres(), generator.create_directors(500))
+            self.stdout.write(f'Sukurta {options["movies"]} sintetinių filmų.')
+            started = time.monotonic()
+            rebuild_index()
+            self.stdout.write(f'Indeksas sukurtas per {time.monotonic() - started:.1f} s.')
+
+            self.report('icontains', [self.measure(self.icontains, query) for query in queries])
+            self.report('fts5', [self.measure(search_movies, query) for query in queries])
+            transaction.set_rollback(True)
+
+    def icontains(self, query):
+        return list(Movie.objects.prefetch_related('genres').filter(title__icontains=query).order_by('title')[:20])
+
+    def measure(self, search, query):
+        started = time.perf_counter()
+        search(query)
+        return (time.perf_counter() - started) * 1000
+
+    def report(self, name, timings):
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f'{name:>10}: p50 {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms, '
+                          f'max {timings[-1]:.2f} ms')
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from moviereviews import benchmarks
+
+
+class Command(BaseCommand):
+    """
+    Išmatuoja visų moviereviews maršrutų vėlinimo procentilius ir SQL užklausų skaičių.
+
+    GET maršrutai matuojami atskirai šaltai ([cold] – prieš kiekvieną užklausą talpyklos versijos pakeičiamos,
+    todėl matuojamas pats rodinys) ir šiltai ([warm] – puslapis ar jo fragmentai imami iš talpyklos).
+
+    Rezultatai įrašomi į JSON. Su `--compare` jie palyginami su nurodyta bazine linija; radus regresiją komanda
+    baigiasi klaida, todėl ją galima naudoti CI. Vėlinimai priklauso nuo kompiuterio, todėl bazinė linija
+    nesaugoma repozitorijoje – ją įrašykite su `--save-baseline` toje pačioje aplinkoje ir su tais pačiais
+    `seed_data` duomenimis, kuriais vėliau lyginsite.
+    """
+    help = 'Paleidžia moviereviews maršrutų našumo matavimus.'
+
+    def add_arguments(self, parser):
+        default_dir = Path(settings.BASE_DIR) / 'benchmarks'
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--route', action='append', dest='routes', help='Matuoti tik nurodytą URL pavadinimą.')
+        parser.add_argument('--output', default=str(default_dir / 'results.json'))
+        parser.add_argument('--compare', metavar='BASELINE', help='Palyginti su šia bazine linija (JSON).')
+        parser.add_argument('--save-baseline', metavar='BASELINE', help='Išsaugoti rezultatus kaip bazinę liniją.')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Leistinas p95 pablogėjimas (0.2 = 20%%).')
+
+    def handle(self, *args, **options):
+        baseline = options['compare'] and Path(options['compare'])
+        if baseline and not baseline.exists():
+            raise CommandError(f'Bazinės linijos failo nėra: {baseline}')
+
+        missing = benchmarks.uncovered_routes()
+        if missing:
+            self.stderr.write(f'Maršrutai be matavimų: {", ".join(missing)}')
+
+        try:
+            results = benchmarks.run_benchmarks(options['iterations'], options['warmup'], options['routes'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        for label, row in results['routes'].items():
+            self.stdout.write(f'{label:<52} {row["status"]}  p50 {row["p50_ms"]:>8.2f} ms  '
+                              f'p95 {row["p95_ms"]:>8.2f} ms  p99 {row["p99_ms"]:>8.2f} ms  {row["queries"]:>3} SQL')
+
+        output = Path(options['save_baseline'] or options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        benchmarks.dump(results, output)
+        self.stdout.write(f'Rezultatai įrašyti į {output}')
+
+        if not baseline:
+            return
+        regressions = benchmarks.compare(results, benchmarks.load(baseline), options['tolerance'])
+        if regressions:
+            raise CommandError('Našumo regresijos:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Regresijų nerasta.'))
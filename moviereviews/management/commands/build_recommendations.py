@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from moviereviews.recommendations import DEFAULT_NEIGHBORS, refresh_neighbors
+
+
+class Command(BaseCommand):
+    """
+    Perskaičiuoja filmų kaimynų (item-item) lentelę pagal vartotojų įvertinimus.
+
+    Be `--full` perskaičiuojami tik filmai, kurių apžvalgos nuo paskutinio vykdymo pridėtos, redaguotos,
+    moderuotos ar ištrintos, ir filmai, kurių sąrašus tie pokyčiai paveikia. Inkrementinį vykdymą paleiskite
+    dažnai (pvz. kas 15 min. per cron); `--full` reikia tik pakeitus `--k` ar atkuriant lentelę.
+    """
+    help = 'Perskaičiuoja filmų rekomendacijas (item-item bendradarbiavimo filtravimas).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Perskaičiuoti visus filmus.')
+        parser.add_argument('--k', type=int, default=DEFAULT_NEIGHBORS, help='Kaimynų skaičius filmui.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = refresh_neighbors(full=options['full'], k=options['k'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Perskaičiuoti {total} filmų kaimynai per {time.monotonic() - started:.1f} s.'))
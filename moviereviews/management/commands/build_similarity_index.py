@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from moviereviews.similarity import build_index, update_index
+
+
+class Command(BaseCommand):
+    """
+    Sukuria arba papildo turiniu paremtą filmų panašumo indeksą (settings.SIMILARITY_INDEX_DIR).
+
+    Be `--full` į indeksą įtraukiami tik nauji filmai. Pilnas perkūrimas perskaičiuoja idf svorius ir
+    atspindi redaguotus aprašymus, žanrus bei ištrintus filmus.
+    """
+    help = 'Sukuria arba papildo turiniu paremtą filmų panašumo indeksą.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Perkurti visą indeksą.')
+        parser.add_argument('--k', type=int, default=None, help='Kaimynų skaičius filmui.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['full']:
+            total = build_index(**({'k': options['k']} if options['k'] else {}))
+            message = f'Suindeksuota {total} filmų'
+        else:
+            total = update_index(k=options['k'])
+            message = f'Pridėta {total} filmų'
+        self.stdout.write(self.style.SUCCESS(f'{message} per {time.monotonic() - started:.1f} s.'))
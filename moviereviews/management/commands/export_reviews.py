@@ -0,0 +1,38 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from moviereviews.exporter import FORMATS, export_reviews
+
+
+class Command(BaseCommand):
+    """
+    Eksportuoja apžvalgas su filmu, vartotoju, komentarais ir reakcijų skaičiais (analitikai).
+
+    Skirtingai nei `dumpdata`, duomenys skaitomi ir rašomi srautu, todėl atminties sąnaudos nepriklauso
+    nuo lentelių dydžio.
+    """
+    help = 'Srautiškai eksportuoja apžvalgas JSONL arba CSV formatu.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--gzip', action='store_true', help='Suspausti gzip.')
+        parser.add_argument('--output', default='-', help='Failas (numatytai – standartinė išvestis).')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Apžvalgų skaičius viename DB pakete.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        chunks = export_reviews(options['format'], options['gzip'], options['chunk_size'])
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        written = 0
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        if options['output'] != '-':
+            self.stdout.write(self.style.SUCCESS(
+                f'Įrašyta {written / 1024 / 1024:.1f} MB per {time.monotonic() - started:.1f} s.'))
@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+
+from moviereviews.images import safe_generate_derivatives
+from moviereviews.models import Movie
+
+
+class Command(BaseCommand):
+    """
+    Sukuria trūkstamas sumažintas plakatų versijas jau įkeltiems filmų paveikslėliams.
+
+    Paveikslėliai apdorojami procesų telkinyje, nes Pillow perkodavimas apkrauna procesorių.
+    """
+    help = 'Sugeneruoja WebP/JPEG plakatų versijas esamiems Movie.image failams.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Procesų skaičius (numatytai – CPU branduolių).')
+        parser.add_argument('--force', action='store_true', help='Perrašyti jau sukurtas versijas.')
+
+    def handle(self, *args, **options):
+        movies = Movie.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['force']:
+            # Filmams su santrauka ir matmenimis versijos jau sukurtos – jų originalų nereikia nė skaityti.
+            movies = movies.filter(Q(poster_hash='') | Q(poster_width__isnull=True))
+        names = list(movies.values_list('image', flat=True).distinct())
+        # Procesai paveldi atvirus DB ryšius, todėl juos uždarome prieš kurdami telkinį.
+        connections.close_all()
+
+        started = time.monotonic()
+        created = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            results = executor.map(safe_generate_derivatives, names, [options['force']] * len(names), chunksize=8)
+            for done, count in enumerate(results, 1):
+                created += count
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{done}/{len(names)}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Apdorota {len(names)} paveikslėlių, sukurta {created} failų per {time.monotonic() - started:.1f} s.'))
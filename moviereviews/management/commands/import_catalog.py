@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from moviereviews.importer import CatalogRowError, import_catalog
+
+
+class Command(BaseCommand):
+    """
+    Importuoja filmų katalogą iš CSV arba JSONL failo (galima suspausti .gz).
+
+    Laukai: title, year, description, genres (CSV – atskirti `|` arba `,`; JSONL – sąrašas), director,
+    imdb_id, poster (kelias MEDIA_ROOT atžvilgiu). Filmai su tuo pačiu `imdb_id` atnaujinami,
+    todėl tą patį failą galima importuoti pakartotinai.
+    """
+    help = 'Srautiškai importuoja filmų katalogą (CSV/JSONL) paketais.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Katalogo failas (.csv, .jsonl, galima .gz).')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                            help='Failo formatas (numatytai nustatomas pagal plėtinį).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Eilučių skaičius viename pakete.')
+        parser.add_argument('--max-errors', type=int, default=None,
+                            help='Nutraukti, jei netinkamų eilučių daugiau nei nurodyta.')
+
+    def handle(self, *args, **options):
+        try:
+            stats, errors = import_catalog(options['path'], options['format'], batch_size=options['batch_size'],
+                                           log=self.stdout.write, max_errors=options['max_errors'])
+        except (OSError, CatalogRowError, UnicodeDecodeError) as error:
+            raise CommandError(str(error))
+        for error in errors:
+            self.stderr.write(error)
+        rate = stats['rows'] / max(stats['seconds'], 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Baigta: {stats["created"]} sukurta, {stats["updated"]} atnaujinta, {stats["skipped"]} praleista '
+            f'per {stats["seconds"]:.1f} s ({rate:.0f} eil./s).'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from moviereviews.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    """
+    Sulygina filmų suvestines (MovieStats) su apžvalgų lentele.
+
+    Suvestinės palaikomos signalais, bet masiniai pakeitimai (bulk_create, queryset.update) juos apeina.
+    Vienu GROUP BY apskaičiuojamos tikrosios reikšmės ir perrašomos tik nesutampančios suvestinės.
+    """
+    help = 'Perskaičiuoja filmų įvertinimų suvestines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Nieko nekeisti, tik parodyti neatitikimus.')
+
+    def handle(self, *args, **options):
+        total = rebuild_stats(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f'Rasta {total} neteisingų filmų suvestinių.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Pataisyta {total} filmų suvestinių.'))
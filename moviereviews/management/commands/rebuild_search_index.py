@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from moviereviews.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Iš naujo sukuria FTS5 filmų paieškos indeksą (pvz. po masinio importo, kuris neiškviečia signalų).
+    """
+    help = 'Perkuria filmų pilno teksto paieškos indeksą.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('FTS5 paieškos indeksas palaikomas tik su SQLite.')
+        started = time.monotonic()
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Suindeksuota {total} filmų per {time.monotonic() - started:.1f} s.'))
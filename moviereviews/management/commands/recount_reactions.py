@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from moviereviews.models import Comment, Reaction, Review
+
+
+class Command(BaseCommand):
+    """
+    Iš naujo suskaičiuoja apžvalgų like/dislike skaitiklius iš Reaction lentelės ir komentarų skaitiklius
+    iš Comment lentelės (pastarieji – koreliuota subužklausa, kad JOIN nepadaugintų reakcijų).
+
+    Vienu agreguotu užklausimu randamos tik tos apžvalgos, kurių skaitikliai nesutampa su tikrais,
+    ir jos pataisomos `bulk_update` paketais. Su `--dry-run` tik pranešama apie neatitikimus.
+    """
+    help = 'Perskaičiuoja Review.likes_count, Review.dislikes_count ir Review.comments_count.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Nieko nekeisti, tik parodyti neatitikimus.')
+
+    def handle(self, *args, **options):
+        comments = (Comment.objects.filter(review=OuterRef('pk')).order_by().values('review')
+                    .annotate(total=Count('id')).values('total'))
+        drifted = (Review.objects
+                   .annotate(real_likes=Count('reactions', filter=Q(reactions__reaction_type=Reaction.LIKE)),
+                             real_dislikes=Count('reactions', filter=Q(reactions__reaction_type=Reaction.DISLIKE)),
+                             real_comments=Coalesce(Subquery(comments), 0))
+                   .exclude(likes_count=F('real_likes'), dislikes_count=F('real_dislikes'),
+                            comments_count=F('real_comments'))
+                   .order_by('id')
+                   .values_list('id', 'likes_count', 'dislikes_count', 'comments_count',
+                                'real_likes', 'real_dislikes', 'real_comments'))
+
+        total = 0
+        last_id = 0
+        while True:
+            rows = list(drifted.filter(id__gt=last_id)[:options['batch_size']])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            total += len(rows)
+            for review_id, likes, dislikes, comments_count, real_likes, real_dislikes, real_comments in rows:
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Apžvalga {review_id}: {likes}/{dislikes}/{comments_count} -> '
+                                      f'{real_likes}/{real_dislikes}/{real_comments}')
+            if not options['dry_run']:
+                now = timezone.now()
+                Review.objects.bulk_update(
+                    [Review(id=row[0], likes_count=row[4], dislikes_count=row[5], comments_count=row[6],
+                            updated_at=now) for row in rows],
+                    ['likes_count', 'dislikes_count', 'comments_count', 'updated_at'])
+
+        if options['dry_run']:
+            self.stdout.write(f'Rasta {total} apžvalgų su neteisingais skaitikliais.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Pataisyta {total} apžvalgų skaitiklių.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from moviereviews.synthetic import DEFAULT_SCALE, SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    """
+    Užpildo duomenų bazę atkuriamais sintetiniais duomenimis našumo matavimams.
+
+    Pavyzdys: ./manage.py seed_data --movies 10000 --reactions 1000000 --seed 7
+    Komandą verta leisti atskiroje duomenų bazėje, ne darbinėje.
+    """
+    help = 'Sugeneruoja sintetinius filmus, apžvalgas, komentarus ir reakcijas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        for name, default in DEFAULT_SCALE.items():
+            parser.add_argument(f'--{name}', type=int, default=default)
+
+    def handle(self, *args, **options):
+        generator = SyntheticDataGenerator(seed=options['seed'], batch_size=options['batch_size'],
+                                           log=self.stdout.write)
+        try:
+            counts = generator.generate(**{name: options[name] for name in DEFAULT_SCALE})
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(f'Baigta: {counts}'))
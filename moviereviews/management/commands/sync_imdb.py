@@ -0,0 +1,95 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from moviereviews.models import Movie
+from moviereviews.ratings import create_backend_provider
+
+
+class Command(BaseCommand):
+    """
+    Atnaujina visų filmų, turinčių `imdb_id`, IMDb reitingą ir balsų skaičių.
+
+    Duomenys siunčiami ribotu gijų telkiniu su pakartojimais, o rezultatai įrašomi
+    `bulk_update` paketais. Apdorojami tik filmai, kurie dar nesinchronizuoti arba
+    sinchronizuoti seniau nei prieš `--max-age` valandų, todėl nutraukus komandą
+    ją galima tiesiog paleisti iš naujo – jau įrašyti paketai nebus siunčiami dar kartą.
+    """
+    help = 'Sinchronizuoja filmų IMDb reitingus ir metaduomenis.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Lygiagrečių užklausų skaičius.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Kiek filmų įrašoma vienu bulk_update.')
+        parser.add_argument('--retries', type=int, default=3, help='Kiek kartų kartoti nepavykusią užklausą.')
+        parser.add_argument('--backoff', type=float, default=1.0, help='Pradinė pauzė tarp pakartojimų (s).')
+        parser.add_argument('--max-age', type=float, default=24,
+                            help='Sinchronizuoti filmus, kurių duomenys senesni nei nurodyta valandų.')
+        parser.add_argument('--limit', type=int, default=None, help='Daugiausia apdorojamų filmų.')
+
+    def handle(self, *args, **options):
+        self.provider = create_backend_provider()
+        self.retries = options['retries']
+        self.backoff = options['backoff']
+
+        cutoff = timezone.now() - timedelta(hours=options['max_age'])
+        movies = (Movie.objects
+                  .exclude(Q(imdb_id__isnull=True) | Q(imdb_id=''))
+                  .filter(Q(imdb_synced_at__isnull=True) | Q(imdb_synced_at__lt=cutoff))
+                  .order_by('id')
+                  .values_list('id', 'imdb_id'))
+        limit = options['limit']
+
+        synced = failed = 0
+        last_id = 0
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=options['workers'])
+        try:
+            while limit is None or synced + failed < limit:
+                size = options['batch_size'] if limit is None else min(options['batch_size'], limit - synced - failed)
+                batch = list(movies.filter(id__gt=last_id)[:size])
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+                results = executor.map(self.fetch, (imdb_id for _, imdb_id in batch))
+                now = timezone.now()
+                updates = []
+                for (movie_id, _), metadata in zip(batch, results):
+                    if metadata is None:
+                        failed += 1
+                        continue
+                    updates.append(Movie(id=movie_id, imdb_rating=metadata['rating'],
+                                         imdb_votes=metadata['votes'], imdb_synced_at=now, updated_at=now))
+                Movie.objects.bulk_update(updates, ['imdb_rating', 'imdb_votes', 'imdb_synced_at', 'updated_at'])
+                synced += len(updates)
+                self.report(synced, failed, started)
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.stderr.write('Nutraukta. Paleiskite komandą iš naujo, kad būtų tęsiama nuo likusių filmų.')
+            return
+        executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Baigta: {synced} atnaujinta, {failed} nepavyko per {time.monotonic() - started:.1f} s.'))
+
+    def fetch(self, imdb_id):
+        """
+        Parsiunčia vieno filmo metaduomenis, kartodama užklausą su eksponentiškai ilgėjančia pauze.
+        Jei visi bandymai nepavyksta, grąžina None.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return self.provider.get_metadata(imdb_id)
+            except Exception as exc:
+                if attempt == self.retries:
+                    self.stderr.write(f'{imdb_id}: {exc}')
+                    return None
+                time.sleep(self.backoff * 2 ** attempt * (1 + random.random() / 2))
+
+    def report(self, synced, failed, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(f'{synced} atnaujinta, {failed} nepavyko, {synced / elapsed:.1f} filmų/s')
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from moviereviews.leaderboards import LEADERBOARD_SIZE, refresh_leaderboards
+from moviereviews.models import LeaderboardEntry
+
+
+class Command(BaseCommand):
+    """
+    Atnaujina „Geriausiai įvertinti“ ir „Populiarūs šią savaitę“ sąrašus.
+
+    Populiarumo įverčiai atnaujinami tik pagal apžvalgas, komentarus ir teigiamas reakcijas, sukurtas nuo
+    paskutinio vykdymo, todėl komandą galima leisti dažnai (pvz. kas 10 min. per cron).
+    """
+    help = 'Atnaujina geriausiai įvertintų ir populiarių filmų sąrašus.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=LEADERBOARD_SIZE, help='Filmų skaičius sąraše.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        result = refresh_leaderboards(size=options['size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Geriausiai įvertinti: {result[LeaderboardEntry.TOP_RATED]}, populiarūs: '
+            f'{result[LeaderboardEntry.TRENDING]} (nauji įvykiai {result["active"]} filmų) '
+            f'per {time.monotonic() - started:.1f} s.'))
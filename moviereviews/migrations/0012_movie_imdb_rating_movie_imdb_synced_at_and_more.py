@@ -0,0 +1,28 @@
+# Generated by Django 4.2.19 on 2026-10-17 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0011_reaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='imdb_rating',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='imdb_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='imdb_votes',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
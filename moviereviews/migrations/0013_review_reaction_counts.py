@@ -0,0 +1,37 @@
+# Generated by Django 4.2.19 on 2026-10-17 22:56
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_reaction_counts(apps, schema_editor):
+    Review = apps.get_model('moviereviews', 'Review')
+    reviews = Review.objects.annotate(
+        real_likes=Count('reactions', filter=Q(reactions__reaction_type='like')),
+        real_dislikes=Count('reactions', filter=Q(reactions__reaction_type='dislike')),
+    ).filter(Q(real_likes__gt=0) | Q(real_dislikes__gt=0))
+    for review in reviews:
+        review.likes_count = review.real_likes
+        review.dislikes_count = review.real_dislikes
+        review.save(update_fields=['likes_count', 'dislikes_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0012_movie_imdb_rating_movie_imdb_synced_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_reaction_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+FTS_TABLE = 'moviereviews_movie_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Movie = apps.get_model('moviereviews', 'Movie')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if not cursor.fetchone()[0]:
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(title, description, director, genres, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        rows = [
+            (movie.id, movie.title, movie.description, movie.director.name if movie.director else '',
+             ' '.join(genre.name for genre in movie.genres.all()))
+            for movie in Movie.objects.select_related('director').prefetch_related('genres')
+        ]
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, director, genres) VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0014_review_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
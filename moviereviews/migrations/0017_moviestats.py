@@ -0,0 +1,47 @@
+# Generated by Django 4.2.19 on 2026-10-17 23:48
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+import django.db.models.deletion
+
+
+def fill_movie_stats(apps, schema_editor):
+    Review = apps.get_model('moviereviews', 'Review')
+    MovieStats = apps.get_model('moviereviews', 'MovieStats')
+    rows = (Review.objects.filter(approved=True).values('movie_id')
+            .annotate(review_count=Count('id'), rating_sum=Sum('rating'), last_review_at=Max('created_at'),
+                      **{f'rating_{i}': Count('id', filter=Q(rating=i)) for i in range(1, 6)})
+            .order_by('movie_id'))
+    MovieStats.objects.bulk_create(
+        (MovieStats(rating_mean=row['rating_sum'] / row['review_count'], **row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0016_movieneighbor_jobstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieStats',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='moviereviews.movie')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_mean', models.FloatField(blank=True, null=True)),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+                ('last_review_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-rating_mean', '-review_count'], name='moviestats_rating_idx')],
+            },
+        ),
+        migrations.RunPython(fill_movie_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.19 on 2026-10-18 00:01
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created_at(apps, schema_editor):
+    # Esamiems įrašams paskutinio pakeitimo laikas – sukūrimo laikas, o ne migracijos vykdymo momentas.
+    for model_name in ('Review', 'Comment', 'Reaction'):
+        apps.get_model('moviereviews', model_name).objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0018_leaderboards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='reaction',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
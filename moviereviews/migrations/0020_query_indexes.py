@@ -0,0 +1,55 @@
+# Generated by Django 4.2.19 on 2026-10-18 00:20
+
+from django.db import migrations, models
+
+
+def create_empty_stats(apps, schema_editor):
+    # Filmai be apžvalgų gauna tuščią suvestinę, kad rikiavimas pagal ją galėtų naudoti INNER JOIN.
+    Movie = apps.get_model('moviereviews', 'Movie')
+    MovieStats = apps.get_model('moviereviews', 'MovieStats')
+    missing = Movie.objects.filter(stats__isnull=True).values_list('id', flat=True)
+    MovieStats.objects.bulk_create((MovieStats(movie_id=movie_id) for movie_id in missing.iterator()),
+                                   batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0019_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='moviestats',
+            name='moviestats_rating_idx',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['review', 'created_at', 'id'], name='comment_review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['year'], name='movie_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['title', 'id'], name='movie_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moviestats',
+            index=models.Index(fields=['-rating_mean', '-review_count', 'movie'], name='moviestats_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moviestats',
+            index=models.Index(fields=['-review_count', 'movie'], name='moviestats_reviews_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['review', 'reaction_type'], name='reaction_review_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', 'created_at', 'id'], name='review_movie_created_idx'),
+        ),
+        migrations.RunPython(create_empty_stats, migrations.RunPython.noop),
+    ]
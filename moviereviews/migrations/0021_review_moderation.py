@@ -0,0 +1,38 @@
+# Generated by Django 4.2.19 on 2026-10-18 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0020_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_movie_created_idx',
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='moderated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['-created_at', '-id'], name='review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['movie', 'created_at', 'id'], name='review_movie_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('approved', False), ('moderated_at__isnull', True)), fields=['created_at', 'id'], name='review_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.19 on 2026-10-18 00:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def fill_comment_counts(apps, schema_editor):
+    Review = apps.get_model('moviereviews', 'Review')
+    Comment = apps.get_model('moviereviews', 'Comment')
+    counts = (Comment.objects.filter(review=OuterRef('pk')).order_by().values('review')
+              .annotate(total=Count('id')).values('total'))
+    Review.objects.filter(pk__in=Comment.objects.values('review')).update(comments_count=Subquery(counts))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0021_review_moderation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_comment_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.19 on 2026-10-18 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0022_review_comments_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['moderated_at'], name='review_moderated_idx'),
+        ),
+    ]
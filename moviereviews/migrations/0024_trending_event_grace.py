@@ -0,0 +1,26 @@
+# Generated by Django 4.2.19 on 2026-10-18 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0023_review_moderated_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reaction',
+            name='reaction_created_idx',
+        ),
+        migrations.AddField(
+            model_name='jobstate',
+            name='recent_events',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['updated_at'], name='reaction_updated_idx'),
+        ),
+    ]
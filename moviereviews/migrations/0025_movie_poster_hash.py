@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-18 00:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0024_trending_event_grace'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='poster_hash',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:05
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_like_time(apps, schema_editor):
+    # Tikslus pirmo „patinka“ laikas nežinomas; esamoms teigiamoms reakcijoms imamas paskutinis pakeitimas.
+    Reaction = apps.get_model('moviereviews', 'Reaction')
+    Reaction.objects.filter(reaction_type='like').update(liked_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0025_movie_poster_hash'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reaction',
+            name='reaction_updated_idx',
+        ),
+        migrations.AddField(
+            model_name='reaction',
+            name='liked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['liked_at'], name='reaction_liked_idx'),
+        ),
+        migrations.RunPython(copy_like_time, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviereviews', '0026_reaction_liked_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='poster_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='poster_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
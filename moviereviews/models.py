@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Genre(models.Model):
@@ -48,6 +49,18 @@ class Movie(models.Model):
     - director: Užsienio raktas į režisierių (gali būti tuščias, nustatomas kaip NULL pašalinus susijusį įrašą).
     - imdb_id: IMDb identifikacinis numeris (unikalus, gali būti tuščias).
     - image: Filmo plakato ar nuotraukos laukas (gali būti tuščias).
+    - poster_hash: Plakato turinio santrauka, kuria pavadintos sukurtos sumažintos jo versijos (tuščia – versijos
+      dar nesukurtos). Ją įrašo images.safe_generate_derivatives, todėl šablonams nereikia tikrinti saugyklos.
+    - poster_width, poster_height: Plakato originalo matmenys (pasukus pagal EXIF), iš kurių šablonai
+      apskaičiuoja tikrus sumažintų versijų width/height.
+    - imdb_rating: Paskutinį kartą iš IMDb parsiųstas reitingas (gali būti tuščias).
+    - imdb_votes: IMDb balsų skaičius (gali būti tuščias).
+    - imdb_synced_at: Paskutinio sėkmingo IMDb sinchronizavimo laikas (tuščias, jei dar nesinchronizuota).
+    - updated_at: Paskutinio filmo puslapio turinio pakeitimo laikas (nustatomas automatiškai; keičiamas ir
+      ištrynus apžvalgą ar pervadinus žanrą ar režisierių).
+
+    Meta:
+    - indexes: year indeksas filtravimui ir metų facetui, (title, id) – sąrašui pagal pavadinimą.
 
     Metodai:
     - display_genres(): Gražina pirmus tris filmo žanrus kaip eilutę.
@@ -60,6 +73,19 @@ class Movie(models.Model):
     director = models.ForeignKey(Director, on_delete=models.SET_NULL, null=True, blank=True)
     imdb_id = models.CharField(max_length=20, blank=True, null=True, unique=True)
     image = models.ImageField(upload_to='movie_images/', blank=True, null=True)
+    poster_hash = models.CharField(max_length=16, blank=True, editable=False)
+    poster_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    poster_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    imdb_rating = models.FloatField(blank=True, null=True)
+    imdb_votes = models.PositiveIntegerField(blank=True, null=True)
+    imdb_synced_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['year'], name='movie_year_idx'),
+            models.Index(fields=['title', 'id'], name='movie_title_idx'),
+        ]
 
     def display_genres(self):
         res = ', '.join(elem.name for elem in self.genres.all()[:3])
@@ -69,6 +95,16 @@ class Movie(models.Model):
         return self.title
 
 
+class PublicReviewManager(models.Manager):
+    """
+    Tik patvirtintos apžvalgos – jas mato lankytojai. Sąlyga `approved` sutampa su daliniais Review
+    indeksais, todėl viešos užklausos skaito tik patvirtintų apžvalgų indeksą.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(approved=True)
+
+
 class Review(models.Model):
     """
     Modelis, skirtas filmų apžvalgoms saugoti.
@@ -81,6 +117,22 @@ class Review(models.Model):
     - rating: Įvertinimas nuo 1 iki 5 (pasirinkimų laukas).
     - created_at: Apžvalgos sukūrimo data ir laikas (nustatomas automatiškai).
     - approved: Laukas, nurodantis, ar apžvalga patvirtinta (numatytasis – `False`).
+    - likes_count, dislikes_count: Denormalizuoti reakcijų skaitikliai, kuriuos palaiko Reaction signalai.
+    - comments_count: Denormalizuotas komentarų skaitiklis, kurį palaiko Comment signalai (filmo puslapyje
+      rodomas skaičius ir tik keli pirmieji komentarai).
+    - updated_at: Paskutinio pakeitimo laikas (nustatomas automatiškai; keičiamas ir pasikeitus apžvalgos
+      komentarams ar reakcijoms).
+    - moderated_at: Kada moderatorius patvirtino ar atmetė apžvalgą (None – dar laukia moderavimo).
+
+    Valdytojai:
+    - objects: Visos apžvalgos (administravimui, autoriaus apžvalgoms, eksportui).
+    - public: Tik patvirtintos apžvalgos (PublicReviewManager) – visoms viešoms užklausoms.
+
+    Meta:
+    - indexes: Sudėtiniai (created_at, id) indeksai visam sąrašui, vartotojo ir filmo apžvalgoms,
+      naudojami puslapiavimui pagal žymeklį ir rikiavimui be laikinų B-medžių. Viešo sąrašo ir filmo
+      apžvalgų indeksai daliniai (tik patvirtintos), o review_pending_idx apima tik moderavimo eilę.
+      review_moderated_idx – patvirtinimo laikas populiarumo įvykiams.
 
     Metodai:
     - __str__(): Grąžina apžvalgos pavadinimą kartu su vartotojo vardu kaip teksto atvaizdavimą.
@@ -92,6 +144,26 @@ class Review(models.Model):
     rating = models.PositiveSmallIntegerField(choices=[(i, str(i)) for i in range(1, 6)])
     created_at = models.DateTimeField(auto_now_add=True)
     approved = models.BooleanField(default=False)
+    likes_count = models.PositiveIntegerField(default=0)
+    dislikes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    moderated_at = models.DateTimeField(null=True, blank=True)
+
+    objects = models.Manager()
+    public = PublicReviewManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='review_created_idx',
+                         condition=models.Q(approved=True)),
+            models.Index(fields=['user', '-created_at', '-id'], name='review_user_created_idx'),
+            models.Index(fields=['movie', 'created_at', 'id'], name='review_movie_created_idx',
+                         condition=models.Q(approved=True)),
+            models.Index(fields=['created_at', 'id'], name='review_pending_idx',
+                         condition=models.Q(approved=False, moderated_at__isnull=True)),
+            models.Index(fields=['moderated_at'], name='review_moderated_idx', condition=models.Q(approved=True)),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -106,6 +178,11 @@ class Comment(models.Model):
     - user: Užsienio raktas į vartotoją, kuris parašė komentarą (susieta su User modeliu).
     - content: Komentaro turinys.
     - created_at: Komentaro sukūrimo data ir laikas (nustatomas automatiškai).
+    - updated_at: Paskutinio pakeitimo laikas (nustatomas automatiškai).
+
+    Meta:
+    - indexes: created_at indeksas naujų įvykių atrinkimui (populiarumo skaičiavimui) ir
+      (review, created_at, id) – apžvalgos komentarams chronologine tvarka.
 
     Metodai:
     - __str__(): Grąžina vartotojo vardą ir apžvalgos pavadinimą kaip teksto atvaizdavimą.
@@ -114,6 +191,13 @@ class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='comment_created_idx'),
+            models.Index(fields=['review', 'created_at', 'id'], name='comment_review_created_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.review.title}"
@@ -129,11 +213,18 @@ class Reaction(models.Model):
     - user: Užsienio raktas į vartotoją, kuris paliko reakciją (susieta su User modeliu).
     - review: Užsienio raktas į apžvalgą, kuriai taikoma reakcija (susieta su Review modeliu).
     - reaction_type: Reakcijos tipas ("like" arba "dislike").
+    - created_at: Reakcijos sukūrimo data ir laikas (nustatomas automatiškai).
+    - updated_at: Paskutinio pakeitimo (pvz. tipo keitimo) laikas (nustatomas automatiškai).
+    - liked_at: Kada reakcija pirmą kartą tapo „patinka“ (vėliau nebekeičiamas; tuščias, jei niekada).
 
     Meta:
     - unique_together: Užtikrina, kad vienas vartotojas gali palikti tik vieną reakciją tam pačiam atsiliepimui.
+    - indexes: liked_at indeksas naujų „patinka“ atrinkimui (populiarumo skaičiavimui) ir
+      (review, reaction_type) – apžvalgos reakcijų skaičiavimui pagal tipą.
 
     Metodai:
+    - save(): Išsaugo reakciją transakcijoje, kad apžvalgos skaitikliai būtų atnaujinti kartu; pirmą
+      „patinka“ pažymi liked_at.
     - __str__(): Grąžina vartotojo vardą, reakcijos tipą ir apžvalgos pavadinimą kaip teksto atvaizdavimą.
     """
     LIKE = 'like'
@@ -146,9 +237,161 @@ class Reaction(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='reactions')
     reaction_type = models.CharField(max_length=10, choices=[('like', 'Like'), ('dislike', 'Dislike')])
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    liked_at = models.DateTimeField(blank=True, null=True, editable=False)
 
     class Meta:
         unique_together = ('user', 'review')
+        indexes = [
+            models.Index(fields=['liked_at'], name='reaction_liked_idx'),
+            models.Index(fields=['review', 'reaction_type'], name='reaction_review_type_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.reaction_type == self.LIKE and self.liked_at is None:
+            self.liked_at = timezone.now()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.username} {self.reaction_type} {self.review}"
+
+
+class MovieStats(models.Model):
+    """
+    Modelis, skirtas filmo patvirtintų apžvalgų suvestinei saugoti, kad vidurkio ir pasiskirstymo
+    nereikėtų skaičiuoti kiekvienos užklausos metu.
+
+    Laukai:
+    - movie: Filmas (pirminis raktas, vienas įrašas filmui).
+    - review_count: Patvirtintų apžvalgų skaičius.
+    - rating_sum: Įvertinimų suma.
+    - rating_mean: Įvertinimų vidurkis (tuščias, jei apžvalgų nėra).
+      Įrašas yra kiekvienam filmui, ir tiems, kurie dar neturi apžvalgų.
+    - rating_1 ... rating_5: Kiek apžvalgų įvertino filmą atitinkamu balu (histograma).
+    - last_review_at: Naujausios patvirtintos apžvalgos laikas (gali būti tuščias).
+
+    Meta:
+    - indexes: (rating_mean, review_count, movie) ir (review_count, movie) indeksai filmų rikiavimui pagal
+      įvertinimą ir apžvalgų skaičių (indekso tvarka, be laikinų B-medžių).
+
+    Metodai:
+    - histogram(): Grąžina (balas, kiekis, procentai) eilutes nuo 5 iki 1.
+    """
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_mean = models.FloatField(blank=True, null=True)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+    last_review_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-rating_mean', '-review_count', 'movie'], name='moviestats_rating_idx'),
+            models.Index(fields=['-review_count', 'movie'], name='moviestats_reviews_idx'),
+        ]
+
+    def histogram(self):
+        total = self.review_count or 1
+        return [(rating, getattr(self, f'rating_{rating}'), round(100 * getattr(self, f'rating_{rating}') / total))
+                for rating in range(5, 0, -1)]
+
+    def __str__(self):
+        return f"{self.movie_id}: {self.rating_mean} ({self.review_count})"
+
+
+class TrendingScore(models.Model):
+    """
+    Modelis, skirtas filmo populiarumo įverčiui saugoti: laike slopstanti naujų apžvalgų, komentarų ir
+    teigiamų reakcijų suma. Visi įverčiai apskaičiuoti paskutinio populiarumo užduoties vykdymo momentu.
+
+    Laukai:
+    - movie: Filmas (pirminis raktas).
+    - score: Slopstantis įvertis.
+    """
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    score = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.movie_id}: {self.score:.3f}"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Modelis, skirtas iš anksto surikiuotiems filmų sąrašams (geriausiai įvertinti, populiarūs) saugoti.
+
+    Laukai:
+    - TOP_RATED, TRENDING: Galimi sąrašų tipai.
+    - kind: Sąrašo tipas.
+    - rank: Vieta sąraše (0 – pirma).
+    - movie: Filmas.
+    - score: Įvertis, pagal kurį surikiuota.
+
+    Meta:
+    - unique_together: Kiekvienoje sąrašo vietoje – vienas filmas; (kind, rank) indeksas naudojamas puslapiams.
+    """
+    TOP_RATED = 'top_rated'
+    TRENDING = 'trending'
+    KIND_CHOICES = [
+        (TOP_RATED, 'Top rated'),
+        (TRENDING, 'Trending'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    rank = models.PositiveSmallIntegerField()
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('kind', 'rank')
+
+    def __str__(self):
+        return f"{self.kind} #{self.rank + 1}: {self.movie_id}"
+
+
+class MovieNeighbor(models.Model):
+    """
+    Modelis, skirtas iš anksto apskaičiuotiems panašiems filmams saugoti (item-item rekomendacijos).
+
+    Laukai:
+    - movie: Filmas, kuriam skaičiuojami kaimynai.
+    - neighbor: Panašus filmas.
+    - score: Panašumo įvertis (koreguotas kosinusas pagal vartotojų įvertinimus).
+    - rank: Kaimyno vieta sąraše (0 – panašiausias).
+
+    Meta:
+    - unique_together: Vienas filmas turi tik vieną kaimyną kiekvienoje vietoje.
+    """
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='neighbor_of')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('movie', 'rank')
+
+    def __str__(self):
+        return f"{self.movie} -> {self.neighbor} ({self.score:.3f})"
+
+
+class JobState(models.Model):
+    """
+    Modelis, skirtas periodinių užduočių būsenai saugoti (pvz. kada paskutinį kartą perskaičiuotos rekomendacijos).
+
+    Laukai:
+    - name: Užduoties pavadinimas (unikalus).
+    - last_run_at: Paskutinio sėkmingo vykdymo pradžios laikas (gali būti tuščias).
+    - recent_events: Paskutinio vykdymo įskaitytų įvykių, patekusių į persidengimo langą, raktai – kitas
+      vykdymas jų neskaičiuoja antrą kartą.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_run_at = models.DateTimeField(blank=True, null=True)
+    recent_events = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from . import caching, stats
+from .freshness import TOUCH_BATCH
+from .models import Review
+
+
+def pending_reviews():
+    """
+    Moderavimo eilė: nepatvirtintos ir dar neperžiūrėtos apžvalgos. Sąlyga sutampa su daliniu
+    review_pending_idx indeksu, todėl eilė skaitoma (created_at, id) tvarka be visos lentelės nuskaitymo.
+    """
+    return Review.objects.filter(approved=False, moderated_at__isnull=True)
+
+
+def moderate_reviews(reviews, approve):
+    """
+    Patvirtina arba atmeta apžvalgas vienu UPDATE sakiniu, apeidamas Review signalus.
+
+    Suvestinės perskaičiuojamos ir talpyklos pasendinamos vieną kartą visam paketui: paveiktų filmų
+    MovieStats sulyginamos su rebuild_stats, o apžvalgų sąrašo ir tų filmų puslapių versijos pakeičiamos
+    vienu bump. Atmesta apžvalga lieka nepatvirtinta, bet iškrenta iš moderavimo eilės. moderated_at žyma
+    paveiktus filmus perskaičiuoja ir kitas inkrementinis kaimynų (recommendations.refresh_neighbors) vykdymas.
+
+    :param reviews: apžvalgų užklausa (pvz. administravimo veiksmo queryset) arba jų ID sąrašas
+    :param approve: True – patvirtinti, False – atmesti
+    :return: pakeistų apžvalgų skaičius
+    """
+    if not isinstance(reviews, QuerySet):
+        reviews = Review.objects.filter(pk__in=list(reviews))
+    # Jau tokios būsenos apžvalgos neliečiamos, kad nepasikeistų jų updated_at ir moderated_at.
+    changed = reviews.filter(Q(approved=False) if approve else Q(approved=True) | Q(moderated_at__isnull=True))
+    now = timezone.now()
+    with transaction.atomic():
+        movie_ids = sorted(set(changed.order_by().values_list('movie_id', flat=True).distinct()))
+        count = changed.order_by().update(approved=approve, moderated_at=now, updated_at=now)
+        if count:
+            for start in range(0, len(movie_ids), TOUCH_BATCH):
+                stats.rebuild_stats(movie_ids[start:start + TOUCH_BATCH])
+            caching.bump(caching.REVIEWS, *(caching.movie_scope(movie_id) for movie_id in movie_ids))
+    return count
+
+
+def approve_reviews(reviews):
+    return moderate_reviews(reviews, approve=True)
+
+
+def reject_reviews(reviews):
+    return moderate_reviews(reviews, approve=False)
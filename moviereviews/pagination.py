@@ -0,0 +1,166 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import AutoField, BigAutoField, Max, Q
+from django.utils.functional import cached_property
+
+
+class KeysetPage:
+    """
+    Vienas keyset puslapis.
+
+    Atributai:
+    - object_list: Puslapio objektai.
+    - next_cursor: Nepermatomas žymeklis kitam puslapiui arba None, jei tai paskutinis puslapis.
+    """
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Puslapiavimas pagal žymeklį (keyset / cursor), o ne pagal OFFSET.
+
+    Kitas puslapis atrenkamas sąlyga „po paskutinio matyto įrašo“ (pvz. `(created_at, id) < (c, i)`),
+    todėl bet kurio gilaus puslapio kaina tokia pati kaip pirmojo, jei rikiavimo laukams yra indeksas.
+    Paskutinis rikiavimo laukas turi būti unikalus (dažniausiai `id`).
+
+    :param queryset: užklausa, kurią reikia puslapiuoti
+    :param per_page: įrašų skaičius puslapyje
+    :param ordering: rikiavimo laukai, pvz. ('-created_at', '-id')
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.model_fields = [queryset.model._meta.get_field(name) for name, _ in self.ordering]
+
+    def get_page(self, cursor=None):
+        """
+        Grąžina puslapį po nurodyto žymeklio. Netinkamas ar tuščias žymeklis reiškia pirmą puslapį.
+        """
+        queryset = self.queryset.order_by(*(('-' if desc else '') + name for name, desc in self.ordering))
+        values = self.decode_cursor(cursor)
+        if values is not None:
+            queryset = queryset.filter(self._after(values))
+
+        rows = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            next_cursor = self.encode_cursor(rows[-1])
+        return KeysetPage(rows, next_cursor)
+
+    def _after(self, values):
+        condition = Q()
+        equal = Q()
+        for (name, desc), value in zip(self.ordering, values):
+            condition |= equal & Q(**{f"{name}__{'lt' if desc else 'gt'}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, obj):
+        values = [field.value_to_string(obj) for field in self.model_fields]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if not isinstance(values, list) or len(values) != len(self.model_fields):
+                return None
+            return [field.to_python(value) for field, value in zip(self.model_fields, values)]
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+
+class CountedPaginator(Paginator):
+    """
+    Įprastas Django Paginator, kuriam bendras įrašų skaičius jau žinomas (pvz. iš facetų talpyklos),
+    todėl atskiras COUNT(*) užklausimas nevykdomas.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.__dict__['count'] = count
+
+
+def estimated_count(queryset):
+    """
+    Apytikslis visos modelio lentelės įrašų skaičius be COUNT(*) arba None, jei jo gauti nepavyksta.
+
+    PostgreSQL – planuotojo statistika (`pg_class.reltuples`); kitoms DB (SQLite) – didžiausias sveikasis
+    pirminis raktas, randamas vienu žingsniu B-medžiu. Ištrinti įrašai įvertį kiek padidina.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+            row = cursor.fetchone()
+        return row[0] if row and row[0] >= 0 else None
+    if isinstance(model._meta.pk, (AutoField, BigAutoField)):
+        return model._default_manager.using(queryset.db).aggregate(last=Max('pk'))['last'] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Puslapiavimas didelėms lentelėms (administravimo sąrašams): nefiltruoto sąrašo įrašų skaičius imamas iš
+    estimated_count, kai įvertis viršija `estimate_threshold`, todėl kiekvienas puslapis neskaičiuoja visos
+    lentelės COUNT(*). Filtruoti sąrašai ir mažos lentelės skaičiuojami tiksliai.
+
+    Įvertis po trynimų būna per didelis, todėl jis patikslinamas, kai puslapis grįžta trumpesnis nei `per_page`:
+    tada tikras skaičius – ankstesnių puslapių įrašai ir šio puslapio eilutės. Tuščias puslapis (už tikrojo
+    sąrašo galo) tikslų skaičių sužino iš COUNT(*) ir, kaip įprastas Paginator, išmeta EmptyPage.
+
+    Atributai:
+    - estimate_threshold: Nuo kokio įverčio tikslus skaičius nebeskaičiuojamas.
+    - estimated: Ar `count` – tik įvertis.
+    """
+    estimate_threshold = 10_000
+    estimated = False
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate > self.estimate_threshold:
+                self.estimated = True
+                return estimate
+        return super().count
+
+    def page(self, number):
+        page = super().page(number)
+        if not self.estimated:
+            return page
+        page.object_list = list(page.object_list)
+        if len(page.object_list) < self.per_page:
+            if page.object_list:
+                self._set_count((page.number - 1) * self.per_page + len(page.object_list))
+            else:
+                self._set_count(self.object_list.count())
+                self.validate_number(page.number)
+        return page
+
+    def _set_count(self, count):
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+        self.estimated = False
@@ -0,0 +1,45 @@
+from django.db.models import Prefetch
+
+from .models import Comment, Movie, Review
+from .pagination import KeysetPaginator
+
+# Filmo puslapyje rodomi tik pirmieji komentarai, o likusieji – užkraunami puslapiais pagal poreikį.
+COMMENT_ORDERING = ('created_at', 'id')
+COMMENT_PREVIEW = 3
+COMMENTS_PER_PAGE = 20
+
+
+def movie_detail_queryset():
+    """
+    Filmų užklausa detalės puslapiui: režisierius ir įvertinimų suvestinė prijungiami tame pačiame SELECT,
+    žanrai užkraunami vienu papildomu.
+    """
+    return Movie.objects.select_related('director', 'stats').prefetch_related('genres')
+
+
+def movie_reviews_queryset(movie):
+    """
+    Filmo patvirtintos apžvalgos su visais šablone naudojamais ryšiais.
+
+    Kiekvienai apžvalgai užkraunami tik pirmieji COMMENT_PREVIEW komentarai (`comment_preview`) su autoriais –
+    vienu papildomu užklausimu visoms apžvalgoms (ROW_NUMBER() per apžvalgą), o komentarų ir like/dislike
+    skaičiai imami iš denormalizuotų Review laukų. Taip užklausų skaičius ir puslapio dydis nepriklauso nuo
+    komentarų kiekio; likusieji komentarai užkraunami review_comments maršrutu.
+    """
+    # Ribotas prefetch numeruoja komentarus PARTITION BY review_id ORDER BY (created_at, id) – tai sutampa su
+    # comment_review_created_idx, todėl laikiname B-medyje rikiuojami tik atrinkti pirmieji komentarai.
+    comments = Comment.objects.select_related('user').order_by(*COMMENT_ORDERING)
+    return (Review.public
+            .filter(movie=movie)
+            .select_related('user')
+            .prefetch_related(Prefetch('comments', queryset=comments[:COMMENT_PREVIEW], to_attr='comment_preview'))
+            .order_by('created_at', 'id'))
+
+
+def review_comments_paginator(review_id, per_page=COMMENTS_PER_PAGE):
+    """
+    Apžvalgos komentarai su autoriais, puslapiuojami pagal (created_at, id) žymeklį
+    comment_review_created_idx indeksu.
+    """
+    comments = Comment.objects.filter(review_id=review_id).select_related('user')
+    return KeysetPaginator(comments, per_page, COMMENT_ORDERING)
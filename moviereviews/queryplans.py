@@ -0,0 +1,105 @@
+import re
+from dataclasses import dataclass
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+TEMP_BTREE = 'USE TEMP B-TREE'
+COROUTINE = 'CO-ROUTINE '
+
+# Django riboto prefetch (ROW_NUMBER() OVER ... ir filtras pagal jį) išorinės užklausos subužklausa.
+QUALIFY = 'qualify'
+
+# SQLite schemos lentelė (pvz. FTS lentelės patikrinimas) – kelios dešimtys eilučių.
+DEFAULT_ALLOWED_SCANS = ('sqlite_master',)
+
+# Užklausa be WHERE, surikiuota tik pagal pirminį raktą ir ribojama LIMIT: `SCAN t` eina lentelės B-medžiu
+# rowid tvarka (pirmyn arba atgal) ir sustoja po LIMIT eilučių, todėl tai ne pilnas nuskaitymas.
+ORDERED_LIMIT_RE = re.compile(r'^(?!.*\bWHERE\b).*\bORDER BY "\w+"\."id" (?:ASC|DESC) LIMIT \d+', re.DOTALL)
+
+
+@dataclass
+class PlanProblem:
+    """
+    Vienos užklausos plano problema.
+
+    Atributai:
+    - sql: Užklausa.
+    - detail: Probleminė EXPLAIN QUERY PLAN eilutė, pvz. 'SCAN moviereviews_review'.
+    - plan: Visos plano eilutės.
+    """
+    sql: str
+    detail: str
+    plan: list
+
+    def __str__(self):
+        plan = '\n'.join(f'    {line}' for line in self.plan)
+        return f'{self.detail}\n  {self.sql}\n{plan}'
+
+
+def explain(sql, params=(), using='default'):
+    """
+    :return: SQLite EXPLAIN QUERY PLAN eilučių `detail` stulpeliai
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(sql, plan, allowed_scans=()):
+    """
+    Randa pilnus lentelių nuskaitymus (be indekso) ir laikinus B-medžius rikiavimui ar grupavimui.
+
+    Neskaitomi problemomis: nuskaitymai indekso tvarka (`SCAN t USING [COVERING] INDEX`), rowid tvarka
+    su LIMIT ir be filtro, FTS5 virtualios lentelės ir jų atitikmenų rikiavimas pagal bm25 (aktualumo
+    neįmanoma indeksuoti, o rikiuojamos tik rastos eilutės), subužklausų (CO-ROUTINE) eilučių skaitymas ir
+    rikiavimas po lango funkcijos filtro (`qualify`), kuris rikiuoja tik jau atrinktas eilutes.
+
+    :param allowed_scans: lentelės, kurias leidžiama nuskaityti visas (pvz. kelių eilučių žinynai)
+    :return: PlanProblem sąrašas
+    """
+    allowed_scans = (*DEFAULT_ALLOWED_SCANS, *allowed_scans)
+    full_text = any('VIRTUAL TABLE' in detail for detail in plan)
+    coroutines = {detail[len(COROUTINE):].split()[0] for detail in plan if detail.startswith(COROUTINE)}
+    qualified = False
+    problems = []
+    for detail in plan:
+        if detail.startswith('SCAN '):
+            table = detail.split()[1]
+            if table in coroutines:
+                qualified = qualified or table == QUALIFY
+                continue
+            if ' USING ' in detail or 'VIRTUAL TABLE' in detail or table in allowed_scans:
+                continue
+            if ORDERED_LIMIT_RE.search(sql) and not any(line.startswith(TEMP_BTREE) for line in plan):
+                continue
+            problems.append(PlanProblem(sql, detail, plan))
+        elif detail.startswith(TEMP_BTREE) and not full_text and not qualified:
+            problems.append(PlanProblem(sql, detail, plan))
+    return problems
+
+
+def capture_plans(func, using='default', allowed_scans=()):
+    """
+    Įvykdo `func()` (pvz. užklausą testų klientu), surenka visas jos SELECT užklausas ir patikrina jų planus.
+
+    Naudojama testuose karštiems keliams (filmo puslapiui, sąrašams, paieškai): nauja užklausa be tinkamo
+    indekso pasirodo kaip PlanProblem dar prieš tai, kai duomenų kiekis ją padaro lėta.
+
+    :param allowed_scans: žr. plan_problems
+    :return: (func rezultatas, PlanProblem sąrašas)
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        raise ValueError('EXPLAIN QUERY PLAN analizė palaikoma tik SQLite.')
+    with CaptureQueriesContext(connection) as captured:
+        result = func()
+    problems = []
+    seen = set()
+    for query in captured.captured_queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith('SELECT') or sql in seen:
+            continue
+        seen.add(sql)
+        problems.extend(plan_problems(sql, explain(sql, using=using), allowed_scans))
+    return result, problems
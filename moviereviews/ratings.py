@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from imdb import IMDb
+
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_imdb_id(imdb_id):
+    """
+    Pašalina 'tt' priešdėlį iš IMDb identifikatoriaus.
+
+    :param imdb_id: IMDb ID, pvz. 'tt0172495'
+    :return: skaitinė ID dalis, kurią priima IMDb klientas, pvz. '0172495'
+    """
+    imdb_id = (imdb_id or '').strip()
+    if imdb_id.startswith('tt'):
+        return imdb_id[2:]
+    return imdb_id
+
+
+class RatingProvider(ABC):
+    """
+    Abstrakti reitingų tiekėjo klasė. Tiekėjas (IMDB_RATING_PROVIDER BACKEND) privalo įgyvendinti get_rating.
+
+    Metodai:
+    - get_rating(imdb_id): Grąžina filmo reitingą arba None, jei reitingo nėra.
+    - get_metadata(imdb_id): Grąžina žodyną su reitingu ir balsų skaičiumi.
+    """
+
+    @abstractmethod
+    def get_rating(self, imdb_id):
+        """
+        :param imdb_id: IMDb ID, pvz. 'tt0172495'
+        :return: reitingas arba None
+        """
+
+    def get_metadata(self, imdb_id):
+        return {'rating': self.get_rating(imdb_id), 'votes': None}
+
+
+class IMDbRatingProvider(RatingProvider):
+    """
+    Reitingų tiekėjas, kuris kreipiasi į IMDb per cinemagoer klientą.
+
+    Klientas sukuriamas vieną kartą kiekvienai gijai ir naudojamas pakartotinai visoms jos užklausoms.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = IMDb()
+        return client
+
+    def get_rating(self, imdb_id):
+        return self.get_metadata(imdb_id)['rating']
+
+    def get_metadata(self, imdb_id):
+        with timed('imdb'):
+            imdb_movie = self.client.get_movie(normalize_imdb_id(imdb_id))
+        return {'rating': imdb_movie.get('rating', None), 'votes': imdb_movie.get('votes', None)}
+
+
+class FakeRatingProvider(RatingProvider):
+    """
+    Vietinis reitingų tiekėjas testams ir darbui be interneto.
+
+    Atributai:
+    - ratings: Žodynas {imdb_id: reitingas}.
+    - delay: Dirbtinis atsakymo vėlinimas sekundėmis (tinklo imitacija apkrovos testams).
+    - calls: Visų užklaustų IMDb ID sąrašas (patogu tikrinti testuose).
+    """
+
+    def __init__(self, ratings=None, delay=0):
+        self.ratings = dict(ratings or {})
+        self.delay = delay
+        self.calls = []
+
+    def get_rating(self, imdb_id):
+        self.calls.append(imdb_id)
+        if self.delay:
+            time.sleep(self.delay)
+        return self.ratings.get(imdb_id)
+
+
+class _Entry:
+    __slots__ = ('rating', 'fresh_until', 'stale_until')
+
+    def __init__(self, rating, fresh_until, stale_until):
+        self.rating = rating
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class CachedRatingProvider(RatingProvider):
+    """
+    Ribotos apimties talpykla bet kuriam reitingų tiekėjui.
+
+    - Kiekvienas įrašas galioja `ttl` sekundžių.
+    - Pasibaigus galiojimui, dar `stale_ttl` sekundžių grąžinamas senas reitingas,
+      o naujas parsiunčiamas fone (stale-while-revalidate).
+    - Kai įrašų daugiau nei `max_entries`, pašalinamas seniausiai naudotas (LRU).
+    - Jei filmas neturi reitingo, tai įsimenama `negative_ttl` sekundžių.
+    - Jei tiekėjas meta klaidą, grąžinamas turimas (net ir senas) reitingas arba None, ir jis taip pat
+      įsimenamas `negative_ttl` sekundžių, kad neveikiant IMDb kiekviena užklausa nelauktų tiekėjo.
+    - Kelios vienu metu to paties filmo laukiančios užklausos kreipiasi į tiekėją vieną kartą.
+    """
+
+    def __init__(self, provider, max_entries=1000, ttl=3600, stale_ttl=86400, negative_ttl=600,
+                 executor=None, clock=time.monotonic):
+        self.provider = provider
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.executor = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix='imdb-refresh')
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._fetching = {}
+        self._lock = threading.Lock()
+
+    def get_rating(self, imdb_id):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(imdb_id)
+            if entry is not None:
+                self._entries.move_to_end(imdb_id)
+
+        if entry is None:
+            return self._fetch(imdb_id)
+        if now < entry.fresh_until:
+            return entry.rating
+        if now < entry.stale_until:
+            self._schedule_refresh(imdb_id)
+            return entry.rating
+        return self._fetch(imdb_id, fallback=entry)
+
+    def _fetch(self, imdb_id, fallback=None):
+        with self._lock:
+            pending = self._fetching.get(imdb_id)
+            if pending is None:
+                pending = self._fetching[imdb_id] = Future()
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            return pending.result()
+
+        rating = fallback.rating if fallback is not None else None
+        try:
+            try:
+                rating = self.provider.get_rating(imdb_id)
+            except Exception:
+                logger.warning('Nepavyko gauti IMDb reitingo %s', imdb_id, exc_info=True)
+                self._store(imdb_id, rating, self.negative_ttl)
+            else:
+                self._store(imdb_id, rating)
+        finally:
+            with self._lock:
+                del self._fetching[imdb_id]
+            # Laukiančios užklausos gauna tą patį rezultatą.
+            pending.set_result(rating)
+        return rating
+
+    def _store(self, imdb_id, rating, ttl=None):
+        if ttl is None:
+            ttl = self.ttl if rating is not None else self.negative_ttl
+        now = self.clock()
+        with self._lock:
+            self._entries[imdb_id] = _Entry(rating, now + ttl, now + ttl + self.stale_ttl)
+            self._entries.move_to_end(imdb_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _schedule_refresh(self, imdb_id):
+        with self._lock:
+            if imdb_id in self._refreshing:
+                return
+            self._refreshing.add(imdb_id)
+        self.executor.submit(self._refresh, imdb_id)
+
+    def _refresh(self, imdb_id):
+        try:
+            with self._lock:
+                fallback = self._entries.get(imdb_id)
+            self._fetch(imdb_id, fallback=fallback)
+        finally:
+            with self._lock:
+                self._refreshing.discard(imdb_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Kiek sekundžių asinchroninis rodinys laukia IMDb reitingo.
+DEFAULT_TIMEOUT = 2.0
+# IMDb užklausos beveik visą laiką laukia tinklo, todėl joms skiriama daugiau gijų nei numatytame
+# asyncio vykdytuve (min(32, CPU + 4)), kuris su vienu CPU leistų tik 5 vienu metu.
+FETCH_THREADS = 32
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_rating_provider():
+    """
+    Grąžina bendrą, nustatymuose (IMDB_RATING_PROVIDER ir IMDB_RATING_CACHE) aprašytą reitingų tiekėją.
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = _build_provider()
+        return _provider
+
+
+async def aget_rating(imdb_id, timeout=None):
+    """
+    Asinchroniniams rodiniams: reitingas parsiunčiamas atskiroje gijoje (ne DB gijoje), todėl gali
+    vykti kartu su DB užklausomis. Jei tiekėjas neatsako per `timeout` sekundžių (IMDB_RATING_TIMEOUT),
+    grąžinamas None, o pradėta užklausa baigiama fone ir jos rezultatas lieka tiekėjo talpykloje.
+
+    :return: reitingas arba None
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'IMDB_RATING_TIMEOUT', DEFAULT_TIMEOUT)
+    fetch = sync_to_async(get_rating_provider().get_rating, thread_sensitive=False, executor=_fetch_executor())
+    try:
+        return await asyncio.wait_for(fetch(imdb_id), timeout)
+    except asyncio.TimeoutError:
+        logger.warning('IMDb reitingas %s negautas per %s s', imdb_id, timeout)
+        return None
+
+
+def _fetch_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FETCH_THREADS, thread_name_prefix='imdb-fetch')
+        return _executor
+
+
+def create_backend_provider():
+    """
+    Sukuria naują, talpykla neapgaubtą IMDB_RATING_PROVIDER tiekėją (pvz. paketiniam sinchronizavimui).
+    """
+    config = getattr(settings, 'IMDB_RATING_PROVIDER', {})
+    backend = import_string(config.get('BACKEND', 'moviereviews.ratings.IMDbRatingProvider'))
+    return backend(**config.get('OPTIONS', {}))
+
+
+def _build_provider():
+    provider = create_backend_provider()
+
+    cache_config = getattr(settings, 'IMDB_RATING_CACHE', None)
+    if not cache_config:
+        return provider
+    return CachedRatingProvider(
+        provider,
+        max_entries=cache_config.get('MAX_ENTRIES', 1000),
+        ttl=cache_config.get('TTL', 3600),
+        stale_ttl=cache_config.get('STALE_TTL', 86400),
+        negative_ttl=cache_config.get('NEGATIVE_TTL', 600),
+    )
+
+
+@receiver(setting_changed)
+def _reset_provider(setting, **kwargs):
+    global _provider
+    if setting in ('IMDB_RATING_PROVIDER', 'IMDB_RATING_CACHE'):
+        with _provider_lock:
+            _provider = None
@@ -0,0 +1,84 @@
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from . import caching
+from .models import Reaction, Review
+
+COUNTER_FIELDS = {
+    Reaction.LIKE: 'likes_count',
+    Reaction.DISLIKE: 'dislikes_count',
+}
+
+
+def adjust_reaction_counts(review_id, added=None, removed=None):
+    """
+    Atnaujina apžvalgos like/dislike skaitiklius vienu UPDATE sakiniu.
+
+    :param review_id: apžvalgos ID
+    :param added: reakcijos tipas, kurio skaitiklį reikia padidinti vienetu (arba None)
+    :param removed: reakcijos tipas, kurio skaitiklį reikia sumažinti vienetu (arba None)
+    """
+    if added == removed:
+        return
+    changes = {}
+    if added in COUNTER_FIELDS:
+        changes[COUNTER_FIELDS[added]] = F(COUNTER_FIELDS[added]) + 1
+    if removed in COUNTER_FIELDS:
+        changes[COUNTER_FIELDS[removed]] = F(COUNTER_FIELDS[removed]) - 1
+    if changes:
+        Review.objects.filter(pk=review_id).update(updated_at=timezone.now(), **changes)
+
+
+def upsert_reaction(user_id, review_id, reaction_type):
+    """
+    Įrašo arba pakeičia vartotojo reakciją į patvirtintą apžvalgą ir atnaujina jos skaitiklius be modelių
+    objektų ir signalų.
+
+    1. INSERT ... SELECT ... ON CONFLICT(user_id, review_id) DO UPDATE ... WHERE RETURNING – nauja reakcija
+       arba kito tipo reakcijos pakeitimas vienu sakiniu. SELECT iš apžvalgų lentelės kartu patikrina, ar
+       apžvalga egzistuoja ir yra patvirtinta; tas pats balsas nieko neatnaujina ir nieko negrąžina.
+       Įterptos eilutės created_at lygus updated_at, o pakeitimas gali būti tik iš kito tipo.
+    2. Jei kas nors pasikeitė – skaitiklių UPDATE ... RETURNING; kitaip tik nuskaitomi skaitikliai.
+
+    Kviesti transakcijoje. Signalai nevykdomi, todėl filmo puslapio talpyklos versija keičiama čia.
+
+    :return: žodynas su movie_id, likes, dislikes ir changed arba None, jei patvirtintos apžvalgos nėra
+    """
+    reaction_table = connection.ops.quote_name(Reaction._meta.db_table)
+    review_table = connection.ops.quote_name(Review._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {reaction_table} (user_id, review_id, reaction_type, created_at, updated_at, liked_at) '
+            f'SELECT %s, id, %s, %s, %s, %s FROM {review_table} WHERE id = %s AND approved '
+            f'ON CONFLICT (user_id, review_id) DO UPDATE SET reaction_type = excluded.reaction_type, '
+            f'updated_at = excluded.updated_at, liked_at = COALESCE({reaction_table}.liked_at, excluded.liked_at) '
+            f'WHERE {reaction_table}.reaction_type <> excluded.reaction_type RETURNING created_at = updated_at',
+            [user_id, reaction_type, now, now, now if reaction_type == Reaction.LIKE else None, review_id],
+        )
+        row = cursor.fetchone()
+        changed = row is not None
+        removed = None
+        if changed and not row[0]:
+            removed = next(other for other in COUNTER_FIELDS if other != reaction_type)
+
+        if changed:
+            assignments = ['updated_at = %s', f'{COUNTER_FIELDS[reaction_type]} = {COUNTER_FIELDS[reaction_type]} + 1']
+            if removed:
+                assignments.append(f'{COUNTER_FIELDS[removed]} = {COUNTER_FIELDS[removed]} - 1')
+            cursor.execute(
+                f'UPDATE {review_table} SET {", ".join(assignments)} WHERE id = %s '
+                f'RETURNING movie_id, likes_count, dislikes_count',
+                [now, review_id],
+            )
+        else:
+            cursor.execute(f'SELECT movie_id, likes_count, dislikes_count FROM {review_table} '
+                           f'WHERE id = %s AND approved', [review_id])
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    movie_id, likes, dislikes = row
+    if changed:
+        caching.bump(caching.movie_scope(movie_id))
+    return {'movie_id': movie_id, 'likes': likes, 'dislikes': dislikes, 'changed': changed}
@@ -0,0 +1,194 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from scipy import sparse
+
+from . import caching, freshness
+from .models import JobState, Movie, MovieNeighbor, Review
+
+JOB_NAME = 'item_neighbors'
+DEFAULT_NEIGHBORS = 20
+BLOCK_SIZE = 512
+
+
+class RatingMatrix:
+    """
+    Retoji vartotojų × filmų įvertinimų matrica, centruota pagal kiekvieno vartotojo vidurkį (koreguotam kosinusui).
+
+    Atributai:
+    - movie_ids: Filmų ID masyvas; i-tasis matricos stulpelis atitinka movie_ids[i].
+    - items: Filmų × vartotojų CSR matrica su centruotais įvertinimais.
+    - norms: Kiekvieno filmo vektoriaus norma.
+    """
+
+    def __init__(self, movie_ids, items):
+        self.movie_ids = movie_ids
+        self.items = items
+        self.norms = np.sqrt(np.asarray(items.multiply(items).sum(axis=1)).ravel())
+        self.position = {movie_id: index for index, movie_id in enumerate(movie_ids.tolist())}
+
+    @classmethod
+    def from_reviews(cls, reviews=None):
+        rows = (reviews if reviews is not None else Review.public.all()).values_list('user_id', 'movie_id', 'rating')
+        data = np.fromiter((value for row in rows.iterator(chunk_size=10_000) for value in row), dtype=np.int64)
+        data = data.reshape(-1, 3)
+        if not len(data):
+            return cls(np.array([], dtype=np.int64), sparse.csr_matrix((0, 0)))
+
+        user_ids, user_index = np.unique(data[:, 0], return_inverse=True)
+        movie_ids, movie_index = np.unique(data[:, 1], return_inverse=True)
+        ratings = data[:, 2].astype(np.float32)
+
+        # Tas pats vartotojas gali turėti kelias apžvalgas tam pačiam filmui – jas suvidurkiname.
+        shape = (len(movie_ids), len(user_ids))
+        totals = sparse.coo_matrix((ratings, (movie_index, user_index)), shape=shape).tocsr()
+        counts = sparse.coo_matrix((np.ones_like(ratings), (movie_index, user_index)), shape=shape).tocsr()
+        items = totals.multiply(counts.power(-1)).tocsr()
+
+        user_sums = np.asarray(items.sum(axis=0)).ravel()
+        user_counts = np.diff(items.tocsc().indptr)
+        user_means = user_sums / np.maximum(user_counts, 1)
+        items.data -= user_means[items.indices].astype(np.float32)
+        items.eliminate_zeros()
+        return cls(movie_ids, items)
+
+    def similarity_blocks(self, rows):
+        """
+        Nurodytų filmų (matricos eilučių) kosinusiniai panašumai su visais filmais, apdorojant eilutes blokais.
+        Rezultatas lieka retas: saugomos tik filmų porų, turinčių bendrų vertintojų, reikšmės.
+
+        :return: (bloko eilučių masyvas, bloko × visų filmų CSR matrica) porų generatorius
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        transposed = self.items.T.tocsc()
+        for start in range(0, len(rows), BLOCK_SIZE):
+            block = rows[start:start + BLOCK_SIZE]
+            scores = (self.items[block] @ transposed).tocsr()
+            # Nulinės normos filmas neturi įvertinimų, todėl ir jo sandaugų matricoje nėra.
+            row_norms = np.repeat(self.norms[block], np.diff(scores.indptr))
+            scores.data /= row_norms * self.norms[scores.indices]
+            yield block, scores
+
+    def top_neighbors(self, rows, k=DEFAULT_NEIGHBORS):
+        """
+        Apskaičiuoja nurodytų filmų (matricos eilučių) k panašiausių filmų.
+
+        :return: žodynas {movie_id: [(neighbor_id, score), ...]} su teigiamais įverčiais mažėjimo tvarka
+        """
+        result = {}
+        for block, scores in self.similarity_blocks(rows):
+            for offset, row in enumerate(block):
+                start, end = scores.indptr[offset], scores.indptr[offset + 1]
+                columns, values = scores.indices[start:end], scores.data[start:end]
+                keep = (values > 0) & (columns != row)
+                result[int(self.movie_ids[row])] = self._best(columns[keep], values[keep], k)
+        return result
+
+    def _best(self, columns, values, k):
+        if k <= 0 or not len(values):
+            return []
+        if k < len(values):
+            candidates = np.argpartition(-values, k - 1)[:k]
+            columns, values = columns[candidates], values[candidates]
+        order = np.lexsort((columns, -values))
+        return [(int(self.movie_ids[column]), float(values[index]))
+                for index, column in zip(order, columns[order])]
+
+
+def _changed_movie_ids(since):
+    """
+    Filmai, kurių vektoriai pasikeitė nuo `since`: nauja ar redaguota apžvalga keičia vartotojo vidurkį,
+    todėl pasikeičia visų to vartotojo įvertintų filmų centruotos reikšmės. Pakeitimai atrenkami pagal
+    updated_at, kurį keičia ir redagavimas, ir moderavimas (moderate_reviews), ir reakcijų bei komentarų
+    skaitikliai – pastarieji tik papildomai perskaičiuoja kelis filmus. Ištrinta apžvalga pažymi savo filmo
+    updated_at, o likusių autoriaus apžvalgų – jų updated_at (signals.update_stats_on_review_delete).
+    Filmai atrenkami griežtai vėlesni už `since`, nes refresh_neighbors savo filmus pažymi būtent šiuo laiku.
+    """
+    # Moderavimo eilėje laukiančios apžvalgos matricoje nėra, todėl jų sukūrimas nieko nekeičia.
+    changed = Review.objects.filter(Q(approved=True) | Q(moderated_at__gte=since), updated_at__gte=since)
+    users = changed.values('user_id')
+    # Atmestos apžvalgos filmas iš vartotojo įvertinimų dingsta, todėl įtraukiamas atskirai.
+    return (set(changed.values_list('movie_id', flat=True).distinct())
+            | set(Review.public.filter(user_id__in=users).values_list('movie_id', flat=True).distinct())
+            | set(Movie.objects.filter(updated_at__gt=since).values_list('id', flat=True)))
+
+
+def refresh_neighbors(full=False, k=DEFAULT_NEIGHBORS):
+    """
+    Perskaičiuoja filmų kaimynų lentelę.
+
+    Pilnas perskaičiavimas apima visus filmus. Inkrementinis – tik filmus, kurių įvertinimai pasikeitė nuo
+    paskutinio vykdymo, bei filmus, kurių sąrašuose jie yra arba galėtų atsirasti. Inkrementinis kelias
+    mato naujas, redaguotas, moderuotas ir ištrintas apžvalgas.
+
+    :return: perskaičiuotų filmų skaičius
+    """
+    started = timezone.now()
+    state, _ = JobState.objects.get_or_create(name=JOB_NAME)
+    matrix = RatingMatrix.from_reviews()
+
+    if full or state.last_run_at is None:
+        movie_ids = set(matrix.movie_ids.tolist())
+        stale = set(MovieNeighbor.objects.values_list('movie_id', flat=True).distinct()) - movie_ids
+    else:
+        changed = _changed_movie_ids(state.last_run_at)
+        # Filmas be patvirtintų apžvalgų iškrenta iš matricos – jo kaimynų sąrašas tik ištrinamas.
+        stale = {movie_id for movie_id in changed if movie_id not in matrix.position}
+        movie_ids = {movie_id for movie_id in changed | _affected_movie_ids(matrix, changed, k)
+                     if movie_id in matrix.position}
+
+    neighbors = matrix.top_neighbors(sorted(matrix.position[movie_id] for movie_id in movie_ids), k)
+    with transaction.atomic():
+        MovieNeighbor.objects.filter(movie_id__in=movie_ids | stale).delete()
+        MovieNeighbor.objects.bulk_create(
+            (MovieNeighbor(movie_id=movie_id, neighbor_id=neighbor_id, score=score, rank=rank)
+             for movie_id, items in neighbors.items() for rank, (neighbor_id, score) in enumerate(items)),
+            batch_size=5000,
+        )
+        state.last_run_at = started
+        state.save(update_fields=['last_run_at'])
+    caching.bump_movies(movie_ids | stale)
+    # Pažymima vykdymo pradžios laiku, kad kitas vykdymas šių filmų vėl nelaikytų pasikeitusiais.
+    freshness.touch_movies(movie_ids | stale, at=started)
+    return len(movie_ids)
+
+
+def _affected_movie_ids(matrix, changed, k):
+    """
+    Filmai, kurių kaimynų sąrašus paveikia pasikeitę filmai: pasikeitęs filmas jau yra jų sąraše
+    arba naujas panašumas viršija silpniausią (k-tąjį) sąrašo kaimyną.
+    """
+    if not changed:
+        return set()
+    affected = set(MovieNeighbor.objects.filter(neighbor_id__in=changed).values_list('movie_id', flat=True))
+    # Neužpildytame sąraše (mažiau nei k kaimynų) vietos užtenka bet kuriam teigiamam panašumui.
+    thresholds = np.zeros(len(matrix.movie_ids))
+    for movie_id, score in MovieNeighbor.objects.filter(rank=k - 1).values_list('movie_id', 'score'):
+        if movie_id in matrix.position:
+            thresholds[matrix.position[movie_id]] = score
+    rows = [matrix.position[movie_id] for movie_id in changed if movie_id in matrix.position]
+    for _, scores in matrix.similarity_blocks(rows):
+        columns = np.unique(scores.indices[scores.data > thresholds[scores.indices]])
+        affected.update(matrix.movie_ids[columns].tolist())
+    return affected - changed
+
+
+def similar_movies(movie, limit=6):
+    """
+    Panašūs filmai pagal vartotojų įvertinimus – vienas užklausimas per (movie, rank) indeksą.
+    """
+    return list(Movie.objects.filter(neighbor_of__movie=movie).order_by('neighbor_of__rank')[:limit])
+
+
+def recommended_for_user(user, limit=6, min_rating=4):
+    """
+    Filmai, panašūs į tuos, kuriuos vartotojas įvertino ne mažiau kaip `min_rating`, išskyrus jau įvertintus.
+    """
+    rated = Review.objects.filter(user=user).values('movie_id')
+    liked = rated.filter(rating__gte=min_rating)
+    return list(Movie.objects
+                .filter(neighbor_of__movie__in=liked)
+                .exclude(id__in=rated)
+                .annotate(recommendation_score=Sum('neighbor_of__score'))
+                .order_by('-recommendation_score', 'id')[:limit])
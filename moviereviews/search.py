@@ -0,0 +1,230 @@
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Movie
+
+FTS_TABLE = 'moviereviews_movie_fts'
+
+# bm25 svoriai stulpeliams: title, description, director, genres
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+# Ryšių (alias), kuriuose FTS lentelė rasta. Įsimenamas tik teigiamas atsakymas: lentelė gali atsirasti vėliau
+# (migracija ar rebuild_index kitame procese), o kol jos nėra, tikrinama kiekvieną kartą vienu sqlite_master SELECT.
+_fts_tables = set()
+
+
+def forget_fts_tables(**kwargs):
+    """
+    Pamiršta rastas FTS lenteles (po migracijų, kurios gali lentelę ir ištrinti).
+    """
+    _fts_tables.clear()
+
+
+def fts_available():
+    """
+    Ar duomenų bazėje yra FTS5 paieškos lentelė (tik SQLite).
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias in _fts_tables:
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        if cursor.fetchone() is None:
+            return False
+    _fts_tables.add(connection.alias)
+    return True
+
+
+def create_fts_table(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        f"USING fts5(title, description, director, genres, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+
+def _document_rows(movie_ids=None):
+    movies = Movie.objects.select_related('director').prefetch_related('genres').order_by('id')
+    if movie_ids is not None:
+        movies = movies.filter(id__in=movie_ids)
+    for movie in movies.iterator(chunk_size=2000):
+        yield (
+            movie.id,
+            movie.title,
+            movie.description,
+            movie.director.name if movie.director else '',
+            ' '.join(genre.name for genre in movie.genres.all()),
+        )
+
+
+def _insert(cursor, rows):
+    cursor.executemany(
+        f'INSERT INTO {FTS_TABLE} (rowid, title, description, director, genres) VALUES (%s, %s, %s, %s, %s)',
+        rows,
+    )
+
+
+def index_movies(movie_ids):
+    """
+    Perindeksuoja nurodytus filmus (pvz. pasikeitus pavadinimui, režisieriui ar žanrams).
+    """
+    movie_ids = list(movie_ids)
+    if not movie_ids or not fts_available():
+        return
+    remove_movies(movie_ids)
+    with connection.cursor() as cursor:
+        _insert(cursor, list(_document_rows(movie_ids)))
+
+
+def index_documents(rows):
+    """
+    Perindeksuoja filmus iš jau paruoštų (id, pavadinimas, aprašymas, režisierius, žanrai) eilučių,
+    pvz. masinio importo metu, kai duomenys jau yra atmintyje ir jų nereikia skaityti iš naujo.
+    """
+    rows = list(rows)
+    if not rows or not fts_available():
+        return
+    remove_movies(row[0] for row in rows)
+    with connection.cursor() as cursor:
+        _insert(cursor, rows)
+
+
+def remove_movies(movie_ids):
+    movie_ids = list(movie_ids)
+    if not movie_ids or not fts_available():
+        return
+    with connection.cursor() as cursor:
+        placeholders = ', '.join(['%s'] * len(movie_ids))
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', movie_ids)
+
+
+def rebuild_index(batch_size=2000):
+    """
+    Ištrina ir iš naujo užpildo visą paieškos indeksą. Grąžina suindeksuotų filmų skaičių.
+    """
+    total = 0
+    with connection.cursor() as cursor:
+        create_fts_table(cursor)
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        batch = []
+        for row in _document_rows():
+            batch.append(row)
+            if len(batch) >= batch_size:
+                _insert(cursor, batch)
+                total += len(batch)
+                batch = []
+        _insert(cursor, batch)
+        total += len(batch)
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    _fts_tables.add(connection.alias)
+    return total
+
+
+def build_match_query(text):
+    """
+    Paverčia vartotojo tekstą saugia FTS5 užklausa: kiekvienas žodis tampa kabutėse esančiu prefiksu.
+    """
+    return ' '.join(f'"{token}"*' for token in TOKEN_RE.findall(text))
+
+
+def _highlight(text):
+    return mark_safe(escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+class SearchPage:
+    """
+    Paieškos rezultatų puslapis.
+
+    Atributai:
+    - object_list: Puslapio filmai (FTS atveju su `search_title` ir `search_snippet` atributais).
+    - number: Puslapio numeris (nuo 1).
+    """
+
+    def __init__(self, object_list, number, has_more):
+        self.object_list = object_list
+        self.number = number
+        self._has_more = has_more
+
+    def has_next(self):
+        return self._has_more
+
+    def has_previous(self):
+        return self.number > 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _page_number(page):
+    try:
+        return max(int(page), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def search_movies(query, page=1, per_page=20):
+    """
+    Ieško filmų pagal pavadinimą, aprašymą, režisierių ir žanrus.
+
+    Kai yra FTS5 indeksas, rezultatai rikiuojami pagal bm25 ir turi paryškintas ištraukas.
+    Kitu atveju naudojama paprasta `title__icontains` paieška.
+
+    :param query: vartotojo įvestas paieškos tekstas
+    :param page: puslapio numeris
+    :param per_page: rezultatų skaičius puslapyje
+    :return: SearchPage
+    """
+    number = _page_number(page)
+    offset = (number - 1) * per_page
+
+    if not query or not fts_available():
+        movies = Movie.objects.prefetch_related('genres').order_by('title', 'id')
+        if query:
+            movies = movies.filter(title__icontains=query)
+        rows = list(movies[offset:offset + per_page + 1])
+        return SearchPage(rows[:per_page], number, len(rows) > per_page)
+
+    match = build_match_query(query)
+    if not match:
+        return SearchPage([], number, False)
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, highlight({FTS_TABLE}, 0, %s, %s), snippet({FTS_TABLE}, 1, %s, %s, %s, 16) '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY bm25({FTS_TABLE}, {weights}) '
+            f'LIMIT %s OFFSET %s',
+            [MARK_START, MARK_END, MARK_START, MARK_END, '…', match, per_page + 1, offset],
+        )
+        hits = cursor.fetchall()
+
+    has_more = len(hits) > per_page
+    hits = hits[:per_page]
+    movies = Movie.objects.prefetch_related('genres').in_bulk([movie_id for movie_id, _, _ in hits])
+    results = []
+    for movie_id, title, snippet in hits:
+        movie = movies.get(movie_id)
+        if movie is None:
+            continue
+        movie.search_title = _highlight(title)
+        movie.search_snippet = _highlight(snippet)
+        results.append(movie)
+    return SearchPage(results, number, has_more)
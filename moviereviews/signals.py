@@ -0,0 +1,281 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_init, post_migrate, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, freshness, images, search, stats
+from .models import Comment, Director, Genre, Movie, Reaction, Review
+from .reactions import adjust_reaction_counts
+
+
+@receiver(post_init, sender=Reaction)
+def remember_reaction_state(sender, instance, **kwargs):
+    """
+    Įsimena iš duomenų bazės įkeltą reakcijos tipą ir apžvalgą, kad išsaugant būtų galima nustatyti pakeitimą.
+    """
+    instance._original_state = (instance.__dict__.get('review_id'), instance.__dict__.get('reaction_type'))
+
+
+@receiver(post_save, sender=Reaction)
+def update_counts_on_reaction_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Sukūrus reakciją padidina skaitiklį, o pakeitus jos tipą (ar apžvalgą) perkelia vienetą tarp skaitiklių.
+    """
+    if raw:
+        return
+    new_state = (instance.review_id, instance.reaction_type)
+    if created:
+        adjust_reaction_counts(instance.review_id, added=instance.reaction_type)
+    elif new_state != instance._original_state:
+        old_review_id, old_type = instance._original_state
+        if old_review_id == instance.review_id:
+            adjust_reaction_counts(instance.review_id, added=instance.reaction_type, removed=old_type)
+        else:
+            adjust_reaction_counts(old_review_id, removed=old_type)
+            adjust_reaction_counts(instance.review_id, added=instance.reaction_type)
+    instance._original_state = new_state
+
+
+@receiver(post_delete, sender=Reaction)
+def update_counts_on_reaction_delete(sender, instance, **kwargs):
+    """
+    Ištrynus reakciją sumažina atitinkamą apžvalgos skaitiklį.
+    """
+    review_id, reaction_type = instance._original_state
+    adjust_reaction_counts(review_id, removed=reaction_type)
+
+
+@receiver(post_init, sender=Review)
+def remember_review_state(sender, instance, **kwargs):
+    """
+    Įsimena apžvalgos filmą, įvertinimą ir patvirtinimą, kad išsaugant būtų galima pataisyti filmo suvestinę.
+    """
+    instance._stats_state = (instance.__dict__.get('movie_id'), instance.__dict__.get('rating'),
+                             instance.__dict__.get('approved'))
+
+
+@receiver(post_save, sender=Review)
+def update_stats_on_review_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Perkelia apžvalgos indėlį į filmo suvestinę: sukūrus, pakeitus įvertinimą ar filmą, patvirtinus
+    ar atšaukus patvirtinimą. Pasendina apžvalgų sąrašą ir abiejų filmų puslapius, o pasikeitus
+    suvestinei – ir filmų sąrašą.
+    """
+    if raw:
+        return
+    old = (None, None, None) if created else instance._stats_state
+    new = (instance.movie_id, instance.rating, instance.approved)
+    if old != new and (stats.counts_in_stats(*old) or stats.counts_in_stats(*new)):
+        if stats.counts_in_stats(*old):
+            stats.apply_review(old[0], old[1], -1)
+        if stats.counts_in_stats(*new):
+            stats.apply_review(new[0], new[1], 1, instance.created_at)
+        caching.bump(caching.RATINGS)
+    caching.bump(caching.REVIEWS, *{caching.movie_scope(movie_id) for movie_id in (old[0], new[0]) if movie_id})
+    instance._stats_state = new
+
+
+@receiver(post_delete, sender=Review)
+def update_stats_on_review_delete(sender, instance, **kwargs):
+    movie_id, rating, approved = instance._stats_state
+    if stats.counts_in_stats(movie_id, rating, approved):
+        stats.apply_review(movie_id, rating, -1)
+        caching.bump(caching.RATINGS)
+        # Pasikeitė autoriaus įvertinimų vidurkis, todėl ir kitų jo filmų vektoriai rekomendacijose.
+        Review.public.filter(user_id=instance.user_id).update(updated_at=timezone.now())
+    caching.bump(caching.REVIEWS, caching.movie_scope(movie_id))
+    # Ištrinta apžvalga nepalieka updated_at, todėl filmo puslapio pakeitimą pažymime filme.
+    freshness.touch_movies([movie_id])
+
+
+def _review_movie_id(sender, instance):
+    """
+    Filmas, kuriam priklauso komentaro ar reakcijos apžvalga (be užklausos, jei apžvalga jau įkelta).
+    """
+    if sender.review.is_cached(instance):
+        return instance.review.movie_id
+    return Review.objects.filter(pk=instance.review_id).values_list('movie_id', flat=True).first()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Reaction)
+@receiver(post_delete, sender=Reaction)
+def invalidate_review_thread(sender, instance, raw=False, **kwargs):
+    """
+    Komentarai ir reakcijos rodomi tik filmo puslapyje, todėl pasendinama tik jo versija.
+    """
+    movie_id = None if raw else _review_movie_id(sender, instance)
+    if movie_id:
+        caching.bump(caching.movie_scope(movie_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_commented_review(sender, instance, raw=False, **kwargs):
+    """
+    Komentaro pakeitimas atnaujina apžvalgos updated_at – pagal jį skaičiuojamas filmo puslapio šviežumas.
+    Naujas ar ištrintas komentaras tame pačiame UPDATE pakeičia ir comments_count. Reakcijų atveju tai
+    daro skaitiklių UPDATE.
+    """
+    if raw:
+        return
+    if kwargs['signal'] is post_delete:
+        freshness.touch_review(instance.review_id, comments_count=F('comments_count') - 1)
+    elif kwargs['created']:
+        freshness.touch_review(instance.review_id, comments_count=F('comments_count') + 1)
+    else:
+        freshness.touch_review(instance.review_id)
+
+
+@receiver(post_save, sender=Movie)
+def index_saved_movie(sender, instance, raw=False, **kwargs):
+    """
+    Atnaujina filmo įrašą paieškos indekse.
+    """
+    if not raw:
+        search.index_movies([instance.pk])
+
+
+@receiver(post_save, sender=Movie)
+def create_movie_stats(sender, instance, created, raw=False, **kwargs):
+    """
+    Naujam filmui sukuria tuščią suvestinę (MovieStats), kad jis būtų rikiuojamų pagal įvertinimą sąraše.
+    """
+    if created and not raw:
+        stats.create_empty_stats([instance.pk])
+
+
+@receiver(post_delete, sender=Movie)
+def unindex_deleted_movie(sender, instance, **kwargs):
+    search.remove_movies([instance.pk])
+
+
+@receiver(m2m_changed, sender=Movie.genres.through)
+def index_movie_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Pasikeitus filmo žanrams perindeksuoja paveiktus filmus (iš abiejų ryšio pusių) ir atnaujina jų updated_at.
+    """
+    if reverse and action == 'pre_clear':
+        instance._cleared_movie_ids = list(instance.movie_set.values_list('id', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        movie_ids = [instance.pk]
+    elif action == 'post_clear':
+        movie_ids = instance.__dict__.pop('_cleared_movie_ids', [])
+    else:
+        movie_ids = list(pk_set or [])
+    search.index_movies(movie_ids)
+    freshness.touch_movies(movie_ids)
+
+
+@receiver(post_save, sender=Director)
+@receiver(post_save, sender=Genre)
+def index_related_movies(sender, instance, created, raw=False, **kwargs):
+    """
+    Pervadinus režisierių ar žanrą perindeksuoja visus su juo susijusius filmus ir atnaujina jų updated_at.
+    """
+    if not created and not raw:
+        movie_ids = list(instance.movie_set.values_list('id', flat=True))
+        search.index_movies(movie_ids)
+        freshness.touch_movies(movie_ids)
+
+
+@receiver(pre_delete, sender=Director)
+@receiver(pre_delete, sender=Genre)
+def remember_related_movies(sender, instance, **kwargs):
+    instance._related_movie_ids = list(instance.movie_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Director)
+@receiver(post_delete, sender=Genre)
+def index_movies_of_deleted(sender, instance, **kwargs):
+    movie_ids = instance.__dict__.pop('_related_movie_ids', [])
+    search.index_movies(movie_ids)
+    freshness.touch_movies(movie_ids)
+
+
+@receiver(post_init, sender=Movie)
+def remember_movie_image(sender, instance, **kwargs):
+    image = instance.__dict__.get('image')
+    instance._original_image_name = getattr(image, 'name', image) or ''
+    instance._original_poster_hash = instance.__dict__.get('poster_hash') or ''
+
+
+@receiver(pre_save, sender=Movie)
+def reset_poster_hash(sender, instance, raw=False, **kwargs):
+    """
+    Naujam plakatui senųjų versijų santrauka ir matmenys netinka – kol jo versijos sukuriamos, rodomas originalas.
+    Juos įrašo UPDATE po transakcijos, todėl anksčiau įkeltas objektas jų neperrašo tuščiomis reikšmėmis.
+    """
+    if raw or not instance.pk:
+        return
+    changed = instance._original_image_name != (instance.image.name or '')
+    if changed or (instance.image and not instance.poster_hash):
+        stored = Movie.objects.filter(pk=instance.pk).values_list(
+            'poster_hash', 'poster_width', 'poster_height').first() or ('', None, None)
+        if changed:
+            # Senųjų versijų santrauka reikalinga jų ištrynimui (generate_poster_derivatives).
+            instance._original_poster_hash = stored[0]
+            instance.poster_hash, instance.poster_width, instance.poster_height = '', None, None
+        else:
+            instance.poster_hash, instance.poster_width, instance.poster_height = stored
+
+
+def delete_unused_derivatives(image_name, digest):
+    # Tą patį plakato failą gali naudoti keli filmai (pvz. importuotas katalogas).
+    if digest and not Movie.objects.filter(image=image_name).exists():
+        images.delete_derivatives(image_name, digest)
+
+
+@receiver(post_save, sender=Movie)
+def generate_poster_derivatives(sender, instance, raw=False, **kwargs):
+    """
+    Įkėlus naują plakatą po transakcijos patvirtinimo sukuria sumažintas jo versijas, o senąsias ištrina.
+    """
+    if raw:
+        return
+    old_name, new_name = instance._original_image_name, instance.image.name or ''
+    if old_name == new_name:
+        return
+    old_hash = instance._original_poster_hash
+    if old_name:
+        transaction.on_commit(lambda: delete_unused_derivatives(old_name, old_hash))
+    if new_name:
+        transaction.on_commit(lambda: images.safe_generate_derivatives(new_name, force=True))
+    instance._original_image_name, instance._original_poster_hash = new_name, instance.poster_hash
+
+
+@receiver(post_delete, sender=Movie)
+def delete_poster_derivatives(sender, instance, **kwargs):
+    if instance.image:
+        name, digest = instance.image.name, instance.poster_hash
+        transaction.on_commit(lambda: delete_unused_derivatives(name, digest))
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_movie_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump(caching.CATALOG, caching.movie_scope(instance.pk))
+
+
+@receiver(post_save, sender=Director)
+@receiver(post_delete, sender=Director)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(m2m_changed, sender=Movie.genres.through)
+def invalidate_catalog_pages(sender, raw=False, **kwargs):
+    """
+    Režisierių ir žanrų pavadinimai rodomi visuose filmų puslapiuose ir sąrašuose.
+    """
+    if not raw and kwargs.get('action', 'post_').startswith('post_'):
+        caching.bump(caching.CATALOG)
+
+
+@receiver(post_migrate)
+def reset_fts_availability(sender, **kwargs):
+    search.forget_fts_tables()
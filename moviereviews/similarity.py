@@ -0,0 +1,359 @@
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from . import caching
+from .models import Movie
+
+# Požymių erdvė: aprašymo žodžiai maišomi (hashing) į TEXT_FEATURES stulpelių, po jų eina žanrų ir režisierių stulpeliai.
+# Maišymas leidžia pridėti naujus filmus be žodyno perskaičiavimo.
+TEXT_FEATURES = 2 ** 18
+GENRE_FEATURES = 2 ** 10
+DIRECTOR_FEATURES = 2 ** 16
+N_FEATURES = TEXT_FEATURES + GENRE_FEATURES + DIRECTOR_FEATURES
+
+# Panašumas = 0.6 · aprašymų kosinusas + 0.3 · žanrų kosinusas + 0.1 · tas pats režisierius.
+WEIGHTS = {'text': 0.6, 'genre': 0.3, 'director': 0.1}
+
+# Žodžiai, esantys daugiau nei 2 % aprašymų, laikomi stop žodžiais (idf = 0): jie mažai pasako apie panašumą,
+# bet paverčia aprašymų sandaugų matricą beveik tankia ir keliskart sulėtina indekso kūrimą.
+# Mažuose kataloguose riba ne mažesnė nei MIN_STOP_DF aprašymų.
+MAX_DF = 0.02
+MIN_STOP_DF = 50
+DEFAULT_NEIGHBORS = 20
+BLOCK_SIZE = 256
+TOKEN_RE = re.compile(r'\w{3,}')
+CURRENT_FILE = 'CURRENT'
+
+
+def text_features(text):
+    """
+    Aprašymo žodžių dažniai maišytuose stulpeliuose (tf = 1 + log(kiekis)).
+    """
+    counts = Counter(zlib.crc32(token.encode()) % TEXT_FEATURES for token in TOKEN_RE.findall(text.lower()))
+    return {column: 1 + math.log(count) for column, count in counts.items()}
+
+
+def _normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    scale = np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+    return sparse.diags(scale.astype(np.float32)) @ matrix
+
+
+def _matrix(rows, columns, values, shape):
+    return sparse.csr_matrix((np.asarray(values, dtype=np.float32), (rows, columns)), shape=shape)
+
+
+def load_movies(min_id=None):
+    """
+    Nuskaito filmų požymius vienu praėjimu (be modelių objektų).
+
+    :return: (ids masyvas, [(aprašymas, žanrų ID sąrašas, režisieriaus ID), ...])
+    """
+    movies = Movie.objects.order_by('id')
+    through = Movie.genres.through.objects.order_by()
+    if min_id is not None:
+        movies = movies.filter(id__gt=min_id)
+        through = through.filter(movie_id__gt=min_id)
+    genres = {}
+    for movie_id, genre_id in through.values_list('movie_id', 'genre_id').iterator(chunk_size=10_000):
+        genres.setdefault(movie_id, []).append(genre_id)
+    ids, rows = [], []
+    for movie_id, description, director_id in movies.values_list('id', 'description', 'director_id').iterator(
+            chunk_size=2000):
+        ids.append(movie_id)
+        rows.append((description, genres.get(movie_id, []), director_id))
+    return np.array(ids, dtype=np.int64), rows
+
+
+def compute_idf(text):
+    documents = text.shape[0]
+    df = np.bincount(text.indices, minlength=TEXT_FEATURES)
+    idf = (np.log((1 + documents) / (1 + df)) + 1).astype(np.float32)
+    idf[df > max(MAX_DF * documents, MIN_STOP_DF)] = 0
+    return idf
+
+
+def feature_matrix(rows, idf=None):
+    """
+    Sudaro normalizuotą filmų požymių matricą (filmai × N_FEATURES).
+
+    :param idf: jau apskaičiuoti idf svoriai; jei None – apskaičiuojami iš šių filmų
+    :return: (matrica, idf)
+    """
+    count = len(rows)
+    text = {'rows': [], 'columns': [], 'values': []}
+    meta = {'rows': [], 'columns': [], 'values': []}
+    for index, (description, genre_ids, director_id) in enumerate(rows):
+        for column, value in text_features(description or '').items():
+            text['rows'].append(index)
+            text['columns'].append(column)
+            text['values'].append(value)
+        genre_weight = math.sqrt(WEIGHTS['genre'] / len(genre_ids)) if genre_ids else 0
+        for genre_id in set(genre_ids):
+            meta['rows'].append(index)
+            meta['columns'].append(TEXT_FEATURES + genre_id % GENRE_FEATURES)
+            meta['values'].append(genre_weight)
+        if director_id is not None:
+            meta['rows'].append(index)
+            meta['columns'].append(TEXT_FEATURES + GENRE_FEATURES + director_id % DIRECTOR_FEATURES)
+            meta['values'].append(math.sqrt(WEIGHTS['director']))
+
+    shape = (count, N_FEATURES)
+    text_matrix = _matrix(text['rows'], text['columns'], text['values'], (count, TEXT_FEATURES))
+    if idf is None:
+        idf = compute_idf(text_matrix)
+    text_matrix = _normalize_rows(text_matrix @ sparse.diags(idf)) * math.sqrt(WEIGHTS['text'])
+    text_matrix.resize(shape)
+    matrix = (text_matrix + _matrix(meta['rows'], meta['columns'], meta['values'], shape)).tocsr()
+    matrix.eliminate_zeros()
+    return matrix.astype(np.float32), idf
+
+
+def top_k(scores, k):
+    """
+    Kiekvienos eilutės k didžiausių reikšmių stulpeliai ir reikšmės mažėjimo tvarka.
+    Trūkstamos (neteigiamos) vietos užpildomos -1 ir 0.
+    """
+    k = min(k, scores.shape[1])
+    columns = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < scores.shape[1] else \
+        np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    values = np.take_along_axis(scores, columns, axis=1)
+    order = np.argsort(-values, axis=1, kind='stable')
+    columns = np.take_along_axis(columns, order, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+    columns[values <= 0] = -1
+    values[values <= 0] = 0
+    return columns, values
+
+
+def _split_features(matrix, genre_columns):
+    """
+    Išskaido požymių matricą skaičiavimui: aprašymai lieka retoje matricoje, žanrai – tankioje (jų nedaug),
+    o režisierius – stulpelio numeriu (-1, jei nežinomas). Taip žanrų sandauga atliekama BLAS,
+    o ne retųjų matricų daugyba, kurios rezultatas būtų beveik tankus.
+    """
+    matrix = matrix.tocsr()
+    text = matrix[:, :TEXT_FEATURES].tocsr()
+    meta = matrix[:, TEXT_FEATURES:].tocoo()
+    genres = np.zeros((matrix.shape[0], len(genre_columns)), dtype=np.float32)
+    is_genre = meta.col < GENRE_FEATURES
+    genres[meta.row[is_genre], np.searchsorted(genre_columns, meta.col[is_genre])] = meta.data[is_genre]
+    directors = np.full(matrix.shape[0], -1, dtype=np.int64)
+    directors[meta.row[~is_genre]] = meta.col[~is_genre]
+    return text, genres, directors
+
+
+def neighbors_for(queries, query_ids, vectors, ids, k):
+    """
+    Apskaičiuoja `queries` eilučių k artimiausių `vectors` eilučių (skaliarinė sandauga blokais), išskyrus jas pačias.
+
+    :return: (kaimynų ID masyvas, įverčių masyvas); tuščios vietos – -1 ir 0
+    """
+    neighbors = np.full((queries.shape[0], k), -1, dtype=np.int64)
+    scores = np.zeros((queries.shape[0], k), dtype=np.float32)
+    if not vectors.shape[0]:
+        return neighbors, scores
+    meta_columns = np.concatenate([queries[:, TEXT_FEATURES:].indices, vectors[:, TEXT_FEATURES:].indices])
+    genre_columns = np.unique(meta_columns[meta_columns < GENRE_FEATURES])
+    query_text, query_genres, query_directors = _split_features(queries, genre_columns)
+    text, genres, directors = _split_features(vectors, genre_columns)
+    text_transposed = text.T.tocsc()
+    director_weight = np.float32(WEIGHTS['director'])
+
+    for start in range(0, queries.shape[0], BLOCK_SIZE):
+        rows = slice(start, start + BLOCK_SIZE)
+        block = (query_text[rows] @ text_transposed).toarray()
+        block += query_genres[rows] @ genres.T
+        same_director = (query_directors[rows, None] == directors[None, :]) & (query_directors[rows, None] >= 0)
+        block += same_director * director_weight
+        block[query_ids[rows, None] == ids[None, :]] = 0
+        columns, values = top_k(block, k)
+        width = columns.shape[1]
+        neighbors[rows, :width] = np.where(columns >= 0, ids[columns], -1)
+        scores[rows, :width] = values
+    return neighbors, scores
+
+
+class SimilarityIndex:
+    """
+    Disko indeksas, atidarytas per atminties atvaizdavimą (np.load(mmap_mode='r')).
+
+    Atributai:
+    - ids: Surikiuoti filmų ID (eilutės numeris = vieta šiame masyve).
+    - neighbors, scores: Kiekvieno filmo iš anksto apskaičiuoti k panašiausių filmų ID ir įverčiai.
+    - idf: Žodžių idf svoriai, naudojami naujiems filmams.
+    - data, indices, indptr: Normalizuotų požymių CSR matrica naujų filmų palyginimui.
+    """
+    ARRAYS = ('ids', 'neighbors', 'scores', 'idf', 'data', 'indices', 'indptr')
+
+    def __init__(self, path):
+        self.path = path
+        for name in self.ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as file:
+            self.meta = json.load(file)
+
+    def vectors(self):
+        return sparse.csr_matrix((self.data, self.indices, self.indptr), shape=(len(self.ids), N_FEATURES))
+
+    def similar_ids(self, movie_id, limit):
+        row = int(np.searchsorted(self.ids, movie_id))
+        if row >= len(self.ids) or self.ids[row] != movie_id:
+            return []
+        return [int(neighbor) for neighbor in self.neighbors[row, :limit] if neighbor >= 0]
+
+
+def write_index(base_dir, arrays, meta):
+    """
+    Įrašo naują indekso versiją į atskirą katalogą ir atomiškai perjungia CURRENT žymę.
+    Senos versijos ištrinamos; jau atidaryti memmap failai lieka galioti, kol procesas juos naudoja.
+    """
+    version = f'{time.strftime("%Y%m%d%H%M%S")}-{uuid.uuid4().hex[:8]}'
+    path = os.path.join(base_dir, version)
+    os.makedirs(path)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array)
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+
+    pointer = os.path.join(base_dir, f'{CURRENT_FILE}.{version}.tmp')
+    with open(pointer, 'w', encoding='utf-8') as file:
+        file.write(version)
+    os.replace(pointer, os.path.join(base_dir, CURRENT_FILE))
+
+    for name in os.listdir(base_dir):
+        if name != version and os.path.isdir(os.path.join(base_dir, name)):
+            shutil.rmtree(os.path.join(base_dir, name), ignore_errors=True)
+    # Filmų puslapiuose rodomi panašūs filmai gali būti imami iš šio indekso.
+    caching.bump(caching.CATALOG)
+    return path
+
+
+def build_index(k=DEFAULT_NEIGHBORS, base_dir=None):
+    """
+    Pilnas indekso sukūrimas vienu praėjimu per filmų katalogą.
+
+    :return: suindeksuotų filmų skaičius
+    """
+    ids, rows = load_movies()
+    vectors, idf = feature_matrix(rows)
+    neighbors, scores = neighbors_for(vectors, ids, vectors, ids, k)
+    _save(base_dir, ids, vectors, idf, neighbors, scores, k)
+    return len(ids)
+
+
+def update_index(k=None, base_dir=None):
+    """
+    Prideda prie indekso naujus filmus (ID didesnis už didžiausią suindeksuotą).
+
+    Naujiems filmams kaimynai ieškomi visame kataloge, o seniems filmams jų sąrašai papildomi, jei naujas
+    filmas aplenkia silpniausią kaimyną. Naudojami sukūrimo metu apskaičiuoti idf svoriai; jie atnaujinami
+    tik per build_index.
+
+    :return: pridėtų filmų skaičius
+    """
+    index = load_index(base_dir)
+    if index is None:
+        return build_index(k or DEFAULT_NEIGHBORS, base_dir)
+    k = k or index.meta['k']
+    if k != index.meta['k']:
+        return build_index(k, base_dir)
+
+    last_id = int(index.ids[-1]) if len(index.ids) else None
+    new_ids, rows = load_movies(min_id=last_id)
+    if not len(new_ids):
+        return 0
+
+    idf = np.asarray(index.idf)
+    old_vectors = index.vectors()
+    new_vectors, _ = feature_matrix(rows, idf)
+    ids = np.concatenate([index.ids, new_ids])
+    vectors = sparse.vstack([old_vectors, new_vectors]).tocsr()
+    new_neighbors, new_scores = neighbors_for(new_vectors, new_ids, vectors, ids, k)
+
+    neighbors = np.array(index.neighbors)
+    scores = np.array(index.scores)
+    # Senų filmų k geriausi kandidatai tarp naujų – blokais, kaip ir užklausose, be N_old × N_new matricos.
+    candidate_ids, candidate_scores = neighbors_for(old_vectors, index.ids, new_vectors, new_ids, k)
+    affected = np.flatnonzero(candidate_scores[:, 0] > scores[:, -1])
+    if len(affected):
+        merged_scores = np.hstack([scores[affected], candidate_scores[affected]])
+        merged_ids = np.hstack([neighbors[affected], candidate_ids[affected]])
+        columns, values = top_k(merged_scores, k)
+        neighbors[affected] = np.where(columns >= 0, np.take_along_axis(merged_ids, np.maximum(columns, 0), 1), -1)
+        scores[affected] = values
+
+    _save(base_dir, ids, vectors, idf, np.vstack([neighbors, new_neighbors]),
+          np.vstack([scores, new_scores]), k)
+    return len(new_ids)
+
+
+def _save(base_dir, ids, vectors, idf, neighbors, scores, k):
+    base_dir = base_dir or settings.SIMILARITY_INDEX_DIR
+    os.makedirs(base_dir, exist_ok=True)
+    write_index(base_dir, {
+        'ids': ids, 'neighbors': neighbors, 'scores': scores.astype(np.float32), 'idf': idf,
+        'data': vectors.data.astype(np.float32), 'indices': vectors.indices.astype(np.int32),
+        'indptr': vectors.indptr.astype(np.int64),
+    }, {'k': k, 'movies': len(ids), 'built': time.strftime('%Y-%m-%dT%H:%M:%S')})
+
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+def current_version(base_dir=None):
+    """
+    Dabartinės indekso versijos pavadinimas (CURRENT žymė) arba None, jei indeksas dar nesukurtas.
+    """
+    try:
+        with open(os.path.join(base_dir or settings.SIMILARITY_INDEX_DIR, CURRENT_FILE), encoding='utf-8') as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def load_index(base_dir=None):
+    """
+    Grąžina dabartinę indekso versiją (procese laikomą atidarytą) arba None, jei indeksas dar nesukurtas.
+    Kai kita programa įrašo naują versiją, ji atidaroma kitos užklausos metu.
+    """
+    base_dir = str(base_dir or settings.SIMILARITY_INDEX_DIR)
+    version = current_version(base_dir)
+    if version is None:
+        return None
+    index = _loaded.get(base_dir)
+    if index is not None and os.path.basename(index.path) == version:
+        return index
+    with _lock:
+        index = _loaded.get(base_dir)
+        if index is None or os.path.basename(index.path) != version:
+            try:
+                index = _loaded[base_dir] = SimilarityIndex(os.path.join(base_dir, version))
+            except FileNotFoundError:
+                return None
+    return index
+
+
+def similar_by_content(movie, limit=6):
+    """
+    Panašūs filmai pagal aprašymą, žanrus ir režisierių. Tinka ir filmams be jokių apžvalgų.
+    """
+    index = load_index()
+    ids = index.similar_ids(movie.id, limit) if index is not None else []
+    if not ids:
+        return []
+    movies = Movie.objects.in_bulk(ids)
+    return [movies[movie_id] for movie_id in ids if movie_id in movies]
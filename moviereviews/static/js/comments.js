@@ -0,0 +1,27 @@
+// Likę apžvalgos komentarai užkraunami pagal poreikį: fetch užklausa grąžina HTML fragmentą ir kito puslapio adresą.
+// Be JavaScript nuoroda atveria atskirą komentarų puslapį.
+document.addEventListener('click', function (event) {
+    var link = event.target.closest('a.load-comments');
+    if (!link) {
+        return;
+    }
+    event.preventDefault();
+    fetch(link.href, {
+        headers: {'X-Requested-With': 'XMLHttpRequest', 'Accept': 'application/json'},
+        credentials: 'same-origin'
+    }).then(function (response) {
+        if (!response.ok) {
+            throw new Error(response.status);
+        }
+        return response.json();
+    }).then(function (data) {
+        document.getElementById(link.dataset.target).insertAdjacentHTML('beforeend', data.html);
+        if (data.next) {
+            link.href = data.next;
+        } else {
+            link.remove();
+        }
+    }).catch(function () {
+        window.location = link.href;
+    });
+});
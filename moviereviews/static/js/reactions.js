@@ -0,0 +1,28 @@
+// Balsavimas be viso puslapio perkrovimo: forma siunčiama fetch užklausa, o atsakyme gauti skaičiai įrašomi į puslapį.
+// Be JavaScript formos veikia kaip įprastos (peradresuojama atgal į filmo puslapį).
+document.addEventListener('submit', function (event) {
+    var form = event.target;
+    if (!form.classList.contains('reaction-form')) {
+        return;
+    }
+    event.preventDefault();
+    fetch(form.action, {
+        method: 'POST',
+        body: new FormData(form),
+        headers: {'X-Requested-With': 'XMLHttpRequest', 'Accept': 'application/json'},
+        credentials: 'same-origin'
+    }).then(function (response) {
+        if (!response.ok) {
+            throw new Error(response.status);
+        }
+        return response.json();
+    }).then(function (data) {
+        var counts = document.getElementById('reaction-counts-' + data.review);
+        if (counts) {
+            counts.querySelector('.likes').textContent = data.likes;
+            counts.querySelector('.dislikes').textContent = data.dislikes;
+        }
+    }).catch(function () {
+        form.submit();
+    });
+});
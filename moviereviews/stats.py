@@ -0,0 +1,122 @@
+from django.db import IntegrityError, transaction
+from django.db.models import (Case, Count, DateTimeField, ExpressionWrapper, F, FloatField, Max, Q, Subquery, Sum,
+                              Value, When)
+
+from . import caching
+from .models import Movie, MovieStats, Review
+
+HISTOGRAM_FIELDS = {rating: f'rating_{rating}' for rating in range(1, 6)}
+STAT_FIELDS = ['review_count', 'rating_sum', 'rating_mean', *HISTOGRAM_FIELDS.values(), 'last_review_at']
+
+
+def counts_in_stats(movie_id, rating, approved):
+    """
+    Ar apžvalga su tokiomis reikšmėmis įtraukiama į filmo suvestinę (tik patvirtintos apžvalgos).
+    """
+    return bool(approved) and movie_id is not None and rating in HISTOGRAM_FIELDS
+
+
+def apply_review(movie_id, rating, delta, created_at=None):
+    """
+    Prideda (delta=1) arba atima (delta=-1) vieną apžvalgą iš filmo suvestinės vienu UPDATE sakiniu.
+
+    Vidurkis perskaičiuojamas tame pačiame sakinyje iš senų sumos ir kiekio reikšmių. Atimant naujausios
+    apžvalgos laikas nustatomas iš likusių patvirtintų apžvalgų. Įrašas kuriamas tik pridedant, todėl
+    trinant filmą kartu su apžvalgomis suvestinė neatkuriama.
+    """
+    count = F('review_count') + delta
+    total = F('rating_sum') + delta * rating
+    changes = {
+        'review_count': count,
+        'rating_sum': total,
+        HISTOGRAM_FIELDS[rating]: F(HISTOGRAM_FIELDS[rating]) + delta,
+        'rating_mean': Case(
+            When(review_count__gt=-delta, then=ExpressionWrapper(total * 1.0 / count, output_field=FloatField())),
+            default=None,
+        ),
+    }
+    if delta > 0:
+        newer = Q(last_review_at__isnull=True) | Q(last_review_at__lt=created_at)
+        changes['last_review_at'] = Case(When(newer, then=Value(created_at, output_field=DateTimeField())),
+                                         default=F('last_review_at'))
+    else:
+        latest = Review.objects.filter(movie_id=movie_id, approved=True).order_by('-created_at')
+        changes['last_review_at'] = Subquery(latest.values('created_at')[:1])
+
+    stats = MovieStats.objects.filter(movie_id=movie_id)
+    if stats.update(**changes) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            MovieStats.objects.create(movie_id=movie_id, review_count=1, rating_sum=rating, rating_mean=rating,
+                                      last_review_at=created_at, **{HISTOGRAM_FIELDS[rating]: 1})
+    except IntegrityError:
+        # Kita užklausa ką tik sukūrė įrašą – pridedame prie jo.
+        stats.update(**changes)
+
+
+def create_empty_stats(movie_ids):
+    """
+    Sukuria tuščias suvestines filmams, kurie jų dar neturi (kiekvienas filmas turi suvestinę, todėl
+    rikiavimas pagal ją gali eiti suvestinės indeksu per INNER JOIN).
+    """
+    MovieStats.objects.bulk_create([MovieStats(movie_id=movie_id) for movie_id in movie_ids], ignore_conflicts=True)
+
+
+def aggregate_stats(movie_ids=None):
+    """
+    Suvestinės, apskaičiuotos tiesiai iš apžvalgų lentelės (vienas GROUP BY), surikiuotos pagal filmo ID.
+    """
+    reviews = Review.objects.filter(approved=True)
+    if movie_ids is not None:
+        reviews = reviews.filter(movie_id__in=movie_ids)
+    return (reviews.values('movie_id')
+            .annotate(review_count=Count('id'), rating_sum=Sum('rating'), last_review_at=Max('created_at'),
+                      **{field: Count('id', filter=Q(rating=rating)) for rating, field in HISTOGRAM_FIELDS.items()})
+            .order_by('movie_id'))
+
+
+def rebuild_stats(movie_ids=None, batch_size=1000, dry_run=False):
+    """
+    Sulygina suvestines su apžvalgų lentele: perrašo nesutampančias, sukuria trūkstamas, o filmų be
+    patvirtintų apžvalgų suvestines išvalo iki tuščių. Naudojama po masinių pakeitimų, kurie apeina signalus.
+
+    :param movie_ids: filmų ID (None – visi filmai)
+    :return: pataisytų (arba, su dry_run, rastų) suvestinių skaičius
+    """
+    fixed = 0
+    seen = set()
+    batch = []
+
+    def flush():
+        nonlocal fixed
+        existing = {stats.movie_id: stats for stats in
+                    MovieStats.objects.filter(movie_id__in=[stats.movie_id for stats in batch])}
+        changed = [stats for stats in batch if stats.movie_id not in existing or any(
+            getattr(stats, field) != getattr(existing[stats.movie_id], field) for field in STAT_FIELDS)]
+        fixed += len(changed)
+        if changed and not dry_run:
+            MovieStats.objects.bulk_create(changed, update_conflicts=True, unique_fields=['movie'],
+                                           update_fields=STAT_FIELDS)
+        batch.clear()
+
+    for row in aggregate_stats(movie_ids).iterator(chunk_size=batch_size):
+        seen.add(row['movie_id'])
+        batch.append(MovieStats(rating_mean=row['rating_sum'] / row['review_count'], **row))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    movies = Movie.objects.all() if movie_ids is None else Movie.objects.filter(id__in=movie_ids)
+    for movie_id in movies.order_by('id').values_list('id', flat=True).iterator(chunk_size=batch_size):
+        if movie_id not in seen:
+            batch.append(MovieStats(movie_id=movie_id))
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+
+    if fixed and not dry_run:
+        caching.bump(caching.RATINGS)
+    return fixed
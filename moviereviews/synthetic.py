@@ -0,0 +1,216 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching, facets, leaderboards, recommendations, search, stats
+from .models import Comment, Director, Genre, Movie, Reaction, Review
+
+GENRE_NAMES = [
+    'Action', 'Adventure', 'Animation', 'Biography', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family',
+    'Fantasy', 'History', 'Horror', 'Music', 'Musical', 'Mystery', 'Romance', 'Sci-Fi', 'Sport', 'Thriller',
+    'War', 'Western', 'Film-Noir', 'Short', 'Superhero', 'Disaster',
+]
+
+SYLLABLES = 'ka ra to mi lo ne sa vi du re po li ta mo na ge be ri so lu'.split()
+
+DEFAULT_SCALE = {
+    'directors': 2_000,
+    'movies': 10_000,
+    'users': 5_000,
+    'reviews': 100_000,
+    'comments': 200_000,
+    'reactions': 1_000_000,
+}
+
+
+def build_vocabulary(rng, size):
+    """
+    Sugeneruoja sintetinį žodyną; žodžių dažniai pasiskirstę pagal Zipf dėsnį kaip tikrame tekste.
+    Grąžina žodžius ir jų sukauptus svorius (cum_weights) random.choices funkcijai.
+    """
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words, list(accumulate(1 / rank for rank in range(1, size + 1)))
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Laikinai išjungia auto_now / auto_now_add, kad bulk_create išsaugotų sugeneruotas datas.
+    """
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class SyntheticDataGenerator:
+    """
+    Atkuriamas (pagal `seed`) sintetinių duomenų generatorius našumo matavimams.
+
+    Visi įrašai kuriami `bulk_create` paketais, todėl signalai nevykdomi – denormalizuoti
+    skaitikliai apskaičiuojami generuojant, o paieškos indeksas, facetų talpykla, filmų suvestinės,
+    surikiuoti sąrašai, rekomendacijos ir puslapių talpyklos versijos atnaujinami pabaigoje.
+    Atmintis ribojama paketo dydžiu: apžvalgos, jų komentarai ir reakcijos kuriami kartu po vieną paketą.
+
+    Atributai:
+    - seed: Atsitiktinių skaičių generatoriaus sėkla.
+    - batch_size: Įrašų skaičius viename bulk_create.
+    - log: Funkcija progreso pranešimams (pvz. self.stdout.write).
+    """
+
+    def __init__(self, seed=42, batch_size=5000, log=None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.words, self.cum_weights = build_vocabulary(self.rng, 20_000)
+        self.now = timezone.now()
+
+    def text(self, count):
+        return ' '.join(self.rng.choices(self.words, cum_weights=self.cum_weights, k=count))
+
+    def past(self, days=365, after=None):
+        start = after or self.now - timedelta(days=days)
+        span = (self.now - start).total_seconds()
+        return start + timedelta(seconds=self.rng.random() * span)
+
+    def generate(self, **scale):
+        """
+        Sugeneruoja duomenis. Nenurodyti kiekiai imami iš DEFAULT_SCALE.
+
+        :return: žodynas {modelio pavadinimas: sukurtų įrašų skaičius}
+        """
+        scale = {**DEFAULT_SCALE, **scale}
+        started = time.monotonic()
+        counts = {}
+        with transaction.atomic(), explicit_timestamps(Movie, Review, Comment, Reaction):
+            genres = self.create_genres()
+            directors = self.create_directors(scale['directors'])
+            movie_ids = self.create_movies(scale['movies'], genres, directors)
+            user_ids = self.create_users(scale['users'])
+            counts.update(self.create_reviews(scale['reviews'], scale['comments'], scale['reactions'],
+                                              movie_ids, user_ids))
+            counts.update(genres=len(genres), directors=len(directors), movies=len(movie_ids), users=len(user_ids))
+            self.after_bulk_load()
+        self.log(f'Sugeneruota per {time.monotonic() - started:.1f} s: {counts}')
+        return counts
+
+    def after_bulk_load(self):
+        """
+        Atnaujina išvestines struktūras, kurių bulk_create neatnaujina per signalus.
+        """
+        search.rebuild_index()
+        facets.invalidate()
+        stats.rebuild_stats()
+        leaderboards.refresh_leaderboards()
+        recommendations.refresh_neighbors(full=True)
+        caching.bump(caching.CATALOG, caching.RATINGS, caching.REVIEWS)
+
+    def create_genres(self):
+        return [Genre.objects.get_or_create(name=name)[0] for name in GENRE_NAMES]
+
+    def create_directors(self, count):
+        directors = Director.objects.bulk_create(
+            (Director(name=f'{self.text(1).title()} {self.text(1).title()}', bio=self.text(30))
+             for _ in range(count)),
+            batch_size=self.batch_size,
+        )
+        self.log(f'Režisieriai: {len(directors)}')
+        return directors
+
+    def create_movies(self, count, genres, directors):
+        through = Movie.genres.through
+        movie_ids = []
+        for start in range(0, count, self.batch_size):
+            movies = Movie.objects.bulk_create([
+                Movie(title=self.text(self.rng.randint(1, 4)).title(), description=self.text(60),
+                      year=self.rng.randint(1950, self.now.year), director=self.rng.choice(directors),
+                      updated_at=self.now)
+                for _ in range(min(self.batch_size, count - start))
+            ])
+            through.objects.bulk_create([
+                through(movie_id=movie.id, genre_id=genre.id)
+                for movie in movies for genre in self.rng.sample(genres, self.rng.randint(1, 3))
+            ])
+            movie_ids.extend(movie.id for movie in movies)
+        self.log(f'Filmai: {len(movie_ids)}')
+        return movie_ids
+
+    def create_users(self, count):
+        prefix = f'synthetic-{self.seed}-'
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise ValueError(f'Vartotojai su prefiksu "{prefix}" jau sugeneruoti; naudokite kitą seed.')
+        users = User.objects.bulk_create(
+            (User(username=f'{prefix}{i}', password='!') for i in range(count)),
+            batch_size=self.batch_size,
+        )
+        self.log(f'Vartotojai: {len(users)}')
+        return [user.id for user in users]
+
+    def create_reviews(self, count, comments, reactions, movie_ids, user_ids):
+        # Populiarūs filmai gauna daugiau apžvalgų (Zipf pasiskirstymas).
+        movie_weights = list(accumulate(1 / rank for rank in range(1, len(movie_ids) + 1)))
+        comments_per_review = comments / max(count, 1)
+        reactions_per_review = reactions / max(count, 1)
+        totals = {'reviews': 0, 'comments': 0, 'reactions': 0}
+
+        for start in range(0, count, self.batch_size):
+            batch = []
+            plans = []
+            for _ in range(min(self.batch_size, count - start)):
+                voter_count = int(self.rng.expovariate(1 / reactions_per_review)) if reactions else 0
+                voters = self.rng.sample(user_ids, min(len(user_ids), voter_count))
+                likes = [self.rng.random() < 0.7 for _ in voters]
+                comment_count = int(self.rng.expovariate(1 / comments_per_review)) if comments else 0
+                created_at = self.past()
+                batch.append(Review(
+                    user_id=self.rng.choice(user_ids),
+                    movie_id=self.rng.choices(movie_ids, cum_weights=movie_weights)[0],
+                    title=self.text(self.rng.randint(2, 6)).capitalize(),
+                    content=self.text(self.rng.randint(20, 120)),
+                    rating=self.rng.choices(range(1, 6), weights=(5, 8, 20, 37, 30))[0],
+                    created_at=created_at,
+                    updated_at=created_at,
+                    approved=self.rng.random() < 0.9,
+                    likes_count=sum(likes),
+                    dislikes_count=len(likes) - sum(likes),
+                    comments_count=comment_count,
+                ))
+                plans.append((voters, likes, comment_count))
+
+            reviews = Review.objects.bulk_create(batch)
+            Reaction.objects.bulk_create([
+                Reaction(user_id=user_id, review_id=review.id,
+                         reaction_type=Reaction.LIKE if like else Reaction.DISLIKE,
+                         created_at=created_at, updated_at=created_at, liked_at=created_at if like else None)
+                for review, (voters, likes, _) in zip(reviews, plans) for user_id, like in zip(voters, likes)
+                for created_at in [self.past(after=review.created_at)]
+            ], batch_size=self.batch_size)
+            Comment.objects.bulk_create([
+                Comment(review_id=review.id, user_id=self.rng.choice(user_ids), content=self.text(25),
+                        created_at=created_at, updated_at=created_at)
+                for review, (_, _, comment_count) in zip(reviews, plans) for _ in range(comment_count)
+                for created_at in [self.past(after=review.created_at)]
+            ], batch_size=self.batch_size)
+
+            totals['reviews'] += len(reviews)
+            totals['reactions'] += sum(len(voters) for voters, _, _ in plans)
+            totals['comments'] += sum(comment_count for _, _, comment_count in plans)
+            self.log(f'Apžvalgos: {totals["reviews"]}/{count}')
+        return totals
@@ -0,0 +1,23 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from .instrumentation import timed
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Įprastas Django šablonų variklis, kurio šablonų atvaizdavimo laikas įskaitomas į užklausos matavimus
+    (PerformanceMiddleware `template` sritis).
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
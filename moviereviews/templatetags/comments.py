@@ -0,0 +1,32 @@
+from urllib.parse import urlencode
+
+from django import template
+from django.urls import reverse
+
+from moviereviews.queries import review_comments_paginator
+
+register = template.Library()
+
+
+@register.simple_tag
+def comments_url(review_id, cursor=None):
+    """
+    Apžvalgos komentarų puslapio adresas (be žymeklio – pirmas puslapis).
+    """
+    url = reverse('review_comments', args=[review_id])
+    return f'{url}?{urlencode({"cursor": cursor})}' if cursor else url
+
+
+@register.simple_tag
+def more_comments_url(review):
+    """
+    Komentarų, einančių po filmo puslapyje parodytų (`review.comment_preview`), adresas arba tuščia eilutė,
+    jei parodyti visi. Žymeklis sudaromas iš paskutinio parodyto komentaro, todėl užklausų nevykdoma.
+
+    Naudojimas: {% more_comments_url review as url %}
+    """
+    preview = review.comment_preview
+    if review.comments_count <= len(preview):
+        return ''
+    cursor = review_comments_paginator(review.id).encode_cursor(preview[-1]) if preview else None
+    return comments_url(review.id, cursor)
@@ -0,0 +1,47 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from moviereviews.images import poster_dimensions, poster_sizes, poster_sources
+
+register = template.Library()
+
+
+@register.simple_tag
+def poster(movie, size='list', css_class='', style='', eager=False, fallback_original=True):
+    """
+    Atvaizduoja filmo plakatą `<picture>` elementu su WebP ir JPEG `srcset` (1x ir 2x).
+
+    Paveikslėlis įkeliamas tingiai (`loading="lazy"`), nebent nurodyta `eager=True`.
+    Jei sumažintos versijos dar nesukurtos, naudojamas originalus failas (su `fallback_original=False` –
+    numatytoji nuotrauka, kad mažos peržiūros nesiųstų pilno dydžio plakato), o jei nuotraukos nėra – numatytoji.
+
+    `width` ir `height` – tikri sumažintos versijos matmenys (iš Movie.poster_width/poster_height), todėl ne 2:3
+    plakatai neiškraipomi. Kai jie nežinomi (originalas ar numatytoji nuotrauka), nurodomas tik dydžio plotis,
+    o aukštis išlaiko paveikslėlio proporcijas.
+
+    Naudojimas: {% poster movie 'list' css_class='img-fluid' %}
+    """
+    loading = 'eager' if eager else 'lazy'
+    dimensions = poster_dimensions(movie, size)
+    if dimensions is None:
+        size_attributes = format_html(' width="{}"', poster_sizes()[size][0])
+    else:
+        size_attributes = format_html(' width="{}" height="{}"', *dimensions)
+
+    sources = poster_sources(movie.image.name, movie.poster_hash, size) if movie.image else None
+    if sources is None:
+        src = movie.image.url if movie.image and fallback_original else static('default_movie.jpg')
+        # Originalo ar numatytosios nuotraukos matmenys nėra tokie, kaip versijos, todėl nurodomas tik plotis.
+        return format_html(
+            '<img src="{}" alt="{}" width="{}" class="{}" style="{}" loading="{}" decoding="async">',
+            src, movie.title, poster_sizes()[size][0], css_class, style, loading,
+        )
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}">'
+        '<img src="{}" srcset="{}" alt="{}"{} class="{}" style="{}" loading="{}" decoding="async">'
+        '</picture>',
+        sources['webp'], sources['jpg'].split(' ', 1)[0], sources['jpg'], movie.title, size_attributes,
+        css_class, style, loading,
+    )
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from .database import replica_aliases
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Testų paleidiklis, kuris testų metu neskaito iš replikų, veidrodinančių kitą DB (TEST['MIRROR']),
+    ir nenaudoja bendros failų talpyklos.
+
+    Veidrodis – atskiras ryšys į tą pačią testų DB, todėl jis nemato TestCase duomenų, likusių neužbaigtoje
+    'default' transakcijoje. Maršrutizavimą tikrinantys testai replikas įjungia patys su override_settings.
+    Failų talpykla išlieka tarp paleidimų ir ją naudoja veikiantis serveris, todėl testai gauna savo
+    LocMemCache: kitaip jie rastų ankstesnio paleidimo puslapius ir keistų serverio talpyklos versijas.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_override = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': settings.CACHES['default'].get('OPTIONS', {}),
+        }})
+        self.cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_override.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def setup_databases(self, **kwargs):
+        old_config = super().setup_databases(**kwargs)
+        mirrors = {alias for alias in connections if connections[alias].settings_dict['TEST']['MIRROR']}
+        self.replicas_override = override_settings(
+            DATABASE_REPLICAS=[alias for alias in replica_aliases() if alias not in mirrors],
+        )
+        self.replicas_override.enable()
+        return old_config
+
+    def teardown_databases(self, old_config, **kwargs):
+        self.replicas_override.disable()
+        super().teardown_databases(old_config, **kwargs)
@@ -1,19 +1,33 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from .views import movie_list, MovieDetailView, add_review, CommentCreateView, ReactionCreateView, RegisterView, UserProfileView, MyReviewsView, ReviewListView, SearchResultsView
+from .models import LeaderboardEntry
+from .views import movie_list, leaderboard, MovieDetailView, add_review, CommentCreateView, ReactionCreateView, RegisterView, UserProfileView, MyReviewsView, ReviewListView, review_comments, SearchResultsView, ModerationQueueView, performance_stats, review_export
+
+if settings.ASYNC_VIEWS:
+    from .async_views import movie_list, movie_detail, search
+else:
+    movie_detail = MovieDetailView.as_view()
+    search = SearchResultsView.as_view()
 
 
 urlpatterns = [
     path('', movie_list, name='movie_list'),
-    path('movie/<int:movie_id>/', MovieDetailView.as_view(), name='movie_detail'),
+    path('top-rated/', leaderboard, {'kind': LeaderboardEntry.TOP_RATED}, name='top_rated'),
+    path('trending/', leaderboard, {'kind': LeaderboardEntry.TRENDING}, name='trending'),
+    path('movie/<int:movie_id>/', movie_detail, name='movie_detail'),
     path('reviews/', ReviewListView.as_view(), name='reviews'),
     path('my-reviews/', MyReviewsView.as_view(), name='my_reviews'),
-    path('search/', SearchResultsView.as_view(), name='search'),
+    path('search/', search, name='search'),
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('movie/<int:movie_id>/review/', add_review, name='add_review'),
     path('review/<int:review_id>/comment/', CommentCreateView.as_view(), name='add_comment'),
+    path('review/<int:review_id>/comments/', review_comments, name='review_comments'),
     path('review/<int:review_id>/reaction/<str:reaction_type>/', ReactionCreateView.as_view(), name='add_reaction'),
     path('profile/', UserProfileView.as_view(), name='user-profile'),
+    path('stats/performance/', performance_stats, name='performance_stats'),
+    path('reviews/export/', review_export, name='review_export'),
+    path('moderation/', ModerationQueueView.as_view(), name='moderation_queue'),
 ]
\ No newline at end of file
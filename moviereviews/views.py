@@ -1,81 +1,177 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.views import View
-from .models import Movie, Review, Comment, Genre, Reaction
+from .models import Movie, Review, Comment, Genre, LeaderboardEntry, Reaction
 from .forms import ReviewForm, CommentForm
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.utils.decorators import method_decorator
-from imdb import IMDb
-
-
+from django.views.decorators.http import condition
+from django.db import transaction
+from django.db.models import F
+from django.utils.functional import SimpleLazyObject
+from . import caching, freshness
+from .exporter import CONTENT_TYPES, FORMATS, export_filename, export_reviews
+from .facets import filter_movies, get_facets
+from .instrumentation import registry
+from .leaderboards import leaderboard_entries
+from .moderation import moderate_reviews, pending_reviews
+from .pagination import CountedPaginator, KeysetPaginator
+from .queries import movie_detail_queryset, movie_reviews_queryset, review_comments_paginator
+from .ratings import get_rating_provider
+from .reactions import COUNTER_FIELDS, upsert_reaction
+from .recommendations import recommended_for_user, similar_movies
+from .search import search_movies
+from .similarity import similar_by_content
+from .templatetags.comments import comments_url
+
+MOVIES_PER_PAGE = 20
+
+# Rikiavimas pagal iš anksto apskaičiuotą suvestinę (MovieStats), be GROUP BY per apžvalgas. Raktai sutampa su
+# moviestats_rating_idx ir moviestats_reviews_idx (paskutinis – stats__movie_id, o ne id), todėl SQLite
+# eina indeksu ir nerikiuoja viso katalogo laikiname B-medyje.
+# Numatytasis rikiavimas – naujausi įrašai pirmiausia (ID mažėjimo tvarka, per pirminį raktą be laikino B-medžio).
+DEFAULT_MOVIE_ORDERING = ('-id',)
+MOVIE_ORDERINGS = {
+    'rating': (F('stats__rating_mean').desc(nulls_last=True), F('stats__review_count').desc(), 'stats__movie_id'),
+    'reviews': (F('stats__review_count').desc(), 'stats__movie_id'),
+}
+
+
+@condition(etag_func=freshness.movie_list_etag, last_modified_func=freshness.movie_list_last_modified)
+@caching.cache_anonymous_page(lambda request: [caching.CATALOG, caching.RATINGS])
 def movie_list(request):
     """
     Rodo filmų sarašą.
-    Filtruoja filmus pagal žanrą arba metus.
+    Filtruoja filmus pagal žanrą arba metus ir prie kiekvieno filtro parodo, kiek filmų jis atrinktų.
+    Žanrų ir metų skaičiai imami iš facetų talpyklos, o sąrašas puslapiuojamas.
+    `?sort=rating` arba `?sort=reviews` rikiuoja pagal filmų suvestinę.
+    Anonimams visas puslapis, o kitiems – filmų tinklelis ir filtrai imami iš talpyklos.
+    Nepasikeitus filmams ir apžvalgoms sąlyginė užklausa (If-None-Match / If-Modified-Since) gauna 304.
     :param request: Pasirinkimas pagal žanrą arba metus
     :return:
     """
+    genre_id, year, sort = movie_list_options(request)
+    facets = get_facets(genre_id, year)
+    page = CountedPaginator(movie_list_queryset(genre_id, year, sort), MOVIES_PER_PAGE,
+                            facets['total']).get_page(request.GET.get('page'))
+    return render(request, 'movie_list.html', movie_list_context(request, page, facets, sort))
+
+
+def movie_list_options(request):
+    """
+    Filmų sąrašo filtrai ir rikiavimas iš užklausos parametrų (netinkami ignoruojami).
+
+    :return: (žanro ID arba None, metai arba None, rikiavimas iš MOVIE_ORDERINGS arba '')
+    """
     genre_filter = request.GET.get('genre', '')
     year_filter = request.GET.get('year', '')
 
-    movies = Movie.objects.all()
+    genre_id = int(genre_filter) if genre_filter.isdigit() else None
+    year = int(year_filter) if year_filter.isdigit() else None
+    sort = request.GET.get('sort', '')
+    return genre_id, year, sort if sort in MOVIE_ORDERINGS else ''
+
+
+def movie_list_queryset(genre_id, year, sort):
+    movies = filter_movies(genre_id, year).select_related('director', 'stats')
+    if sort in MOVIE_ORDERINGS:
+        # Kiekvienas filmas turi suvestinę, todėl INNER JOIN nieko neatmeta, bet leidžia pradėti nuo jos indekso.
+        movies = movies.filter(stats__isnull=False)
+    return movies.order_by(*MOVIE_ORDERINGS.get(sort, DEFAULT_MOVIE_ORDERING))
+
+
+def movie_list_context(request, page, facets, sort):
+    filters = request.GET.copy()
+    filters.pop('page', None)
+    return {'movies': page, 'page': page, 'genres': facets['genres'], 'years': facets['years'],
+            'filters': filters.urlencode(), 'sort': sort,
+            'fragment_cache': caching.fragment_context(request, catalog=caching.CATALOG, ratings=caching.RATINGS)}
 
-    if genre_filter.isdigit():
-        movies = movies.filter(genres__id=int(genre_filter))
 
-    if year_filter.isdigit():
-        movies = movies.filter(year=int(year_filter))
+LEADERBOARD_TITLES = {
+    LeaderboardEntry.TOP_RATED: 'Geriausiai įvertinti filmai',
+    LeaderboardEntry.TRENDING: 'Populiarūs šią savaitę',
+}
 
-    genres = Genre.objects.all()
-    years = Movie.objects.values_list('year', flat=True).distinct().order_by('-year')
 
-    return render(request, 'movie_list.html', {'movies': movies, 'genres': genres, 'years': years})
+def leaderboard(request, kind):
+    """
+    Rodo iš anksto surikiuotą filmų sąrašą (geriausiai įvertinti arba populiarūs).
+    Sąrašą periodiškai perrašo `update_leaderboards` komanda, todėl puslapiui reikia tik puslapio dydžio SELECT.
+    :param kind: sąrašo tipas (LeaderboardEntry.TOP_RATED arba LeaderboardEntry.TRENDING)
+    :return: HTML puslapis su sąrašu
+    """
+    page = Paginator(leaderboard_entries(kind), MOVIES_PER_PAGE).get_page(request.GET.get('page'))
+    return render(request, 'leaderboard.html', {'title': LEADERBOARD_TITLES[kind], 'kind': kind,
+                                                'entries': page, 'page': page})
 
 
 class MovieDetailView(View):
     """
     Ši klasė rodo pasirinkto filmo detales.
-    Ji parodo filmą, jo atsiliepimus su laikais ir IMDb reitingą.
+    Ji parodo filmą, jo atsiliepimus su laikais, IMDb reitingą ir panašius filmus
+    (iš iš anksto apskaičiuotos kaimynų lentelės, o filmams be įvertinimų – pagal turinį).
 
     :param request: vartotojo užklausa
     :param movie_id: filmo ID, kad žinotume, kurį filmą parodyti
+    Sąlyginė užklausa gauna 304 be šablono ir apžvalgų užklausų, jei filmas ir jo apžvalgos nepasikeitė.
+
     :return: HTML puslapis su filmo informacija, atsiliepimais ir IMDb įvertinimu
     """
 
+    @method_decorator(condition(etag_func=freshness.movie_detail_etag,
+                                last_modified_func=freshness.movie_detail_last_modified))
+    @method_decorator(caching.cache_anonymous_page(
+        lambda request, movie_id: [caching.CATALOG, caching.movie_scope(movie_id)]))
     def get(self, request, movie_id):
-        movie = get_object_or_404(Movie, id=movie_id)
+        movie = get_object_or_404(movie_detail_queryset(), id=movie_id)
 
-        reviews = Review.objects.filter(movie=movie)
+        reviews = movie_reviews_queryset(movie)
 
-        ia = IMDb()
+        imdb_rating = movie.imdb_rating
 
-        for review in reviews:
-            review.likes_count = review.reactions.filter(reaction_type=Reaction.LIKE).count()
-            review.dislikes_count = review.reactions.filter(reaction_type=Reaction.DISLIKE).count()
+        if imdb_rating is None and movie.imdb_id:
+            imdb_rating = get_rating_provider().get_rating(movie.imdb_id)
 
-        imdb_rating = None
+        return render(request, 'movie_detail.html', movie_detail_context(request, movie, reviews, imdb_rating))
 
-        if movie.imdb_id:
-            imdb_movie = ia.get_movie(movie.imdb_id[2:])
-            imdb_rating = imdb_movie.get('rating', None)
 
-        return render(request, 'movie_detail.html', {
-            'movie': movie,
-            'reviews': reviews,
-            'imdb_rating': imdb_rating,
-        })
+def movie_detail_context(request, movie, reviews, imdb_rating):
+    return {
+        'movie': movie,
+        'reviews': reviews,
+        'imdb_rating': imdb_rating,
+        # Apskaičiuojami tik tada, kai fragmento nėra talpykloje.
+        'similar_movies': SimpleLazyObject(lambda: similar_movies(movie) or similar_by_content(movie)),
+        'fragment_cache': caching.fragment_context(request, catalog=caching.CATALOG,
+                                                   movie=caching.movie_scope(movie.id)),
+    }
 
 
 class ReviewListView(View):
     """
-    Ši klasė rodo visų atsiliepimų sąrašą, pradedant nuo naujausių.
+    Ši klasė rodo visų patvirtintų atsiliepimų sąrašą, pradedant nuo naujausių.
+    Sąrašas puslapiuojamas pagal žymeklį (`?cursor=`), todėl ir gilūs puslapiai užkraunami greitai.
+    Puslapis užklausiamas tik tada, kai sąrašo fragmento nėra talpykloje.
     """
+    paginate_by = 20
 
+    @method_decorator(caching.cache_anonymous_page(lambda request: [caching.CATALOG, caching.REVIEWS]))
     def get(self, request):
-        reviews = Review.objects.all().order_by('-created_at')
+        reviews = Review.public.select_related('movie', 'user')
+        cursor = request.GET.get('cursor')
+        page = SimpleLazyObject(lambda: KeysetPaginator(reviews, self.paginate_by).get_page(cursor))
 
-        return render(request, 'review_list.html', {'reviews': reviews})
+        return render(request, 'review_list.html', {
+            'reviews': page, 'page': page,
+            'fragment_cache': caching.fragment_context(request, catalog=caching.CATALOG, reviews=caching.REVIEWS),
+        })
 
 
 class CommentCreateView(View):
@@ -85,13 +181,13 @@ class CommentCreateView(View):
     """
 
     def get(self, request, review_id):
-        review = get_object_or_404(Review, id=review_id)
+        review = get_object_or_404(Review.public, id=review_id)
         form = CommentForm()
         return render(request, 'comment_form.html', {'form': form,
                                                      'review': review})
 
     def post(self, request, review_id):
-        review = get_object_or_404(Review, id=review_id)
+        review = get_object_or_404(Review.public, id=review_id)
         form = CommentForm(request.POST)
         if form.is_valid():
             comment = form.save(commit=False)
@@ -104,17 +200,40 @@ class CommentCreateView(View):
                                                      'review': review})
 
 
+def review_comments(request, review_id):
+    """
+    Vienas apžvalgos komentarų puslapis pagal (created_at, id) žymeklį (`?cursor=`), su autoriais tame pačiame
+    SELECT. Filmo puslapis rodo tik pirmuosius komentarus, o likusius užkrauna šiuo maršrutu.
+
+    :param request: HttpRequest objektas; JSON klientams (fetch) grąžinamas HTML fragmentas ir kito puslapio
+        adresas, kitiems – atskiras komentarų puslapis
+    :param review_id: patvirtintos apžvalgos ID
+    :return: JsonResponse su `html`, `next` ir `count` arba HTML puslapis
+    """
+    review = get_object_or_404(Review.public.select_related('movie'), id=review_id)
+    page = review_comments_paginator(review.id).get_page(request.GET.get('cursor'))
+    context = {'review': review, 'comments': page.object_list, 'page': page,
+               'next_url': comments_url(review.id, page.next_cursor) if page.has_next() else None}
+    if wants_json(request):
+        return JsonResponse({'review': review.id, 'count': review.comments_count, 'next': context['next_url'],
+                             'html': render_to_string('comment_items.html', context, request)})
+    return render(request, 'review_comments.html', context)
+
+
 @method_decorator(login_required, name='dispatch')
 class MyReviewsView(View):
     """
-    Ši klasė rodo visus tavo parašytus atsiliepimus.
+    Ši klasė rodo visus tavo parašytus atsiliepimus, ir dar nepatvirtintus.
     Tik prisijungę vartotojai gali matyti savo atsiliepimus.
+    Sąrašas puslapiuojamas pagal žymeklį (`?cursor=`), pradedant nuo naujausių.
     """
+    paginate_by = 20
 
     def get(self, request):
-        reviews = Review.objects.filter(user=request.user)
+        reviews = Review.objects.filter(user=request.user).select_related('movie')
+        page = KeysetPaginator(reviews, self.paginate_by).get_page(request.GET.get('cursor'))
         return render(request, 'my_reviews.html',
-                      {'reviews': reviews})
+                      {'reviews': page.object_list, 'page': page})
 
 
 def home(request):
@@ -212,29 +331,30 @@ class UserProfileView(View):
 
     Užtikrina, kad tik prisijungę vartotojai gali pasiekti šį vaizdą.
 
-    GET užklausa atvaizduoja vartotojo profilio puslapį, kuriame rodomi vartotojo duomenys.
+    GET užklausa atvaizduoja vartotojo profilio puslapį, kuriame rodomi vartotojo duomenys
+    ir rekomenduojami filmai pagal jo aukštai įvertintus filmus.
 
     Metodai:
     - get: Atvaizduoja vartotojo profilio puslapį su informaciją apie prisijungusį vartotoją.
     """
     def get(self, request):
-        return render(request, 'profile.html', {'user': request.user})
+        recommendations = recommended_for_user(request.user) if request.user.is_authenticated else []
+        return render(request, 'profile.html', {'user': request.user, 'recommendations': recommendations})
 
 
 class SearchResultsView(View):
     """
     Ši klasė rodo paieškos rezultatus filmų sąraše.
-    Jei įvedei paieškos tekstą, parodoma tik filmų pavadinimai, kurie atitinka tą tekstą.
+    Jei įvedei paieškos tekstą, filmai ieškomi pagal pavadinimą, aprašymą, režisierių ir žanrus,
+    rikiuojami pagal atitikimą (bm25) ir rodomi su paryškintomis ištraukomis.
     """
+    paginate_by = 20
 
     def get(self, request):
         query = request.GET.get('search_text', '').strip()
-        results = Movie.objects.all()
-
-        if query:
-            results = results.filter(title__icontains=query)
+        page = search_movies(query, request.GET.get('page'), self.paginate_by)
 
-        return render(request, 'search_results.html', {'results': results, 'query': query})
+        return render(request, 'search_results.html', {'results': page.object_list, 'page': page, 'query': query})
 
 
 def add_review(request, movie_id):
@@ -254,6 +374,7 @@ def add_review(request, movie_id):
             review.movie = movie
             review.user = request.user
             review.save()
+            messages.success(request, 'Apžvalga išsaugota. Ji bus paskelbta, kai ją patvirtins moderatorius.')
 
             return redirect('movie_detail', movie_id=movie.id)
     else:
@@ -266,25 +387,94 @@ def add_review(request, movie_id):
     return render(request, 'review_form.html', context)
 
 
+@method_decorator(login_required, name='dispatch')
 class ReactionCreateView(View):
     """
     Ši klasė leidžia vartotojui pateikti balsą („patinka“ arba „nepatinka“) atsiliepimui.
+    Balsas įrašomas atominiu upsert (be get_or_create ir antro save()), o AJAX klientams grąžinamas
+    JSON su naujais skaitikliais, kad nereikėtų iš naujo atvaizduoti viso filmo puslapio.
     """
 
     def post(self, request, review_id, reaction_type):
-        review = get_object_or_404(Review,
-                                   id=review_id)
+        if reaction_type not in COUNTER_FIELDS:
+            review = get_object_or_404(Review.objects.only('movie_id'), id=review_id)
+            return redirect('movie_detail', movie_id=review.movie_id)
+
+        with transaction.atomic():
+            result = upsert_reaction(request.user.id, review_id, reaction_type)
+        if result is None:
+            raise Http404('Apžvalga nerasta.')
+
+        if wants_json(request):
+            return JsonResponse({'review': review_id, 'reaction': reaction_type, 'changed': result['changed'],
+                                 'likes': result['likes'], 'dislikes': result['dislikes']})
+        return redirect('movie_detail', movie_id=result['movie_id'])
+
+
+def wants_json(request):
+    """
+    Ar užklausą siuntė JavaScript (fetch/AJAX) ir laukia JSON, o ne HTML puslapio.
+    """
+    return (request.headers.get('x-requested-with') == 'XMLHttpRequest'
+            or 'application/json' in request.headers.get('accept', ''))
+
+
+@staff_member_required
+def performance_stats(request):
+    """
+    Grąžina PerformanceMiddleware sukauptą kiekvieno maršruto statistiką JSON formatu (tik personalui).
+
+    :param request: HttpRequest objektas; `?reset=1` po atsakymo išvalo sukauptus duomenis
+    :return: JsonResponse su vėlinimo procentiliais, histogramomis ir vidutiniu DB užklausų skaičiumi
+    """
+    stats = registry.snapshot()
+    if request.GET.get('reset'):
+        registry.reset()
+    return JsonResponse({'routes': stats})
 
-        if reaction_type in ['like', 'dislike']:
 
-            reaction, created = Reaction.objects.get_or_create(
-                user=request.user,
-                review=review,
-                defaults={'reaction_type': reaction_type}
-            )
+@method_decorator(staff_member_required, name='dispatch')
+class ModerationQueueView(View):
+    """
+    Moderavimo eilė (tik personalui): nepatvirtintos ir dar neperžiūrėtos apžvalgos nuo seniausių.
 
-            if not created:
-                reaction.reaction_type = reaction_type
-                reaction.save()
+    Eilė puslapiuojama pagal žymeklį (created_at, id) daliniu review_pending_idx indeksu, todėl jos kaina
+    nepriklauso nuo patvirtintų apžvalgų kiekio. POST patvirtina arba atmeta pažymėtas apžvalgas vienu
+    UPDATE (žr. moderation.moderate_reviews).
+    """
+    paginate_by = 50
+    ordering = ('created_at', 'id')
 
-        return redirect('movie_detail', movie_id=review.movie.id)
+    def get(self, request):
+        reviews = pending_reviews().select_related('movie', 'user')
+        page = KeysetPaginator(reviews, self.paginate_by, self.ordering).get_page(request.GET.get('cursor'))
+        return render(request, 'moderation_queue.html', {'reviews': page.object_list, 'page': page})
+
+    def post(self, request):
+        action = request.POST.get('action')
+        review_ids = [value for value in request.POST.getlist('reviews') if value.isdigit()]
+        if action not in ('approve', 'reject') or not review_ids:
+            messages.error(request, 'Pasirinkite apžvalgas ir veiksmą.')
+        else:
+            count = moderate_reviews(review_ids, approve=action == 'approve')
+            verb = 'Patvirtinta' if action == 'approve' else 'Atmesta'
+            messages.success(request, f'{verb} apžvalgų: {count}.')
+        return redirect('moderation_queue')
+
+
+@staff_member_required
+def review_export(request):
+    """
+    Srautiškai eksportuoja apžvalgas su komentarais ir reakcijų skaičiais (tik personalui).
+
+    :param request: HttpRequest objektas; `?format=jsonl|csv`, `?gzip=1` – suspausti
+    :return: StreamingHttpResponse, kurio turinys generuojamas skaitant DB paketais
+    """
+    format = request.GET.get('format', 'jsonl')
+    if format not in FORMATS:
+        format = 'jsonl'
+    compress = bool(request.GET.get('gzip'))
+    response = StreamingHttpResponse(export_reviews(format, compress),
+                                     content_type='application/gzip' if compress else CONTENT_TYPES[format])
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(format, compress)}"'
+    return response
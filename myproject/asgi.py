@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
+# Per ASGI filmų puslapiai aptarnaujami asinchroniniais rodiniais (žr. ASYNC_VIEWS nustatymą).
+os.environ.setdefault('MOVIEREVIEWS_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
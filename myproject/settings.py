@@ -41,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'moviereviews.instrumentation.PerformanceMiddleware',
+    'moviereviews.database.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +56,7 @@ ROOT_URLCONF = 'myproject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'moviereviews.template_backends.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,11 +76,45 @@ WSGI_APPLICATION = 'myproject.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# 'replica' – tik skaitymui atidaromas tos pačios WAL DB ryšys; kitame serveryje čia būtų tikra replika.
+# Ryšiai laikomi atviri CONN_MAX_AGE sekundžių (ASGI serveryje kiekviena užklausa turi savo giją,
+# todėl ten ilgalaikiai ryšiai nenaudingi – CONN_MAX_AGE reikėtų nustatyti 0).
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': (BASE_DIR / 'db.sqlite3').as_uri() + '?mode=ro',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['moviereviews.database.PrimaryReplicaRouter']
+
+# Skaitymo replikos (moviereviews.database). Testuose replikos su TEST['MIRROR'] nenaudojamos
+# (moviereviews.testing.TestRunner): TestCase duomenys lieka neužbaigtoje 'default' transakcijoje,
+# kurios kitas ryšys nemato.
+DATABASE_REPLICAS = ['replica']
+
+TEST_RUNNER = 'moviereviews.testing.TestRunner'
+
+# Kiekvienam naujam SQLite ryšiui taikomi PRAGMA nustatymai (moviereviews.database.apply_sqlite_pragmas)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
 }
 
 
@@ -121,10 +157,62 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Sumažintų plakato versijų dydžiai (plotis, aukštis); kiekvienas generuojamas 1x ir 2x, WebP ir JPEG
+POSTER_SIZES = {
+    'admin': (50, 75),
+    'list': (170, 250),
+    'detail': (300, 450),
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# IMDb reitingų tiekėjas ir jo vietinė talpykla (laikai nurodyti sekundėmis)
+IMDB_RATING_PROVIDER = {
+    'BACKEND': 'moviereviews.ratings.IMDbRatingProvider',
+}
+
+IMDB_RATING_CACHE = {
+    'MAX_ENTRIES': 1000,
+    'TTL': 60 * 60,
+    'STALE_TTL': 24 * 60 * 60,
+    'NEGATIVE_TTL': 10 * 60,
+}
+
+# Kiek sekundžių asinchroninis filmo puslapis laukia IMDb reitingo, kol parodo puslapį be jo
+IMDB_RATING_TIMEOUT = 2
+
+# Asinchroniniai filmų sąrašo, filmo ir paieškos rodiniai (moviereviews.async_views); įjungiami
+# paleidžiant per ASGI (myproject/asgi.py), WSGI serveris naudoja sinchroninius.
+ASYNC_VIEWS = os.environ.get('MOVIEREVIEWS_ASYNC_VIEWS') == '1'
+
+# Talpykla bendra visiems serverio procesams ir valdymo komandoms: import_catalog, sync_imdb, moderavimas ir
+# build_recommendations keičia talpyklos versijas savo procese, todėl LocMemCache jų pakeitimų serveriui
+# neperduotų (jis tinka tik vieno proceso serveriui be komandų). Katalogą galima nurodyti MOVIEREVIEWS_CACHE_DIR;
+# seni įrašai išstumiami pasiekus MAX_ENTRIES. Keliems serveriams – bendras Redis ar Memcached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('MOVIEREVIEWS_CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'CULL_FREQUENCY': 3,
+        },
+    },
+}
+
+# Anonimų puslapių ir šablonų fragmentų talpykla (moviereviews.caching); laikai nurodyti sekundėmis.
+# Įrašai pasendinami keičiant versijas, todėl laikas – tik viršutinė riba (pvz. IMDb reitingui).
+PAGE_CACHE = {
+    'ALIAS': 'default',
+    'PAGE_TIMEOUT': 5 * 60,
+    'FRAGMENT_TIMEOUT': 10 * 60,
+}
+
+# Turiniu paremto filmų panašumo indekso (TF-IDF + žanrai + režisierius) katalogas diske
+SIMILARITY_INDEX_DIR = os.path.join(BASE_DIR, 'similarity_index')
+
 LOGIN_REDIRECT_URL = 'movie_list'
 LOGOUT_REDIRECT_URL = 'login'